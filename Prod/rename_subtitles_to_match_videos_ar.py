@@ -27,11 +27,36 @@ ORIGINAL VERSION: rename_subtitles_to_match_videos_ar_optimized_Sonnet4_NoThinki
 
 import os
 import re
-from collections import defaultdict
+import sys
+import io
+import argparse
+import contextlib
+import fnmatch
+import multiprocessing
+from collections import defaultdict, OrderedDict
 import configparser
 from pathlib import Path
 from datetime import datetime
 import time
+import hashlib
+import json
+import sqlite3
+import ctypes
+import errno
+import threading
+import asyncio
+import shutil
+import stat
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+try:
+    import fcntl
+except ImportError:  # Windows: directories are not locked
+    fcntl = None
 
 
 # ============================================================================
@@ -42,10 +67,46 @@ import time
 DEFAULT_CONFIG = {
     'enable_export': True,
     'language_suffix': 'ar',
+    'rename_journal': True,
+    'directory_lock': 'wait',
+    'lock_timeout': 0.0,
+    'placement': 'move',
+    'library_catalog': False,
     'video_extensions': ['mkv', 'mp4'],
-    'subtitle_extensions': ['srt', 'ass']
+    'subtitle_extensions': ['srt', 'ass'],
+    'ignore_folders': ['Sample', 'Extras', 'Featurettes', '@eaDir', '.git'],
+    'episode_engine': 'legacy',
+    'episode_cache_size': 10000,
+    'persistent_cache': False,
+    'adaptive_pattern_order': True,
+    'pattern_prefilter': True,
+    'rename_workers': 1,
+    'pipeline': False,
+    'library_workers': 0,
+    'walker_threads': 8,
+    'folder_snapshots': True,
+    'episode_manifest': False,
+    'extra_patterns': ()
 }
 
+# Upper bound for [Performance] rename_workers
+MAX_RENAME_WORKERS = 64
+
+# Upper bound for [Performance] library_workers
+MAX_LIBRARY_WORKERS = 256
+
+# Upper bound for [Performance] walker_threads
+MAX_WALKER_THREADS = 64
+
+# Episode detection engines selectable through [Performance] episode_engine
+EPISODE_ENGINE_CHOICES = ('legacy', 'combined', 'lexer')
+
+# What to do when another process holds a directory's lock
+DIRECTORY_LOCK_CHOICES = ('wait', 'skip', 'off')
+
+# How subtitles are put in place: moved (renamed) or copied, leaving the original
+PLACEMENT_CHOICES = ('move', 'copy')
+
 def get_script_directory():
     """Get the script's directory where config.ini should be located"""
     return Path(__file__).parent
@@ -74,6 +135,36 @@ enable_export = true
 
 language_suffix = ar
 
+# Record every rename in rename_journal.jsonl next to this file, so a run can
+# be reverted with --undo (true/false) - default: true
+
+rename_journal = true
+
+# Lock each folder while it is processed, so several runs (context menu, cron,
+# download hooks) never rename in the same folder at once - default: wait
+#   wait = wait for the other run to finish
+#   skip = leave the folder alone if another run is busy in it
+#   off  = no locking
+
+directory_lock = wait
+
+# Longest wait for a folder lock in seconds, then skip the folder
+# 0 = wait as long as it takes - default: 0
+
+lock_timeout = 0
+
+# How matched subtitles are put next to their video - default: move
+#   move = rename (subtitles on another drive are copied, then the original is deleted)
+#   copy = leave the original subtitle where it is and create the renamed copy
+
+placement = move
+
+# Record every processed folder (files, episodes, which episodes have
+# subtitles, renames) in library_catalog.sqlite next to this file, for
+# --coverage and --missing (true/false) - default: false
+
+library_catalog = false
+
 [FileFormats]
 # Video file extensions to process (comma-separated, no dots) - default: mkv, mp4
 # Examples: mkv, mp4, avi, webm
@@ -85,12 +176,119 @@ video_extensions = mkv, mp4
 
 subtitle_extensions = srt, ass
 
+# Folders skipped by --recursive, together with everything inside them
+# (comma-separated names, * and ? wildcards allowed, case is ignored)
+# Default: Sample, Extras, Featurettes, @eaDir, .git
+
+ignore_folders = Sample, Extras, Featurettes, @eaDir, .git
+
+[Performance]
+# Episode detection engine - default: legacy
+#   legacy   = try each episode pattern one at a time
+#   combined = all episode patterns compiled into one alternation regex
+#   lexer    = split the filename into tokens once, then apply the episode grammar
+# All engines return identical results; switch to compare speed on your files.
+
+episode_engine = legacy
+
+# Maximum number of parsed filenames kept in memory (least recently used are dropped)
+# 0 = unlimited - default: 10000
+
+episode_cache_size = 10000
+
+# Keep parsed episodes in episode_cache.sqlite next to this file and reuse them
+# on later runs (true/false) - default: false
+# Entries are discarded automatically when the episode patterns change.
+
+persistent_cache = false
+
+# Legacy engine only: learn the pattern used by the videos in a folder and
+# reuse it for similarly named files (true/false) - default: true
+# Results are always identical to the fixed pattern order.
+
+adaptive_pattern_order = true
+
+# Legacy engine only: skip patterns whose required text (e.g. "season", "ep",
+# "x", "-") does not appear in the filename (true/false) - default: true
+# Results are always identical; only impossible regex searches are skipped.
+
+pattern_prefilter = true
+
+# Number of renames run in parallel - default: 1 (one at a time)
+# Raise to 4-16 for folders on network shares (SMB/NFS) where each rename
+# waits on the server. Console and CSV output keep the same order.
+
+rename_workers = 1
+
+# Run scanning, episode parsing, renaming and reporting as overlapping
+# pipeline stages instead of one after another (true/false) - default: false
+# Output is identical; helps most on large folders on network shares.
+
+pipeline = false
+
+# Processes used by --recursive (library mode); each process works through
+# one folder at a time - default: 0 (one per available CPU core)
+
+library_workers = 0
+
+# Threads listing folders in parallel while --recursive searches the library
+# - default: 8. Raise to 16-32 for deep libraries on network shares (NAS).
+
+walker_threads = 8
+
+# Remember each folder's state after --recursive processed it (folder time,
+# number of entries, video and subtitle names) in folder_snapshots.json next
+# to this file, and skip folders unchanged since then (true/false)
+# - default: true. Use --force to process every folder anyway.
+
+folder_snapshots = true
+
+# Keep a hidden manifest (.rename_subtitles.manifest) in each folder with the
+# episode parsed from every video and subtitle, so the next run only parses
+# files that are new or changed (true/false) - default: false
+
+episode_manifest = false
+
+[Patterns]
+# Extra episode patterns, e.g. for a release group the built-in patterns miss.
+# Format: name = priority: regex
+#   priority = slot in the built-in pattern table: 0 = tried before every
+#              built-in pattern, 25 or more = tried after all of them.
+#              Patterns sharing a slot keep their order in this file.
+#   regex    = Python regex with two capture groups (season, episode) or one
+#              group (episode, season 1 assumed). Groups must capture digits
+#              only and must not be optional. Start with (?i) to ignore case.
+#              Named groups (?P<name>...) and backreferences such as \\1 are
+#              not supported.
+# Invalid patterns, and patterns with nested repeats such as (\\d+)+ that can
+# backtrack catastrophically, are skipped with a warning.
+# Example:
+#   bracketed = 0: \\[(\\d{1,2})\\.(\\d{1,3})\\]
+
 # ============================================================================
 # IMPORTANT: Invalid or missing config values will use ALL default values:
 #   - enable_export = true
 #   - language_suffix = ar
+#   - rename_journal = true
+#   - directory_lock = wait
+#   - lock_timeout = 0
+#   - placement = move
+#   - library_catalog = false
 #   - video_extensions = mkv, mp4
 #   - subtitle_extensions = srt, ass
+#   - ignore_folders = Sample, Extras, Featurettes, @eaDir, .git
+#   - episode_engine = legacy
+#   - episode_cache_size = 10000
+#   - persistent_cache = false
+#   - adaptive_pattern_order = true
+#   - pattern_prefilter = true
+#   - rename_workers = 1
+#   - pipeline = false
+#   - library_workers = 0
+#   - walker_threads = 8
+#   - folder_snapshots = true
+#   - episode_manifest = false
+#   - [Patterns]: none (built-in episode patterns only)
 # ============================================================================
 """
     
@@ -100,6 +298,190 @@ subtitle_extensions = srt, ass
     print(f"Created default config.ini at: {config_path}")
     print("Edit this file to customize script behavior.")
 
+# Global inline flags ("(?i)") a [Patterns] regex may start with
+EXTRA_PATTERN_FLAGS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL}
+GLOBAL_FLAGS_PREFIX = re.compile(r'^\(\?([a-zA-Z]+)\)')
+
+def _season_episode_formatter(m):
+    return (m.group(1).zfill(2), m.group(2).zfill(2))
+
+def _episode_only_formatter(m):
+    return ("01", m.group(1).zfill(2))
+
+def _captures_digits_only(items):
+    """True if a parsed regex fragment can only match one or more decimal digits."""
+    for op, argument in items:
+        op_name = str(op)
+        if op_name == 'LITERAL':
+            if not chr(argument).isdecimal():
+                return False
+        elif op_name == 'IN':
+            for member_op, member in argument:
+                member_name = str(member_op)
+                if member_name == 'CATEGORY' and str(member) == 'CATEGORY_DIGIT':
+                    continue
+                if member_name == 'LITERAL' and chr(member).isdecimal():
+                    continue
+                if member_name == 'RANGE' and all(chr(code).isdecimal() for code in range(member[0], member[1] + 1)):
+                    continue
+                return False
+        elif op_name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            if not _captures_digits_only(argument[2]):
+                return False
+        elif op_name == 'SUBPATTERN' and argument[0] is None:
+            if not _captures_digits_only(argument[-1]):
+                return False
+        else:
+            return False
+    return True
+
+def _has_nested_repeat(items, inside_repeat=False):
+    """
+    True if a backtracking repeat sits inside another repeat, e.g. (\\d+)+ or (a*b?)*.
+    
+    Nested repeats are what makes a regex backtrack exponentially on names
+    that almost match. Possessive repeats and atomic groups never backtrack
+    into their contents, so they are allowed.
+    """
+    for op, argument in items:
+        op_name = str(op)
+        if op_name in ('MAX_REPEAT', 'MIN_REPEAT'):
+            repeats = argument[1] > 1
+            if repeats and inside_repeat:
+                return True
+            if _has_nested_repeat(argument[2], inside_repeat or repeats):
+                return True
+        elif op_name == 'SUBPATTERN':
+            if _has_nested_repeat(argument[-1], inside_repeat):
+                return True
+        elif op_name == 'BRANCH':
+            if any(_has_nested_repeat(branch, inside_repeat) for branch in argument[1]):
+                return True
+        elif op_name in ('ASSERT', 'ASSERT_NOT'):
+            if _has_nested_repeat(argument[1], inside_repeat):
+                return True
+    return False
+
+def _top_level_captures(items):
+    """Capture group bodies that always take part in a match (not inside repeats, alternations or lookarounds)."""
+    captures = []
+    for op, argument in items:
+        if str(op) == 'SUBPATTERN':
+            if argument[0] is not None:
+                captures.append(argument[-1])
+            else:
+                captures.extend(_top_level_captures(argument[-1]))
+    return captures
+
+def _references_groups(items):
+    """True if a parsed regex fragment contains a backreference or a group-conditional (?(1)...)."""
+    for op, argument in items:
+        if str(op) in ('GROUPREF', 'GROUPREF_EXISTS'):
+            return True
+        parts = argument if isinstance(argument, (tuple, list)) else (argument,)
+        for part in parts:
+            if isinstance(part, sre_parse.SubPattern) and _references_groups(part):
+                return True
+            if isinstance(part, list) and any(isinstance(branch, sre_parse.SubPattern) and _references_groups(branch)
+                                              for branch in part):
+                return True
+    return False
+
+def compile_extra_pattern(regex):
+    """
+    Compile and check one [Patterns] regex.
+    
+    Args:
+        regex: Regex source from config.ini (may start with (?i), (?m) or (?s))
+        
+    Returns:
+        Tuple of (compiled pattern, formatter), or (None, reason) if the regex is rejected
+    """
+    flags = 0
+    prefix = GLOBAL_FLAGS_PREFIX.match(regex)
+    if prefix:
+        letters = prefix.group(1)
+        unsupported = sorted(set(letters) - set(EXTRA_PATTERN_FLAGS))
+        if unsupported:
+            return None, f"unsupported inline flag(s) {', '.join(unsupported)} (allowed: i, m, s)"
+        for letter in letters:
+            flags |= EXTRA_PATTERN_FLAGS[letter]
+        regex = regex[prefix.end():]
+    
+    try:
+        pattern = re.compile(regex, flags)
+        tree = sre_parse.parse(regex, flags)
+    except (re.error, OverflowError, RecursionError) as e:
+        return None, f"invalid regex ({e})"
+    
+    # The combined engine joins every pattern into one regex, where group names
+    # would clash and group numbers shift, so neither may be relied on
+    if pattern.groupindex:
+        return None, "named groups (?P<name>...) are not supported - use plain (...) groups"
+    if _references_groups(tree):
+        return None, "backreferences such as \\1 or (?P=name) are not supported"
+    
+    if _has_nested_repeat(tree):
+        return None, "nested repeats can backtrack catastrophically - use a possessive (++) or atomic group instead"
+    
+    captures = _top_level_captures(tree)
+    if pattern.groups not in (1, 2) or len(captures) != pattern.groups:
+        return None, "needs one (episode) or two (season, episode) capture groups that are not optional"
+    for body in captures:
+        if not _captures_digits_only(body) or body.getwidth()[0] == 0:
+            return None, "capture groups must match one or more digits only"
+    
+    return pattern, _season_episode_formatter if pattern.groups == 2 else _episode_only_formatter
+
+def validate_extra_patterns(entries):
+    """
+    Validate the [Patterns] section of config.ini.
+    
+    Args:
+        entries: List of (name, "priority: regex") pairs in file order
+        
+    Returns:
+        Tuple of (name, priority, compiled pattern, formatter) for every accepted entry
+    """
+    accepted = []
+    for name, value in entries:
+        name, value = str(name), str(value)
+        priority_text, separator, regex = value.partition(':')
+        priority_text, regex = priority_text.strip(), regex.strip()
+        if not separator or not priority_text.isdigit() or not regex:
+            print(f"[WARNING] Invalid episode pattern '{name}': '{value}' - skipping")
+            print("  Valid: name = priority: regex (e.g. bracketed = 0: \\[(\\d+)\\.(\\d+)\\])")
+            continue
+        pattern, formatter = compile_extra_pattern(regex)
+        if pattern is None:
+            print(f"[WARNING] Rejected episode pattern '{name}': {formatter} - skipping")
+            continue
+        accepted.append((name, int(priority_text), pattern, formatter))
+    
+    return tuple(accepted)
+
+def merge_episode_patterns(builtin_patterns, extra_patterns):
+    """
+    Insert validated [Patterns] entries into the built-in pattern table.
+    
+    Args:
+        builtin_patterns: List of (compiled_pattern, formatter) tuples
+        extra_patterns: Entries from validate_extra_patterns()
+        
+    Returns:
+        New list of (compiled_pattern, formatter) tuples in priority order
+    """
+    slots = defaultdict(list)
+    for _, priority, pattern, formatter in extra_patterns:
+        slots[min(priority, len(builtin_patterns))].append((pattern, formatter))
+    
+    merged = []
+    for index, entry in enumerate(builtin_patterns):
+        merged.extend(slots.get(index, ()))
+        merged.append(entry)
+    merged.extend(slots.get(len(builtin_patterns), ()))
+    return merged
+
 def validate_configuration(config_dict):
     """
     Validate and normalize configuration values.
@@ -116,6 +498,43 @@ def validate_configuration(config_dict):
     export_val = str(config_dict.get('enable_export', 'true')).lower()
     validated['enable_export'] = export_val in ('true', 'yes', '1', 'on')
     
+    # Validate rename_journal
+    journal_val = str(config_dict.get('rename_journal', 'true')).lower()
+    validated['rename_journal'] = journal_val in ('true', 'yes', '1', 'on')
+    
+    # Validate directory_lock
+    lock_policy = str(config_dict.get('directory_lock', 'wait')).strip().lower()
+    if lock_policy in DIRECTORY_LOCK_CHOICES:
+        validated['directory_lock'] = lock_policy
+    else:
+        print(f"[WARNING] Invalid directory_lock: '{lock_policy}' - using default: wait")
+        print(f"  Valid: {', '.join(DIRECTORY_LOCK_CHOICES)}")
+        validated['directory_lock'] = 'wait'
+    
+    # Validate lock_timeout
+    lock_timeout = str(config_dict.get('lock_timeout', '0')).strip()
+    try:
+        validated['lock_timeout'] = float(lock_timeout)
+        if validated['lock_timeout'] < 0:
+            raise ValueError(lock_timeout)
+    except ValueError:
+        print(f"[WARNING] Invalid lock_timeout: '{lock_timeout}' - using default: 0")
+        print("  Valid: seconds (0 = wait as long as it takes)")
+        validated['lock_timeout'] = 0.0
+    
+    # Validate placement
+    placement = str(config_dict.get('placement', 'move')).strip().lower()
+    if placement in PLACEMENT_CHOICES:
+        validated['placement'] = placement
+    else:
+        print(f"[WARNING] Invalid placement: '{placement}' - using default: move")
+        print(f"  Valid: {', '.join(PLACEMENT_CHOICES)}")
+        validated['placement'] = 'move'
+    
+    # Validate library_catalog
+    catalog_val = str(config_dict.get('library_catalog', 'false')).lower()
+    validated['library_catalog'] = catalog_val in ('true', 'yes', '1', 'on')
+    
     # Validate language_suffix
     suffix = config_dict.get('language_suffix', 'ar').strip()
     # Remove leading dot if present
@@ -152,6 +571,85 @@ def validate_configuration(config_dict):
         print("[WARNING] No valid subtitle extensions - using defaults: srt, ass")
         validated['subtitle_extensions'] = ['srt', 'ass']
     
+    # Validate ignore_folders (empty = search every folder)
+    ignore_folders = config_dict.get('ignore_folders', ', '.join(DEFAULT_CONFIG['ignore_folders']))
+    validated['ignore_folders'] = [name.strip() for name in ignore_folders.split(',') if name.strip()]
+    
+    # Validate episode_engine
+    engine = str(config_dict.get('episode_engine', 'legacy')).strip().lower()
+    if engine in EPISODE_ENGINE_CHOICES:
+        validated['episode_engine'] = engine
+    else:
+        print(f"[WARNING] Invalid episode_engine: '{engine}' - using default: legacy")
+        print(f"  Valid: {', '.join(EPISODE_ENGINE_CHOICES)}")
+        validated['episode_engine'] = 'legacy'
+    
+    # Validate episode_cache_size
+    cache_size = str(config_dict.get('episode_cache_size', '10000')).strip()
+    if cache_size.isdigit():
+        validated['episode_cache_size'] = int(cache_size)
+    else:
+        print(f"[WARNING] Invalid episode_cache_size: '{cache_size}' - using default: 10000")
+        print("  Valid: whole number of filenames (0 = unlimited)")
+        validated['episode_cache_size'] = 10000
+    
+    # Validate persistent_cache
+    persistent_val = str(config_dict.get('persistent_cache', 'false')).lower()
+    validated['persistent_cache'] = persistent_val in ('true', 'yes', '1', 'on')
+    
+    # Validate adaptive_pattern_order
+    adaptive_val = str(config_dict.get('adaptive_pattern_order', 'true')).lower()
+    validated['adaptive_pattern_order'] = adaptive_val in ('true', 'yes', '1', 'on')
+    
+    # Validate pattern_prefilter
+    prefilter_val = str(config_dict.get('pattern_prefilter', 'true')).lower()
+    validated['pattern_prefilter'] = prefilter_val in ('true', 'yes', '1', 'on')
+    
+    # Validate rename_workers
+    workers = str(config_dict.get('rename_workers', '1')).strip()
+    if workers.isdigit() and 1 <= int(workers) <= MAX_RENAME_WORKERS:
+        validated['rename_workers'] = int(workers)
+    else:
+        print(f"[WARNING] Invalid rename_workers: '{workers}' - using default: 1")
+        print(f"  Valid: whole number from 1 to {MAX_RENAME_WORKERS}")
+        validated['rename_workers'] = 1
+    
+    # Validate pipeline
+    pipeline_val = str(config_dict.get('pipeline', 'false')).lower()
+    validated['pipeline'] = pipeline_val in ('true', 'yes', '1', 'on')
+    
+    # Validate library_workers
+    library_workers = str(config_dict.get('library_workers', '0')).strip()
+    if library_workers.isdigit() and int(library_workers) <= MAX_LIBRARY_WORKERS:
+        validated['library_workers'] = int(library_workers)
+    else:
+        print(f"[WARNING] Invalid library_workers: '{library_workers}' - using default: 0")
+        print(f"  Valid: whole number from 0 (one per CPU core) to {MAX_LIBRARY_WORKERS}")
+        validated['library_workers'] = 0
+    
+    # Validate walker_threads
+    walker_threads = str(config_dict.get('walker_threads', '8')).strip()
+    if walker_threads.isdigit() and 1 <= int(walker_threads) <= MAX_WALKER_THREADS:
+        validated['walker_threads'] = int(walker_threads)
+    else:
+        print(f"[WARNING] Invalid walker_threads: '{walker_threads}' - using default: 8")
+        print(f"  Valid: whole number from 1 to {MAX_WALKER_THREADS}")
+        validated['walker_threads'] = 8
+    
+    # Validate folder_snapshots
+    snapshots_val = str(config_dict.get('folder_snapshots', 'true')).lower()
+    validated['folder_snapshots'] = snapshots_val in ('true', 'yes', '1', 'on')
+    
+    # Validate episode_manifest
+    manifest_val = str(config_dict.get('episode_manifest', 'false')).lower()
+    validated['episode_manifest'] = manifest_val in ('true', 'yes', '1', 'on')
+    
+    # Validate extra episode patterns ([Patterns] section)
+    validated['extra_patterns'] = validate_extra_patterns(config_dict.get('extra_patterns', ()))
+    if validated['extra_patterns'] and validated['episode_engine'] == 'lexer':
+        print("[WARNING] The lexer engine only knows the built-in episode patterns - using legacy engine")
+        validated['episode_engine'] = 'legacy'
+    
     return validated
 
 def load_configuration():
@@ -184,8 +682,27 @@ def load_configuration():
         config_dict = {
             'enable_export': config.get('General', 'enable_export', fallback='true'),
             'language_suffix': config.get('General', 'language_suffix', fallback='ar'),
+            'rename_journal': config.get('General', 'rename_journal', fallback='true'),
+            'directory_lock': config.get('General', 'directory_lock', fallback='wait'),
+            'lock_timeout': config.get('General', 'lock_timeout', fallback='0'),
+            'placement': config.get('General', 'placement', fallback='move'),
+            'library_catalog': config.get('General', 'library_catalog', fallback='false'),
             'video_extensions': config.get('FileFormats', 'video_extensions', fallback='mkv, mp4'),
-            'subtitle_extensions': config.get('FileFormats', 'subtitle_extensions', fallback='srt, ass')
+            'subtitle_extensions': config.get('FileFormats', 'subtitle_extensions', fallback='srt, ass'),
+            'ignore_folders': config.get('FileFormats', 'ignore_folders',
+                                         fallback='Sample, Extras, Featurettes, @eaDir, .git'),
+            'episode_engine': config.get('Performance', 'episode_engine', fallback='legacy'),
+            'episode_cache_size': config.get('Performance', 'episode_cache_size', fallback='10000'),
+            'persistent_cache': config.get('Performance', 'persistent_cache', fallback='false'),
+            'adaptive_pattern_order': config.get('Performance', 'adaptive_pattern_order', fallback='true'),
+            'pattern_prefilter': config.get('Performance', 'pattern_prefilter', fallback='true'),
+            'rename_workers': config.get('Performance', 'rename_workers', fallback='1'),
+            'pipeline': config.get('Performance', 'pipeline', fallback='false'),
+            'library_workers': config.get('Performance', 'library_workers', fallback='0'),
+            'walker_threads': config.get('Performance', 'walker_threads', fallback='8'),
+            'folder_snapshots': config.get('Performance', 'folder_snapshots', fallback='true'),
+            'episode_manifest': config.get('Performance', 'episode_manifest', fallback='false'),
+            'extra_patterns': config.items('Patterns', raw=True) if config.has_section('Patterns') else ()
         }
         
         # Validate and return
@@ -199,7 +716,27 @@ def load_configuration():
             print(f"  Language suffix: (none - omitted from filenames)")
         print(f"  Video formats: {', '.join(validated['video_extensions'])}")
         print(f"  Subtitle formats: {', '.join(validated['subtitle_extensions'])}")
+        print(f"  Ignored folders: {', '.join(validated['ignore_folders']) or '(none)'}")
         print(f"  CSV export: {'enabled' if validated['enable_export'] else 'disabled'}")
+        print(f"  Rename journal: {'enabled' if validated['rename_journal'] else 'disabled'}")
+        lock_timeout = validated['lock_timeout']
+        print(f"  Directory lock: {validated['directory_lock']}"
+              f"{f' (timeout {lock_timeout:g}s)' if lock_timeout and validated['directory_lock'] == 'wait' else ''}")
+        print(f"  Placement: {validated['placement']}")
+        print(f"  Library catalog: {'enabled' if validated['library_catalog'] else 'disabled'}")
+        print(f"  Episode engine: {validated['episode_engine']}")
+        print(f"  Episode cache size: {validated['episode_cache_size'] or 'unlimited'}")
+        print(f"  Persistent cache: {'enabled' if validated['persistent_cache'] else 'disabled'}")
+        print(f"  Adaptive pattern order: {'enabled' if validated['adaptive_pattern_order'] else 'disabled'}")
+        print(f"  Pattern prefilter: {'enabled' if validated['pattern_prefilter'] else 'disabled'}")
+        print(f"  Rename workers: {validated['rename_workers']}")
+        print(f"  Pipeline: {'enabled' if validated['pipeline'] else 'disabled'}")
+        print(f"  Library workers: {validated['library_workers'] or 'one per CPU core'}")
+        print(f"  Walker threads: {validated['walker_threads']}")
+        print(f"  Folder snapshots: {'enabled' if validated['folder_snapshots'] else 'disabled'}")
+        print(f"  Episode manifest: {'enabled' if validated['episode_manifest'] else 'disabled'}")
+        if validated['extra_patterns']:
+            print(f"  Extra episode patterns: {', '.join(name for name, _, _, _ in validated['extra_patterns'])}")
         
         return validated
         
@@ -214,7 +751,7 @@ CONFIG = load_configuration()
 # Pre-compiled regex patterns for episode detection
 # Patterns are tried in order, with most common formats first for faster matching
 # Each pattern extracts season and episode numbers, normalizing them to S##E## format
-EPISODE_PATTERNS = [
+BUILTIN_EPISODE_PATTERNS = [
     (re.compile(r'[Ss](\d+)[Ee](\d+)'), lambda m: (m.group(1).zfill(2), m.group(2).zfill(2))),
     (re.compile(r'(?:^|[._\s-])(\d{1,2})[xX](\d+)(?=[._\s-]|$)'), lambda m: (m.group(1).zfill(2), m.group(2).zfill(2))),
     # NEW: S## - ## format (e.g., S01 - 05, S2 - 10)
@@ -251,6 +788,69 @@ EPISODE_PATTERNS = [
     (re.compile(r'-\s*(\d+)'), lambda m: ("01", m.group(1).zfill(2))),
 ]
 
+# Built-in patterns plus the [Patterns] entries from config.ini, in priority order
+EPISODE_PATTERNS = merge_episode_patterns(BUILTIN_EPISODE_PATTERNS, CONFIG['extra_patterns'])
+
+class EpisodeNumber:
+    """
+    Parsed season/episode pair, kept as integers from parser to report.
+    
+    Matching code compares .key (season, episode) directly instead of
+    re-parsing S##E## strings. The digit widths are kept so that str()
+    renders exactly the label the filename produced ('S02E015' stays
+    distinct from 'S02E15'); the label is only built at output time.
+    """
+    __slots__ = ('season', 'episode', 'season_width', 'episode_width', '_label')
+    
+    def __init__(self, season, episode, season_width=2, episode_width=2, label=None):
+        self.season = season
+        self.episode = episode
+        self.season_width = season_width
+        self.episode_width = episode_width
+        self._label = label  # Only set for non-ASCII digits, which int() cannot round-trip
+    
+    @classmethod
+    def from_digits(cls, season, episode):
+        """
+        Build a record from the zero-padded digit strings a pattern formatter returns.
+        
+        Args:
+            season: Season digits (e.g. '01')
+            episode: Episode digits (e.g. '015')
+        """
+        label = None if (season + episode).isascii() else f"S{season}E{episode}"
+        return cls(int(season), int(episode), len(season), len(episode), label)
+    
+    @classmethod
+    def from_label(cls, label):
+        """Rebuild a record from its S##E## label (e.g. a persistent cache entry)."""
+        season, _, episode = label[1:].partition('E')
+        return cls.from_digits(season, episode)
+    
+    @property
+    def key(self):
+        """(season, episode) integers, ignoring zero padding."""
+        return (self.season, self.episode)
+    
+    def _identity(self):
+        return (self.season, self.episode, self.season_width, self.episode_width, self._label)
+    
+    def __eq__(self, other):
+        if not isinstance(other, EpisodeNumber):
+            return NotImplemented
+        return self._identity() == other._identity()
+    
+    def __hash__(self):
+        return hash(self._identity())
+    
+    def __str__(self):
+        if self._label is not None:
+            return self._label
+        return f"S{self.season:0{self.season_width}d}E{self.episode:0{self.episode_width}d}"
+    
+    def __repr__(self):
+        return f"EpisodeNumber('{self}')"
+
 # Pre-compiled utility regex patterns for filename processing
 PROBLEMATIC_CHARS = re.compile(r'[<>:"/\|?*]')  # Invalid characters for filenames
 SUBTITLE_SUFFIX_PATTERN = re.compile(r'[._\-\s]*[Ss]ub(title)?[._\-\s]*', re.IGNORECASE)  # Remove "sub" markers
@@ -269,169 +869,2850 @@ COMMON_INDICATORS = {
     'sync', 'dub', 'dubbed', 'sdh', 'cc'
 }
 
-# Performance optimization: Episode number cache
-_episode_cache = {}
+# Inline flag letters used to scope each pattern's flags inside the combined regex
+_INLINE_FLAG_LETTERS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x'))
 
-def get_episode_number(filename):
+class _CombinedMatchView:
     """
-    Extract episode information from filename and normalize to S##E## format.
+    Expose one alternative of a combined match with its original group numbering.
+    
+    Lets the EPISODE_PATTERNS formatters (which call m.group(1), m.group(2))
+    run unchanged against a match produced by the combined regex.
+    """
+    __slots__ = ('_match', '_offset')
+    
+    def __init__(self, match, offset):
+        self._match = match
+        self._offset = offset
+    
+    def group(self, index=0):
+        if index == 0:
+            return self._match.group(0)
+        return self._match.group(self._offset + index)
+
+class CombinedEpisodeMatcher:
+    """
+    Match an ordered episode pattern table with one alternation regex.
+    
+    A plain search() over the alternation "p0|p1|...|pN" returns the leftmost
+    position where ANY pattern matches, while the legacy loop wants the first
+    pattern in table order that matches ANYWHERE. The matcher bridges the two
+    with a priority descent: after the alternation finds pattern i at position
+    q, no pattern before i can match at or before q, so the search resumes at
+    q + 1 using only the alternatives before i. Each step strictly raises the
+    priority of the best match found, and a name usually settles in one or two
+    regex calls instead of one call per pattern.
+    
+    The head pattern is tried on its own first: it is the most common format
+    and a single-pattern search benefits most from the engine's prefix scan.
+    """
+    
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: List of (compiled_pattern, formatter) tuples in priority order
+        """
+        self.patterns = list(patterns)
+        self._alternatives = []
+        self._group_owner = {}      # Combined group index -> pattern index
+        self._group_offsets = []    # Pattern index -> combined group offset
+        self._stages = {}           # Number of leading alternatives -> compiled regex
+        
+        group_offset = 0
+        for pattern_index, (pattern, _) in enumerate(self.patterns):
+            flag_letters = ''.join(letter for flag, letter in _INLINE_FLAG_LETTERS if pattern.flags & flag)
+            source = pattern.pattern
+            extra_groups = 0
+            if pattern.groups == 0:
+                # Alternatives are identified through their groups, so every one needs at least one
+                source = f"({source})"
+                extra_groups = 1
+            self._alternatives.append(f"(?{flag_letters}:{source})" if flag_letters else f"(?:{source})")
+            self._group_offsets.append(group_offset + extra_groups)
+            for group_index in range(1, pattern.groups + extra_groups + 1):
+                self._group_owner[group_offset + group_index] = pattern_index
+            group_offset += pattern.groups + extra_groups
+    
+    def _stage(self, count):
+        """Return the alternation of the first `count` patterns, compiling it on first use."""
+        regex = self._stages.get(count)
+        if regex is None:
+            regex = re.compile('|'.join(self._alternatives[:count]))
+            self._stages[count] = regex
+        return regex
+    
+    def search(self, filename):
+        """
+        Find the highest-priority pattern that matches anywhere in filename.
+        
+        Args:
+            filename: The filename to parse
+            
+        Returns:
+            Tuple of (pattern index, match-like object for that pattern's
+            formatter, number of regex calls made); index and match are None
+            if no pattern matches
+        """
+        if not self.patterns:
+            return None, None, 0
+        head_match = self.patterns[0][0].search(filename)
+        regex_calls = 1
+        if head_match:
+            return 0, head_match, regex_calls
+        
+        best = None
+        limit = len(self.patterns)
+        position = 0
+        while limit > 1:
+            match = self._stage(limit).search(filename, position)
+            regex_calls += 1
+            if not match:
+                break
+            pattern_index = self._group_owner[match.lastindex]
+            best = (pattern_index, match)
+            limit = pattern_index
+            position = match.start() + 1
+        
+        if best is None:
+            return None, None, regex_calls
+        pattern_index, match = best
+        return pattern_index, _CombinedMatchView(match, self._group_offsets[pattern_index]), regex_calls
+
+COMBINED_EPISODE_MATCHER = CombinedEpisodeMatcher(EPISODE_PATTERNS)
+
+# ============================================================================
+# TOKEN LEXER ENGINE
+# ============================================================================
+
+# Token kinds produced by tokenize_filename()
+TOKEN_DIGITS = 1    # Run of decimal digits (same set as regex \d)
+TOKEN_SPACE = 2     # Run of whitespace (same set as regex \s)
+TOKEN_SEP = 3       # Single '.', '_' or '-' separator
+TOKEN_WORD = 4      # Run of anything else (letters, brackets, ...)
+
+# One linear pass over the filename: every character belongs to exactly one token
+FILENAME_TOKEN_PATTERN = re.compile(r'(\d+)|(\s+)|([._-])|([^\d\s._-]+)')
+
+def _fold_like_regex(text):
+    """
+    Lowercase text the way re.IGNORECASE compares characters.
+    
+    The regex engine uses simple (one character) lowercase mappings plus a few
+    extra equivalences such as 'ſ' == 's' and 'ı' == 'i', so the folded text
+    always has the same length as the original.
+    """
+    if text.isascii():
+        return text.lower()
+    return ''.join(char.lower()[:1] for char in text).replace('ſ', 's').replace('ı', 'i')
+
+def tokenize_filename(filename):
+    """
+    Split a filename into lexer tokens.
     
     Args:
-        filename: The filename to parse
+        filename: The filename to tokenize
         
     Returns:
-        Normalized episode string (e.g., 'S01E05') or None if no pattern found
+        List of (kind, text, folded_text) tuples in filename order
         
-    Examples:
-        'Show.S01E05.mkv' -> 'S01E05'
-        'Show.2x10.mkv' -> 'S02E10'
-        'Show - 15.mkv' -> 'S01E15' (assumes Season 1)
+    Example:
+        'Show.2x10' -> WORD 'Show', SEP '.', DIGITS '2', WORD 'x', DIGITS '10'
     """
-    for pattern, formatter in EPISODE_PATTERNS:
-        match = pattern.search(filename)
-        if match:
-            season, episode = formatter(match)
-            return f"S{season}E{episode}"
-    return None
+    tokens = []
+    for match in FILENAME_TOKEN_PATTERN.finditer(filename):
+        kind = match.lastindex
+        text = match.group(kind)
+        tokens.append((kind, text, _fold_like_regex(text) if kind == TOKEN_WORD else text))
+    return tokens
 
-def get_episode_number_cached(filename):
-    """Cached wrapper - extracts episode once per filename."""
-    if filename not in _episode_cache:
-        _episode_cache[filename] = get_episode_number(filename)
-    return _episode_cache[filename]
+# Ordinal suffixes accepted after a season number (1st, 2nd, 3rd, 4th)
+_ORDINAL_SUFFIXES = ('st', 'nd', 'rd', 'th')
+_EPISODE_WORDS = ('ep', 'episode')
+
+# Season/episode grammar over the token stream, one rule per EPISODE_PATTERNS entry
+# and in the same priority order. Each rule is a sequence of steps:
+#   ('before',)              previous token is a separator/space, or start of name
+#   ('after',)               next token is a separator/space, or end of name
+#   ('word_end', suffixes)   word ending with a suffix (case-sensitive)
+#   ('word_end_i', suffixes) word ending with a suffix (case-insensitive)
+#   ('word', words)          word equal to one of words (case-sensitive)
+#   ('word_i', words)        word equal to one of words (case-insensitive)
+#   ('digits', max_len)      capture a whole digit run (max_len None = any length)
+#   ('digits_tail', n)       capture the last n digits of a run
+#   ('space',) / ('space?',) required / optional whitespace run
+#   ('sep', char)            single separator character
+#   ('seps',)                any number of separators and whitespace runs
+# Rules with one capture assume Season 1, like their regex counterparts.
+LEXER_RULES = [
+    # [Ss](\d+)[Ee](\d+)
+    (('word_end', ('S', 's')), ('digits', None), ('word', ('E', 'e')), ('digits', None)),
+    # (?:^|[._\s-])(\d{1,2})[xX](\d+)(?=[._\s-]|$)
+    (('before',), ('digits', 2), ('word', ('x', 'X')), ('digits', None), ('after',)),
+    # S## - ##
+    (('word_end_i', ('s',)), ('digits', 2), ('space?',), ('sep', '-'), ('space?',), ('digits', None)),
+    # S## - E##
+    (('word_end_i', ('s',)), ('digits', 2), ('space?',), ('sep', '-'), ('space?',), ('word_i', ('e',)), ('digits', None)),
+    # S## - EP##
+    (('word_end_i', ('s',)), ('digits', 2), ('space?',), ('sep', '-'), ('space?',), ('word_i', ('ep',)), ('digits', None)),
+    # 1st Season - 05
+    (('digits_tail', 2), ('word_i', _ORDINAL_SUFFIXES), ('space',), ('word_i', ('season',)),
+     ('space?',), ('sep', '-'), ('space?',), ('digits', None)),
+    # 3rd Season Episode 8
+    (('digits_tail', 2), ('word_i', _ORDINAL_SUFFIXES), ('space',), ('word_i', ('season',)),
+     ('space',), ('word_i', ('episode',)), ('space',), ('digits', None)),
+    # 2nd Season E10
+    (('digits_tail', 2), ('word_i', _ORDINAL_SUFFIXES), ('space',), ('word_i', ('season',)),
+     ('space',), ('word_i', ('e',)), ('space?',), ('digits', None)),
+    # 2nd Season EP10
+    (('digits_tail', 2), ('word_i', _ORDINAL_SUFFIXES), ('space',), ('word_i', ('season',)),
+     ('space',), ('word_i', ('ep',)), ('space?',), ('digits', None)),
+    # Season ## - ##
+    (('word_end_i', ('season',)), ('space',), ('digits', 2), ('space?',), ('sep', '-'), ('space?',), ('digits', None)),
+    # Season## - ##
+    (('word_end_i', ('season',)), ('digits', 2), ('space?',), ('sep', '-'), ('space?',), ('digits', None)),
+    # Season.##[sep]Episode.##
+    (('word_end_i', ('season',)), ('sep', '.'), ('digits', None), ('seps',), ('word_i', ('episode',)),
+     ('sep', '.'), ('digits', None)),
+    # S##[sep]Ep.## / S##[sep]Episode.##
+    (('word_end_i', ('s',)), ('digits', None), ('seps',), ('word_i', _EPISODE_WORDS), ('sep', '.'), ('digits', None)),
+    # S##Ep## / S##Episode##
+    (('word_end_i', ('s',)), ('digits', None), ('word_i', _EPISODE_WORDS), ('digits', None)),
+    # Season ## Episode ##
+    (('word_end_i', ('season',)), ('space',), ('digits', None), ('space',), ('word_i', ('episode',)),
+     ('space',), ('digits', None)),
+    # Season##Episode##
+    (('word_end_i', ('season',)), ('digits', None), ('word_i', ('episode',)), ('digits', None)),
+    # Season## Episode##
+    (('word_end_i', ('season',)), ('digits', None), ('space',), ('word_i', ('episode',)), ('digits', None)),
+    # Season## Ep##
+    (('word_end_i', ('season',)), ('digits', None), ('space',), ('word_i', _EPISODE_WORDS), ('digits', None)),
+    # Season##Ep##
+    (('word_end_i', ('season',)), ('digits', None), ('word_i', _EPISODE_WORDS), ('digits', None)),
+    # E## (Season 1)
+    (('before',), ('word', ('E', 'e')), ('digits', None), ('after',)),
+    # Season ##[sep]Ep ##
+    (('word_end_i', ('season',)), ('space',), ('digits', None), ('seps',), ('word_i', _EPISODE_WORDS),
+     ('space?',), ('digits', None)),
+    # Season##[sep]Ep##
+    (('word_end_i', ('season',)), ('digits', None), ('seps',), ('word_i', _EPISODE_WORDS), ('digits', None)),
+    # Ep## / Episode## (Season 1)
+    (('before',), ('word_i', _EPISODE_WORDS), ('digits', None), ('after',)),
+    # Season ## Ep ##
+    (('word_end_i', ('season',)), ('space',), ('digits', None), ('space',), ('word_i', _EPISODE_WORDS),
+     ('space?',), ('digits', None)),
+    # - ## (Season 1)
+    (('sep', '-'), ('space?',), ('digits', None)),
+]
 
-def extract_season_episode_numbers(episode_string):
+def _build_lexer_dispatch(rules):
     """
-    Parse normalized episode string to extract season and episode numbers.
+    Index rules by the token that starts them so each token only tries rules that can apply.
+    
+    Word-anchored rules are keyed by the (folded) last character of the words
+    they accept; digit- and separator-anchored rules by token kind.
     
-    Args:
-        episode_string: Episode string in S##E## format (e.g., 'S01E05')
-        
     Returns:
-        Tuple of (season_number, episode_number) as strings, or ("", "") if invalid
+        Dict mapping dispatch key to ascending list of rule indexes
     """
-    if not episode_string:
-        return "", ""
+    dispatch = defaultdict(list)
+    for rule_index, steps in enumerate(rules):
+        anchor = next(step for step in steps if step[0] != 'before')
+        operation, argument = anchor[0], anchor[1] if len(anchor) > 1 else None
+        if operation in ('word_end', 'word_end_i', 'word', 'word_i'):
+            keys = {(TOKEN_WORD, _fold_like_regex(word[-1])) for word in argument}
+        elif operation in ('digits', 'digits_tail'):
+            keys = {(TOKEN_DIGITS, None)}
+        else:
+            keys = {(TOKEN_SEP, argument)}
+        for key in keys:
+            dispatch[key].append(rule_index)
+    return dict(dispatch)
+
+LEXER_DISPATCH = _build_lexer_dispatch(LEXER_RULES)
+
+def _apply_lexer_rule(steps, tokens, position):
+    """
+    Try one grammar rule starting at tokens[position].
     
-    match = re.match(r'S(\d+)E(\d+)', episode_string)
-    if match:
-        return match.group(1), match.group(2)
-    return "", ""
+    Returns:
+        List of captured digit strings, or None if the rule does not match here
+    """
+    captures = []
+    index = position
+    count = len(tokens)
+    for step in steps:
+        operation = step[0]
+        if operation == 'before':
+            if index > 0 and tokens[index - 1][0] not in (TOKEN_SPACE, TOKEN_SEP):
+                return None
+            continue
+        if operation == 'after':
+            if index < count and tokens[index][0] not in (TOKEN_SPACE, TOKEN_SEP):
+                return None
+            continue
+        if operation == 'seps':
+            while index < count and tokens[index][0] in (TOKEN_SPACE, TOKEN_SEP):
+                index += 1
+            continue
+        if index >= count:
+            if operation == 'space?':
+                continue
+            return None
+        
+        kind, text, folded = tokens[index]
+        if operation == 'space?':
+            if kind == TOKEN_SPACE:
+                index += 1
+            continue
+        if operation == 'space':
+            if kind != TOKEN_SPACE:
+                return None
+        elif operation == 'sep':
+            if kind != TOKEN_SEP or text != step[1]:
+                return None
+        elif operation == 'digits':
+            if kind != TOKEN_DIGITS or (step[1] is not None and len(text) > step[1]):
+                return None
+            captures.append(text)
+        elif operation == 'digits_tail':
+            if kind != TOKEN_DIGITS:
+                return None
+            captures.append(text[-step[1]:])
+        elif kind != TOKEN_WORD:
+            return None
+        elif operation == 'word':
+            if text not in step[1]:
+                return None
+        elif operation == 'word_i':
+            if folded not in step[1]:
+                return None
+        elif operation == 'word_end':
+            if not text.endswith(step[1]):
+                return None
+        elif operation == 'word_end_i':
+            if not folded.endswith(step[1]):
+                return None
+        index += 1
+    return captures
 
-def extract_base_name(filename):
+def get_episode_number_lexer(filename):
     """
-    Extract and clean the base filename for comparison.
+    Extract episode information with the token lexer and LEXER_RULES grammar.
     
-    Removes file extension and converts separators (., _, -) to spaces for
-    better word-based matching in movie mode.
+    Tokenizes the filename once, then walks the tokens left to right trying
+    only the rules that can start at each token. A rule's first hit is its
+    leftmost match, and only higher-priority rules are tried after a hit, so
+    the result follows the same first-match priority as EPISODE_PATTERNS while
+    the cost grows with the number of tokens rather than the number of rules.
     
     Args:
-        filename: The filename to process
+        filename: The filename to parse
         
     Returns:
-        Cleaned base name with spaces instead of separators
+        EpisodeNumber record (renders as e.g. 'S01E05') or None if no rule matches
     """
-    base_name = os.path.splitext(filename)[0]
-    base_name = BASE_NAME_CLEANUP.sub(' ', base_name)
-    return base_name.strip()
+    tokens = tokenize_filename(filename)
+    best_index = len(LEXER_RULES)
+    best_captures = None
+    rule_attempts = 0
+    
+    for position, (kind, text, folded) in enumerate(tokens):
+        if kind == TOKEN_WORD:
+            key = (kind, folded[-1])
+        elif kind == TOKEN_DIGITS:
+            key = (kind, None)
+        elif kind == TOKEN_SEP:
+            key = (kind, text)
+        else:
+            continue
+        for rule_index in LEXER_DISPATCH.get(key, ()):
+            if rule_index >= best_index:
+                break
+            rule_attempts += 1
+            captures = _apply_lexer_rule(LEXER_RULES[rule_index], tokens, position)
+            if captures is not None:
+                best_index, best_captures = rule_index, captures
+                break
+        if best_index == 0:
+            break
+    
+    if best_captures is None:
+        _pattern_telemetry.record(None, rule_attempts)
+        return None
+    _pattern_telemetry.record(best_index, rule_attempts)
+    if len(best_captures) == 1:
+        season, episode = "01", best_captures[0]
+    else:
+        season, episode = best_captures
+    return EpisodeNumber.from_digits(season.zfill(2), episode.zfill(2))
 
-def find_movie_subtitle_match(video_files, subtitle_files):
+class PatternTelemetry:
     """
-    Match a single movie file with a single subtitle file based on title similarity.
+    Counters describing how the episode patterns behave on real filenames.
     
-    Uses two matching strategies:
-    1. Year matching: If both files contain the same 4-digit year, they're considered a match
-    2. Word overlap: Compares common words after removing quality indicators (720p, x264, etc.)
+    Records, for every parse, which EPISODE_PATTERNS entry produced the result
+    and how many attempts the engine needed (pattern searches for the legacy
+    engine, regex calls for the combined engine, rule checks for the lexer).
+    """
     
-    Args:
-        video_files: List of video filenames (must contain exactly 1 file)
-        subtitle_files: List of subtitle filenames (must contain exactly 1 file)
+    def __init__(self, pattern_count):
+        self.hits = [0] * pattern_count
+        self.no_match = 0
+        self.parses = 0
+        self.attempts = 0
+    
+    def record(self, pattern_index, attempts):
+        """
+        Record one parse.
         
-    Returns:
-        Tuple of (video_file, subtitle_file) if match found, None otherwise
+        Args:
+            pattern_index: Index of the winning pattern, or None if nothing matched
+            attempts: Attempts the engine made for this filename
+        """
+        self.parses += 1
+        self.attempts += attempts
+        if pattern_index is None:
+            self.no_match += 1
+        else:
+            self.hits[pattern_index] += 1
+    
+    def average_attempts(self):
+        """Average attempts per parsed filename (0.0 before any parse)."""
+        return self.attempts / self.parses if self.parses else 0.0
+    
+    def top_patterns(self, limit=5):
+        """
+        Most frequently matching patterns.
+        
+        Returns:
+            List of (pattern index, hits) pairs, most hits first
+        """
+        ranked = sorted((index for index, hits in enumerate(self.hits) if hits),
+                        key=lambda index: (-self.hits[index], index))
+        return [(index, self.hits[index]) for index in ranked[:limit]]
+    
+    def summary(self):
+        """One-line summary for the PERFORMANCE section."""
+        top = ', '.join(f"#{index} x{hits}" for index, hits in self.top_patterns())
+        return (f"{self.parses} parses | {self.average_attempts():.1f} attempts/filename | "
+                f"{self.no_match} without match | top patterns: {top if top else '(none)'}")
+
+# Per-pattern hit and attempt counters for the current run
+_pattern_telemetry = PatternTelemetry(len(EPISODE_PATTERNS))
+
+class EpisodeCache:
     """
-    if len(video_files) != 1 or len(subtitle_files) != 1:
-        return None
+    Size-bounded LRU cache of parsed EpisodeNumber records keyed by filename.
     
-    video_name = extract_base_name(video_files[0])
-    subtitle_name = extract_base_name(subtitle_files[0])
+    Keeps hit/miss/eviction counters so the cache size can be tuned against
+    a real library (see [Performance] episode_cache_size in config.ini).
+    """
     
-    # Extract release years if present in filenames
-    video_year_match = YEAR_PATTERN.search(video_files[0])
-    subtitle_year_match = YEAR_PATTERN.search(subtitle_files[0])
+    def __init__(self, max_size=10000):
+        """
+        Args:
+            max_size: Maximum number of entries kept (0 = unlimited)
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
     
-    video_year = video_year_match.group() if video_year_match else None
-    subtitle_year = subtitle_year_match.group() if subtitle_year_match else None
+    def __len__(self):
+        return len(self._entries)
     
-    # Split into words and filter out quality/format indicators for cleaner comparison
-    video_words = set(video_name.lower().split()) - COMMON_INDICATORS
-    subtitle_words = set(subtitle_name.lower().split()) - COMMON_INDICATORS
+    def lookup(self, filename):
+        """
+        Look up filename, counting a hit or a miss.
+        
+        Returns:
+            Tuple of (found, EpisodeNumber or None)
+        """
+        entries = self._entries
+        if filename in entries:
+            self.hits += 1
+            entries.move_to_end(filename)
+            return True, entries[filename]
+        self.misses += 1
+        return False, None
     
-    common_words = video_words.intersection(subtitle_words)
-    years_match = (video_year and subtitle_year and video_year == subtitle_year)
+    def peek(self, filename):
+        """Like lookup(), but without counting or touching the LRU order."""
+        if filename in self._entries:
+            return True, self._entries[filename]
+        return False, None
     
-    if years_match:
-        if len(common_words) > 0 or (video_year and ('19' in video_year or '20' in video_year)):
-            return (video_files[0], subtitle_files[0])
-    else:
-        if len(video_words) > 0 and len(subtitle_words) > 0:
-            match_ratio = len(common_words) / min(len(video_words), len(subtitle_words))
-            if match_ratio >= 0.3 or len(common_words) > 0:
-                return (video_files[0], subtitle_files[0])
+    def store(self, filename, result):
+        """Add a parsed result, evicting the least recently used entry when full."""
+        entries = self._entries
+        entries[filename] = result
+        if self.max_size and len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
     
-    return None
+    def get_or_parse(self, filename, parse):
+        """
+        Return the cached result for filename, calling parse(filename) on a miss.
+        
+        Args:
+            filename: Filename to look up
+            parse: Function computing the EpisodeNumber (or None) for filename
+        """
+        found, result = self.lookup(filename)
+        if not found:
+            result = parse(filename)
+            self.store(filename, result)
+        return result
+    
+    def clear(self):
+        """Drop all entries and reset the statistics."""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+    
+    def stats(self):
+        """
+        Snapshot of the cache statistics.
+        
+        Returns:
+            Dictionary with hits, misses, evictions, size and max_size
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+        }
 
-def generate_unique_name(base_name, subtitle_ext, subtitle, directory):
+def format_cache_stats(stats):
+    """Render EpisodeCache.stats() as a one-line summary for console and CSV output."""
+    lookups = stats['hits'] + stats['misses']
+    hit_rate = (stats['hits'] / lookups * 100) if lookups else 0.0
+    capacity = stats['max_size'] if stats['max_size'] else 'unlimited'
+    return (f"{stats['hits']} hits | {stats['misses']} misses | {stats['evictions']} evictions | "
+            f"size {stats['size']}/{capacity} | hit rate {hit_rate:.1f}%")
+
+# Performance optimization: Episode number cache (bounded LRU)
+_episode_cache = EpisodeCache(CONFIG['episode_cache_size'])
+
+PERSISTENT_CACHE_FILENAME = 'episode_cache.sqlite'
+
+def episode_patterns_fingerprint(patterns):
     """
-    Generate a unique filename when multiple subtitles match the same video.
+    Fingerprint an episode pattern table so cached parses can be invalidated.
     
-    First attempts the standard format: {video_base}.ar{ext}
-    If that exists, creates a unique variant: {video_base}.ar_{original_sub_name}{ext}
-    If that also exists, adds a numeric counter.
+    Covers each pattern's source and flags plus its formatter's bytecode and
+    constants, so editing, adding, removing or reordering patterns (or
+    changing how a match is formatted) produces a different fingerprint.
     
     Args:
-        base_name: Base name of the video file (without extension)
-        subtitle_ext: Extension of the subtitle file (e.g., '.srt')
-        subtitle: Original subtitle filename
-        directory: Target directory path
+        patterns: List of (compiled_pattern, formatter) tuples in priority order
         
     Returns:
-        Tuple of (new_filename, full_path)
+        Hex digest string
     """
-    # Build filename with optional language suffix
-    if CONFIG['language_suffix']:
-        # Build filename with optional language suffix
-        if CONFIG['language_suffix']:
-            new_name = f"{base_name}.{CONFIG['language_suffix']}{subtitle_ext}"
+    digest = hashlib.sha256()
+    for pattern, formatter in patterns:
+        digest.update(pattern.pattern.encode('utf-8', 'surrogatepass'))
+        digest.update(str(pattern.flags).encode('ascii'))
+        code = getattr(formatter, '__code__', None)
+        if code is not None:
+            digest.update(code.co_code)
+            digest.update(repr(code.co_consts).encode('utf-8', 'surrogatepass'))
         else:
-            new_name = f"{base_name}{subtitle_ext}"
-    else:
-        new_name = f"{base_name}{subtitle_ext}"
-    new_path = os.path.join(directory, new_name)
+            digest.update(repr(formatter).encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:32]
+
+class PersistentEpisodeCache:
+    """
+    On-disk (SQLite) cache of parsed episodes shared across runs.
+    
+    Episodes are stored as their S##E## labels and rebuilt into
+    EpisodeNumber records on read.
+    
+    Every row is tagged with the fingerprint of the pattern table that
+    produced it; rows from any other fingerprint are deleted when the cache
+    is opened. New rows are written in batches and committed on flush().
+    """
+    
+    FLUSH_EVERY = 500
+    QUERY_CHUNK = 500   # Stays below SQLite's bound-parameter limit
+    
+    def __init__(self, path, fingerprint):
+        """
+        Args:
+            path: Path of the SQLite database file
+            fingerprint: Current episode_patterns_fingerprint() value
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._pending = []
+        self._connection = sqlite3.connect(str(path), timeout=5)
+        # Only a new database needs the switch (it takes an exclusive lock); WAL mode is stored in the file
+        if self._connection.execute("PRAGMA journal_mode").fetchone()[0] != 'wal':
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS episode_cache ("
+            " filename TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " episode TEXT,"
+            " PRIMARY KEY (filename, fingerprint)) WITHOUT ROWID"
+        )
+        # Patterns changed since these rows were written - they can no longer be trusted
+        # (checked first, so opening an up-to-date cache never waits for the write lock)
+        self.invalidated = 0
+        if self._connection.execute(
+                "SELECT 1 FROM episode_cache WHERE fingerprint != ? LIMIT 1", (fingerprint,)).fetchone():
+            self.invalidated = self._connection.execute(
+                "DELETE FROM episode_cache WHERE fingerprint != ?", (fingerprint,)
+            ).rowcount
+        self._connection.commit()
+    
+    def get_or_parse(self, filename, parse):
+        """
+        Return the stored result for filename, calling parse(filename) and storing it on a miss.
+        """
+        row = self._connection.execute(
+            "SELECT episode FROM episode_cache WHERE filename = ? AND fingerprint = ?",
+            (filename, self.fingerprint)
+        ).fetchone()
+        if row is not None:
+            self.hits += 1
+            return self._decode(row[0])
+        
+        self.misses += 1
+        result = parse(filename)
+        self.add(filename, result)
+        return result
+    
+    @staticmethod
+    def _decode(episode):
+        """Stored S##E## label back to an EpisodeNumber (None stays None)."""
+        return EpisodeNumber.from_label(episode) if episode is not None else None
+    
+    def lookup_many(self, filenames):
+        """
+        Look up many filenames with a few IN (...) queries.
+        
+        Returns:
+            Dict mapping each stored filename to its EpisodeNumber (or None);
+            filenames not in the cache are left out
+        """
+        found = {}
+        filenames = list(filenames)
+        for start in range(0, len(filenames), self.QUERY_CHUNK):
+            chunk = filenames[start:start + self.QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._connection.execute(
+                f"SELECT filename, episode FROM episode_cache WHERE fingerprint = ? AND filename IN ({placeholders})",
+                [self.fingerprint, *chunk]
+            )
+            found.update((filename, self._decode(episode)) for filename, episode in rows)
+        self.hits += len(found)
+        self.misses += len(set(filenames)) - len(found)
+        return found
+    
+    def add(self, filename, result):
+        """Queue a parsed result for the next flush."""
+        episode = str(result) if result is not None else None
+        self._pending.append((filename, self.fingerprint, episode))
+        if len(self._pending) >= self.FLUSH_EVERY:
+            self.flush()
+    
+    def flush(self):
+        """Write pending entries to disk."""
+        if not self._pending:
+            return
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO episode_cache (filename, fingerprint, episode) VALUES (?, ?, ?)",
+            self._pending
+        )
+        self._connection.commit()
+        self.stored += len(self._pending)
+        self._pending = []
+    
+    def close(self):
+        """Flush pending entries and close the database."""
+        self.flush()
+        self._connection.close()
+
+# Opened on first use when persistent_cache = true (None until then or when disabled)
+_persistent_cache = None
+_persistent_cache_failed = False
+
+def get_persistent_cache():
+    """
+    Return the shared PersistentEpisodeCache, opening it on first use.
+    
+    Returns:
+        PersistentEpisodeCache, or None if disabled in config.ini or the
+        database could not be opened (a warning is printed once)
+    """
+    global _persistent_cache, _persistent_cache_failed
+    if _persistent_cache is not None or _persistent_cache_failed or not CONFIG['persistent_cache']:
+        return _persistent_cache
+    
+    cache_path = get_script_directory() / PERSISTENT_CACHE_FILENAME
+    try:
+        _persistent_cache = PersistentEpisodeCache(cache_path, episode_patterns_fingerprint(EPISODE_PATTERNS))
+    except sqlite3.Error as e:
+        print(f"[WARNING] Could not open persistent cache {cache_path}: {e}")
+        print("[INFO] Continuing without persistent cache")
+        _persistent_cache_failed = True
+    return _persistent_cache
+
+def close_persistent_cache():
+    """Flush and close the persistent cache if it was opened."""
+    global _persistent_cache
+    if _persistent_cache is not None:
+        try:
+            _persistent_cache.close()
+        except sqlite3.Error as e:
+            print(f"[WARNING] Could not save persistent cache: {e}")
+        _persistent_cache = None
+
+def parse_episode_number(filename):
+    """Parse a filename, reading through the persistent cache when it is enabled."""
+    persistent_cache = get_persistent_cache()
+    if persistent_cache is not None:
+        return persistent_cache.get_or_parse(filename, get_episode_number)
+    return get_episode_number(filename)
+
+def required_pattern_literals(pattern):
+    """
+    Text that must appear in any string the pattern can match.
+    
+    Walks the parsed pattern and collects runs of mandatory literal
+    characters ([Ss]eason counts as "season"), folded the way
+    _fold_like_regex() folds filenames. Optional parts, alternations and
+    lookarounds are skipped, so the result is a necessary condition only.
+    
+    Args:
+        pattern: Compiled regex pattern
+        
+    Returns:
+        List of folded literal strings, longest first, without runs that are
+        contained in a longer one
+    """
+    runs = []
+    
+    def walk(items):
+        run = ''
+        for op, argument in items:
+            op_name = str(op)
+            char = None
+            if op_name == 'LITERAL':
+                char = _fold_like_regex(chr(argument))
+            elif op_name == 'IN':
+                folded = {_fold_like_regex(chr(member)) if str(member_op) == 'LITERAL' else None
+                          for member_op, member in argument}
+                if len(folded) == 1 and None not in folded:
+                    char = folded.pop()
+            if char is not None:
+                run += char
+                continue
+            if run:
+                runs.append(run)
+                run = ''
+            if op_name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT') and argument[0] >= 1:
+                walk(argument[2])
+            elif op_name == 'SUBPATTERN':
+                walk(argument[-1])
+            elif op_name == 'ATOMIC_GROUP':
+                walk(argument)
+        if run:
+            runs.append(run)
+    
+    try:
+        walk(sre_parse.parse(pattern.pattern, pattern.flags & ~re.VERBOSE))
+    except Exception:
+        return []
+    runs = sorted(set(runs), key=len, reverse=True)
+    return [run for index, run in enumerate(runs) if not any(run in longer for longer in runs[:index])]
+
+class PatternPrefilter:
+    """
+    Cheap substring test that rules out patterns before any regex runs.
+    
+    Most EPISODE_PATTERNS entries need some literal text to match ("season",
+    an "ep" marker, an "x" between the numbers, a "-"). Each filename is
+    folded once, the distinct markers are looked up with plain substring
+    checks, and only the patterns whose markers are all present are searched,
+    still in table order - so the first match is the same as without the
+    prefilter.
+    """
+    
+    def __init__(self, patterns):
+        self.patterns = patterns
+        requirements = [required_pattern_literals(pattern) for pattern, _ in patterns]
+        self.markers = tuple(sorted({marker for markers in requirements for marker in markers}))
+        bit = {marker: 1 << index for index, marker in enumerate(self.markers)}
+        self._needs = [sum(bit[marker] for marker in markers) for markers in requirements]
+        self._by_mask = {}
+        self.filenames = 0
+        self.regex_calls_avoided = 0
+    
+    def candidates(self, filename):
+        """
+        Indexes of the patterns that can possibly match filename, in priority order.
+        """
+        self.filenames += 1
+        folded = _fold_like_regex(filename)
+        mask = 0
+        for index, marker in enumerate(self.markers):
+            if marker in folded:
+                mask |= 1 << index
+        candidates = self._by_mask.get(mask)
+        if candidates is None:
+            candidates = tuple(index for index, needs in enumerate(self._needs) if needs & mask == needs)
+            self._by_mask[mask] = candidates
+        return candidates
+    
+    def summary(self):
+        """One-line report for the PERFORMANCE section."""
+        return (f"{self.regex_calls_avoided} regex calls avoided over {self.filenames} filenames "
+                f"| markers: {', '.join(repr(marker) for marker in self.markers)}")
+
+_pattern_prefilter = PatternPrefilter(EPISODE_PATTERNS)
+
+def get_episode_number_legacy(filename):
+    """
+    Extract episode information by trying each EPISODE_PATTERNS entry in turn.
+    
+    Default engine (episode_engine = legacy in config.ini) and the reference
+    implementation the other engines are checked against.
+    
+    Args:
+        filename: The filename to parse
+        
+    Returns:
+        EpisodeNumber record (renders as e.g. 'S01E05') or None if no pattern found
+    """
+    if CONFIG['pattern_prefilter']:
+        candidates = _pattern_prefilter.candidates(filename)
+    else:
+        candidates = range(len(EPISODE_PATTERNS))
+    
+    for attempts, pattern_index in enumerate(candidates, 1):
+        pattern, formatter = EPISODE_PATTERNS[pattern_index]
+        match = pattern.search(filename)
+        if match:
+            _pattern_telemetry.record(pattern_index, attempts)
+            if CONFIG['pattern_prefilter']:
+                _pattern_prefilter.regex_calls_avoided += pattern_index + 1 - attempts
+            return EpisodeNumber.from_digits(*formatter(match))
+    _pattern_telemetry.record(None, len(candidates))
+    if CONFIG['pattern_prefilter']:
+        _pattern_prefilter.regex_calls_avoided += len(EPISODE_PATTERNS) - len(candidates)
+    return None
+
+def get_episode_number_combined(filename):
+    """
+    Extract episode information with the combined alternation matcher.
+    
+    Returns the same result as get_episode_number_legacy() for every input.
+    
+    Args:
+        filename: The filename to parse
+        
+    Returns:
+        EpisodeNumber record (renders as e.g. 'S01E05') or None if no pattern found
+    """
+    pattern_index, match, regex_calls = COMBINED_EPISODE_MATCHER.search(filename)
+    _pattern_telemetry.record(pattern_index, regex_calls)
+    if match:
+        return EpisodeNumber.from_digits(*EPISODE_PATTERNS[pattern_index][1](match))
+    return None
+
+EPISODE_ENGINES = {
+    'legacy': get_episode_number_legacy,
+    'combined': get_episode_number_combined,
+    'lexer': get_episode_number_lexer,
+}
+
+# Any decimal digit can stand in for another when comparing filename shapes
+DIGIT_CHAR = re.compile(r'\d')
+
+def patterns_are_digit_invariant(patterns):
+    """
+    Check that no pattern can tell one decimal digit from another.
+    
+    True when the patterns only reach digits through classes such as \\d or \\w
+    (no literal digits, no character ranges containing digits, no
+    backreferences). Two filenames that differ only in their digits then
+    match exactly the same patterns at exactly the same spans.
+    
+    Args:
+        patterns: List of (compiled_pattern, formatter) tuples
+    """
+    def tree_is_invariant(items):
+        for op, argument in items:
+            op_name = str(op)
+            if op_name in ('LITERAL', 'NOT_LITERAL'):
+                if chr(argument).isdecimal():
+                    return False
+            elif op_name == 'RANGE':
+                low, high = argument
+                if any(chr(code).isdecimal() for code in range(low, min(high, 0x1FBF9) + 1)):
+                    return False
+            elif op_name in ('GROUPREF', 'GROUPREF_EXISTS', 'GROUPREF_IGNORE'):
+                return False
+            elif op_name == 'IN':
+                if not tree_is_invariant(argument):
+                    return False
+            elif op_name == 'BRANCH':
+                if not all(tree_is_invariant(branch) for branch in argument[1]):
+                    return False
+            elif op_name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+                if not tree_is_invariant(argument[2]):
+                    return False
+            elif op_name == 'SUBPATTERN':
+                if not tree_is_invariant(argument[-1]):
+                    return False
+            elif op_name in ('ASSERT', 'ASSERT_NOT', 'ATOMIC_GROUP'):
+                body = argument[1] if isinstance(argument, tuple) else argument
+                if not tree_is_invariant(body):
+                    return False
+        return True
+    
+    try:
+        return all(tree_is_invariant(sre_parse.parse(pattern.pattern, pattern.flags & ~re.VERBOSE))
+                   for pattern, _ in patterns)
+    except Exception:
+        return False
+
+class _SpanMatchView:
+    """Match-like object that reads pattern groups from known spans of a filename."""
+    __slots__ = ('_text', '_spans')
+    
+    def __init__(self, text, spans):
+        self._text = text
+        self._spans = spans
+    
+    def group(self, index=0):
+        start, end = self._spans[index]
+        return self._text[start:end] if start >= 0 else None
+
+class AdaptivePatternOrder:
+    """
+    Per-directory pattern ordering for the legacy engine.
+    
+    Inside one season folder nearly every file follows the same naming
+    convention. While the videos are parsed, the winning pattern of each
+    filename "shape" (the name with every digit replaced by 0) is recorded,
+    and learn_dominant() then picks the pattern that won most often.
+    
+    For later filenames:
+      - A known shape is resolved by running only its recorded pattern. This
+        is the verification step: when patterns_are_digit_invariant() holds,
+        names of the same shape match the same patterns, so the result is
+        identical to the fixed order at the cost of one regex search.
+      - A new shape tries the dominant pattern first. If it matches, only the
+        patterns ahead of it are checked; if it does not, the fixed order
+        continues without it. Either way the first matching pattern in table
+        order wins, as in get_episode_number_legacy().
+    
+    With a PatternPrefilter, new shapes only search the patterns whose
+    required text occurs in the filename.
+    """
+    
+    def __init__(self, patterns, prefilter=None):
+        self.patterns = patterns
+        self.prefilter = prefilter
+        self.shape_reuse = patterns_are_digit_invariant(patterns)
+        self.reset()
+    
+    def reset(self):
+        """Forget everything learned (call when starting a new directory)."""
+        self.shape_winners = {}
+        self.winner_counts = [0] * len(self.patterns)
+        self.dominant = None
+        self.parses = 0
+        self.attempts = 0
+        self.fixed_order_attempts = 0
+    
+    def learn_dominant(self):
+        """
+        Pick the pattern that matched most filenames parsed so far (the videos).
+        
+        Returns:
+            Index of the dominant pattern, or None if nothing matched yet
+        """
+        best = max(range(len(self.patterns)), key=lambda index: (self.winner_counts[index], -index), default=None)
+        self.dominant = best if best is not None and self.winner_counts[best] else None
+        return self.dominant
+    
+    def _resolve(self, filename, shape):
+        """Find the winning pattern for filename; returns (pattern index, match, attempts)."""
+        if self.shape_reuse and shape in self.shape_winners:
+            pattern_index = self.shape_winners[shape]
+            if pattern_index is None:
+                return None, None, 0
+            return pattern_index, self.patterns[pattern_index][0].search(filename), 1
+        
+        if self.prefilter is None:
+            return self._search(filename, range(len(self.patterns)))
+        
+        pattern_index, match, attempts = self._search(filename, self.prefilter.candidates(filename))
+        self.prefilter.regex_calls_avoided += self._unfiltered_attempts(pattern_index) - attempts
+        return pattern_index, match, attempts
+    
+    def _search(self, filename, candidates):
+        """Dominant-first search over the candidate pattern indexes (in table order)."""
+        attempts = 0
+        dominant = self.dominant
+        if dominant is not None and dominant in candidates:
+            attempts += 1
+            dominant_match = self.patterns[dominant][0].search(filename)
+            if dominant_match:
+                for pattern_index in candidates:
+                    if pattern_index >= dominant:
+                        break
+                    attempts += 1
+                    match = self.patterns[pattern_index][0].search(filename)
+                    if match:
+                        return pattern_index, match, attempts
+                return dominant, dominant_match, attempts
+        
+        for pattern_index in candidates:
+            if pattern_index == dominant:
+                continue
+            attempts += 1
+            match = self.patterns[pattern_index][0].search(filename)
+            if match:
+                return pattern_index, match, attempts
+        return None, None, attempts
+    
+    def _unfiltered_attempts(self, pattern_index):
+        """Searches _search() would have made for this winner without the prefilter."""
+        if pattern_index is None:
+            return len(self.patterns)
+        if self.dominant is not None and pattern_index < self.dominant:
+            return pattern_index + 2  # Dominant tried first, then everything up to the winner
+        return pattern_index + 1
+    
+    def _record(self, pattern_index, attempts):
+        """Update the per-directory statistics and the pattern telemetry for one filename."""
+        self.parses += 1
+        self.attempts += attempts
+        self.fixed_order_attempts += pattern_index + 1 if pattern_index is not None else len(self.patterns)
+        _pattern_telemetry.record(pattern_index, attempts)
+        if pattern_index is not None:
+            self.winner_counts[pattern_index] += 1
+    
+    def _parse(self, filename, shape):
+        """Resolve, record and remember the winning pattern; returns (pattern index, match)."""
+        pattern_index, match, attempts = self._resolve(filename, shape)
+        self.shape_winners[shape] = pattern_index
+        self._record(pattern_index, attempts)
+        return pattern_index, match
+    
+    def _format(self, pattern_index, match):
+        """EpisodeNumber for a pattern match (None if no pattern matched)."""
+        if pattern_index is None:
+            return None
+        return EpisodeNumber.from_digits(*self.patterns[pattern_index][1](match))
+    
+    def get_episode_number(self, filename):
+        """
+        Extract episode information using the learned order (same result as the fixed order).
+        
+        Args:
+            filename: The filename to parse
+            
+        Returns:
+            EpisodeNumber record (renders as e.g. 'S01E05') or None if no pattern found
+        """
+        return self._format(*self._parse(filename, DIGIT_CHAR.sub('0', filename)))
+    
+    def get_episode_numbers(self, filenames):
+        """
+        Parse many filenames, paying for one regex resolution per filename shape.
+        
+        Filenames are grouped by shape. The first filename of each group is
+        resolved normally. When the table is digit invariant, every other
+        member matches the same pattern at the same spans, so its groups are
+        sliced straight out of the name without calling the regex engine.
+        
+        Args:
+            filenames: Iterable of filenames (duplicates are parsed once)
+            
+        Returns:
+            Dict mapping each filename to its EpisodeNumber (or None)
+        """
+        groups = defaultdict(list)
+        for filename in dict.fromkeys(filenames):
+            groups[DIGIT_CHAR.sub('0', filename)].append(filename)
+        
+        results = {}
+        for shape, members in groups.items():
+            if not self.shape_reuse:
+                for filename in members:
+                    results[filename] = self._format(*self._parse(filename, shape))
+                continue
+            
+            pattern_index, match = self._parse(members[0], shape)
+            results[members[0]] = self._format(pattern_index, match)
+            spans = [match.span(group) for group in range(match.re.groups + 1)] if match else None
+            for filename in members[1:]:
+                self._record(pattern_index, 0)
+                results[filename] = self._format(pattern_index, _SpanMatchView(filename, spans)) if spans else None
+        return results
+    
+    def summary(self):
+        """One-line summary of the attempts saved in the current directory."""
+        saved = self.fixed_order_attempts - self.attempts
+        dominant = f"#{self.dominant}" if self.dominant is not None else "(none)"
+        return (f"dominant pattern {dominant} | {self.attempts} attempts instead of "
+                f"{self.fixed_order_attempts} | {saved} attempts saved")
+
+# Adaptive ordering state for the directory being processed
+_adaptive_order = AdaptivePatternOrder(EPISODE_PATTERNS, _pattern_prefilter if CONFIG['pattern_prefilter'] else None)
+
+def get_episode_number(filename):
+    """
+    Extract episode information from filename and normalize to S##E## format.
+    
+    Uses the detection engine selected by episode_engine in config.ini (with
+    per-directory adaptive ordering for the legacy engine when enabled).
+    
+    Args:
+        filename: The filename to parse
+        
+    Returns:
+        EpisodeNumber record (renders as e.g. 'S01E05') or None if no pattern found
+        
+    Examples:
+        'Show.S01E05.mkv' -> 'S01E05'
+        'Show.2x10.mkv' -> 'S02E10'
+        'Show - 15.mkv' -> 'S01E15' (assumes Season 1)
+    """
+    if CONFIG['episode_engine'] == 'legacy' and CONFIG['adaptive_pattern_order']:
+        return _adaptive_order.get_episode_number(filename)
+    return EPISODE_ENGINES[CONFIG['episode_engine']](filename)
+
+def load_filename_corpus(corpus_path):
+    """
+    Load filenames for an engine comparison.
+    
+    Args:
+        corpus_path: Text file with one filename per line, or a directory
+                     whose entries are used as the corpus
+        
+    Returns:
+        List of filenames
+    """
+    if os.path.isdir(corpus_path):
+        return sorted(os.listdir(corpus_path))
+    with open(corpus_path, 'r', encoding='utf-8') as corpus_file:
+        return [line.rstrip('\r\n') for line in corpus_file if line.strip()]
+
+def compare_episode_engines(filenames, engines=None):
+    """
+    Run several episode detection engines over the same filenames (differential check).
+    
+    Args:
+        filenames: Iterable of filenames to parse
+        engines: Engine names from EPISODE_ENGINES (default: all engines that
+            know the configured patterns)
+        
+    Returns:
+        Tuple of (disagreements, timings)
+        - disagreements: List of (filename, {engine: result}) where engines differ
+        - timings: Dict mapping engine name to total parse time in seconds
+    """
+    if engines:
+        engine_names = list(engines)
+    else:
+        # The lexer grammar mirrors the built-in patterns only
+        engine_names = [engine for engine in EPISODE_ENGINES if engine != 'lexer' or not CONFIG['extra_patterns']]
+    filenames = list(filenames)
+    results = {}
+    timings = {}
+    
+    for engine in engine_names:
+        parse = EPISODE_ENGINES[engine]
+        start = time.perf_counter()
+        results[engine] = [parse(filename) for filename in filenames]
+        timings[engine] = time.perf_counter() - start
+    
+    disagreements = []
+    for index, filename in enumerate(filenames):
+        outcome = {engine: results[engine][index] for engine in engine_names}
+        if len(set(outcome.values())) > 1:
+            disagreements.append((filename, outcome))
+    
+    return disagreements, timings
+
+def run_engine_comparison(corpus_path):
+    """
+    Print an engine comparison report for a filename corpus.
+    
+    Args:
+        corpus_path: Corpus file or directory (see load_filename_corpus)
+        
+    Returns:
+        Number of filenames where the engines disagree
+    """
+    filenames = load_filename_corpus(corpus_path)
+    disagreements, timings = compare_episode_engines(filenames)
+    
+    print(f"\nENGINE COMPARISON: {len(filenames)} filenames from {corpus_path}")
+    print("=" * 60)
+    for engine, elapsed in timings.items():
+        per_name = (elapsed / len(filenames) * 1_000_000) if filenames else 0.0
+        print(f"{engine:<10} {elapsed:.3f} seconds ({per_name:.1f} us/filename)")
+    print("-" * 40)
+    
+    if disagreements:
+        print(f"DISAGREEMENTS: {len(disagreements)}")
+        for filename, outcome in disagreements:
+            details = ' | '.join(f"{engine}={result}" for engine, result in outcome.items())
+            print(f"- '{filename}' -> {details}")
+    else:
+        print("All engines agree on every filename.")
+    print("=" * 60)
+    
+    return len(disagreements)
+
+def _pattern_lead_signature(pattern):
+    """
+    Describe the first element of a regex (e.g. the [Ss] in S##E## and Season ##).
+    
+    Patterns that begin with the same element are variations of one notation
+    and can shadow each other (S## - ## vs S## - E##), so the optimizer never
+    swaps them.
+    """
+    parsed = list(sre_parse.parse(pattern.pattern, pattern.flags & ~re.VERBOSE))
+    return repr(parsed[0]) if parsed else ''
+
+def optimize_pattern_order(filenames, patterns=None):
+    """
+    Propose a cheaper EPISODE_PATTERNS order that keeps every result identical.
+    
+    Replays the corpus against every pattern to learn which patterns match each
+    filename. Pattern i must stay ahead of pattern j (i < j) when:
+      - some corpus filename matches both, so moving j first would change the result
+      - both start with the same regex element (same notation family)
+    Among orders allowed by those constraints, patterns are placed greedily by
+    hit density: the next block is the unplaced pattern with the best average
+    hits over itself plus its still-unplaced required predecessors.
+    
+    Args:
+        filenames: Corpus of filenames
+        patterns: Pattern table to optimize (default: EPISODE_PATTERNS)
+        
+    Returns:
+        Dictionary with:
+        - order: Proposed list of original pattern indexes
+        - hits: Winning-pattern counts per original index
+        - average_attempts_before / average_attempts_after: Mean pattern searches per filename
+        - identical: True if the proposed order reproduces every corpus result
+    """
+    if patterns is None:
+        patterns = EPISODE_PATTERNS
+    filenames = list(filenames)
+    count = len(patterns)
+    hits = [0] * count
+    must_precede = [set() for _ in range(count)]   # must_precede[j] = indexes that stay ahead of j
+    winners = []
+    
+    for filename in filenames:
+        matching = [index for index, (pattern, _) in enumerate(patterns) if pattern.search(filename)]
+        if not matching:
+            winners.append(None)
+            continue
+        winner = matching[0]
+        winners.append(winner)
+        hits[winner] += 1
+        for other in matching[1:]:
+            must_precede[other].add(winner)
+    
+    signatures = [_pattern_lead_signature(pattern) for pattern, _ in patterns]
+    for later in range(count):
+        for earlier in range(later):
+            if signatures[earlier] == signatures[later]:
+                must_precede[later].add(earlier)
+    
+    # Constraints always point from a lower to a higher original index,
+    # so the original order is a valid topological order for any subset
+    placed = set()
+    order = []
+    while len(order) < count:
+        best_block = None
+        best_density = -1.0
+        for candidate in range(count):
+            if candidate in placed:
+                continue
+            block = {candidate}
+            pending = [candidate]
+            while pending:
+                for predecessor in must_precede[pending.pop()]:
+                    if predecessor not in placed and predecessor not in block:
+                        block.add(predecessor)
+                        pending.append(predecessor)
+            density = sum(hits[index] for index in block) / len(block)
+            if density > best_density:
+                best_block, best_density = block, density
+        for index in sorted(best_block):
+            order.append(index)
+            placed.add(index)
+    
+    position = {index: rank for rank, index in enumerate(order)}
+    attempts_before = sum(winner + 1 if winner is not None else count for winner in winners)
+    attempts_after = sum(position[winner] + 1 if winner is not None else count for winner in winners)
+    
+    reordered = [patterns[index] for index in order]
+    identical = all(
+        _first_matching_pattern(filename, reordered) == _first_matching_pattern(filename, patterns)
+        for filename in filenames
+    )
+    
+    total = len(filenames) or 1
+    return {
+        'order': order,
+        'hits': hits,
+        'average_attempts_before': attempts_before / total,
+        'average_attempts_after': attempts_after / total,
+        'identical': identical,
+    }
+
+def _first_matching_pattern(filename, patterns):
+    """EpisodeNumber of the first matching pattern in a table (legacy semantics)."""
+    for pattern, formatter in patterns:
+        match = pattern.search(filename)
+        if match:
+            return EpisodeNumber.from_digits(*formatter(match))
+    return None
+
+def run_pattern_optimizer(corpus_path):
+    """
+    Print the proposed pattern order for a filename corpus.
+    
+    Args:
+        corpus_path: Corpus file or directory (see load_filename_corpus)
+    """
+    filenames = load_filename_corpus(corpus_path)
+    proposal = optimize_pattern_order(filenames)
+    before = proposal['average_attempts_before']
+    after = proposal['average_attempts_after']
+    saved = (1 - after / before) * 100 if before else 0.0
+    
+    print(f"\nPATTERN ORDER OPTIMIZER: {len(filenames)} filenames from {corpus_path}")
+    print("=" * 60)
+    print("NEW  OLD   HITS  PATTERN")
+    for rank, index in enumerate(proposal['order']):
+        marker = '' if rank == index else '  (moved)'
+        print(f"{rank:>3}  {index:>3} {proposal['hits'][index]:>6}  {EPISODE_PATTERNS[index][0].pattern}{marker}")
+    print("-" * 40)
+    print(f"Average regex attempts per filename: {before:.2f} -> {after:.2f} ({saved:.1f}% fewer)")
+    print(f"Results identical on corpus: {'Yes' if proposal['identical'] else 'NO'}")
+    print("=" * 60)
+
+def get_episode_number_cached(filename):
+    """Cached wrapper - extracts episode once per filename (LRU bounded, then persistent cache)."""
+    return _episode_cache.get_or_parse(filename, parse_episode_number)
+
+def get_episode_numbers(filenames):
+    """
+    Parse a whole directory listing in bulk.
+    
+    Same results as calling get_episode_number_cached() on each filename, but
+    the work is batched: cached names come from the LRU cache, the persistent
+    cache is queried with a few multi-row lookups, and the remaining names are
+    parsed together so that (with the legacy engine and adaptive_pattern_order)
+    each filename shape costs a single regex resolution - see
+    AdaptivePatternOrder.get_episode_numbers().
+    
+    Args:
+        filenames: Iterable of filenames
+        
+    Returns:
+        Dict mapping each filename to its EpisodeNumber (e.g. S01E05) or None
+    """
+    results = {}
+    pending = []
+    for filename in dict.fromkeys(filenames):
+        found, episode = _episode_cache.lookup(filename)
+        if found:
+            results[filename] = episode
+        else:
+            pending.append(filename)
+    if not pending:
+        return results
+    
+    persistent_cache = get_persistent_cache()
+    if persistent_cache is not None:
+        stored = persistent_cache.lookup_many(pending)
+        for filename, episode in stored.items():
+            results[filename] = episode
+            _episode_cache.store(filename, episode)
+        pending = [filename for filename in pending if filename not in stored]
+    
+    if CONFIG['episode_engine'] == 'legacy' and CONFIG['adaptive_pattern_order']:
+        parsed = _adaptive_order.get_episode_numbers(pending)
+    else:
+        parsed = {filename: get_episode_number(filename) for filename in pending}
+    
+    for filename, episode in parsed.items():
+        results[filename] = episode
+        _episode_cache.store(filename, episode)
+        if persistent_cache is not None:
+            persistent_cache.add(filename, episode)
+    return results
+
+# Media kinds returned by media_kind() / scan_media_files()
+MEDIA_VIDEO = 'video'
+MEDIA_SUBTITLE = 'subtitle'
+
+def build_media_kinds(video_extensions, subtitle_extensions):
+    """
+    Map each configured extension (lowercase, no leading dot) to its media kind.
+    
+    Returns:
+        Tuple of (suffix -> kind dict, most dots in any configured extension)
+    """
+    kinds = {}
+    for ext in video_extensions:
+        kinds.setdefault(ext, MEDIA_VIDEO)
+    for ext in subtitle_extensions:
+        kinds.setdefault(ext, MEDIA_SUBTITLE)
+    return kinds, max((ext.count('.') for ext in kinds), default=0)
+
+MEDIA_KINDS, MEDIA_EXTENSION_DOTS = build_media_kinds(CONFIG['video_extensions'], CONFIG['subtitle_extensions'])
+
+def media_kind(filename):
+    """
+    Classify a filename by its extension with dict lookups.
+    
+    Same decision as filename.lower().endswith('.ext') against the configured
+    extensions, but costs one lookup per dot in the longest configured
+    extension (normally a single lookup) instead of one endswith per extension.
+    
+    Returns:
+        MEDIA_VIDEO, MEDIA_SUBTITLE, or None for any other file
+    """
+    name = filename.lower()
+    position = len(name)
+    for _ in range(MEDIA_EXTENSION_DOTS + 1):
+        position = name.rfind('.', 0, position)
+        if position < 0:
+            return None
+        kind = MEDIA_KINDS.get(name[position + 1:])
+        if kind is not None:
+            return kind
+    return None
+
+def scan_media_files(directory, seen=None):
+    """
+    Stream the video and subtitle files of a directory.
+    
+    Reads the directory once with os.scandir() and yields each media file as
+    soon as its entry is read, so callers can start working before a very
+    large listing finishes. Files with other extensions are dropped on the
+    name alone; directories and other non-regular entries are dropped using
+    the file type readdir already reported (a stat call is only needed for
+    symlinks and on filesystems that do not report types).
+    
+    Args:
+        directory: Directory to scan
+        seen: Optional set that receives the name of every entry read
+            (including ignored ones), e.g. to seed a DirectoryNames
+        
+    Yields:
+        Tuples of (MEDIA_VIDEO or MEDIA_SUBTITLE, os.DirEntry)
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if seen is not None:
+                seen.add(entry.name)
+            kind = media_kind(entry.name)
+            if kind is None:
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            yield kind, entry
+
+def extract_base_name(filename):
+    """
+    Extract and clean the base filename for comparison.
+    
+    Removes file extension and converts separators (., _, -) to spaces for
+    better word-based matching in movie mode.
+    
+    Args:
+        filename: The filename to process
+        
+    Returns:
+        Cleaned base name with spaces instead of separators
+    """
+    base_name = os.path.splitext(filename)[0]
+    base_name = BASE_NAME_CLEANUP.sub(' ', base_name)
+    return base_name.strip()
+
+def find_movie_subtitle_match(video_files, subtitle_files):
+    """
+    Match a single movie file with a single subtitle file based on title similarity.
+    
+    Uses two matching strategies:
+    1. Year matching: If both files contain the same 4-digit year, they're considered a match
+    2. Word overlap: Compares common words after removing quality indicators (720p, x264, etc.)
+    
+    Args:
+        video_files: List of video filenames (must contain exactly 1 file)
+        subtitle_files: List of subtitle filenames (must contain exactly 1 file)
+        
+    Returns:
+        Tuple of (video_file, subtitle_file) if match found, None otherwise
+    """
+    if len(video_files) != 1 or len(subtitle_files) != 1:
+        return None
+    
+    video_name = extract_base_name(video_files[0])
+    subtitle_name = extract_base_name(subtitle_files[0])
+    
+    # Extract release years if present in filenames
+    video_year_match = YEAR_PATTERN.search(video_files[0])
+    subtitle_year_match = YEAR_PATTERN.search(subtitle_files[0])
+    
+    video_year = video_year_match.group() if video_year_match else None
+    subtitle_year = subtitle_year_match.group() if subtitle_year_match else None
+    
+    # Split into words and filter out quality/format indicators for cleaner comparison
+    video_words = set(video_name.lower().split()) - COMMON_INDICATORS
+    subtitle_words = set(subtitle_name.lower().split()) - COMMON_INDICATORS
+    
+    common_words = video_words.intersection(subtitle_words)
+    years_match = (video_year and subtitle_year and video_year == subtitle_year)
+    
+    if years_match:
+        if len(common_words) > 0 or (video_year and ('19' in video_year or '20' in video_year)):
+            return (video_files[0], subtitle_files[0])
+    else:
+        if len(video_words) > 0 and len(subtitle_words) > 0:
+            match_ratio = len(common_words) / min(len(video_words), len(subtitle_words))
+            if match_ratio >= 0.3 or len(common_words) > 0:
+                return (video_files[0], subtitle_files[0])
+    
+    return None
+
+# "<stem>_<counter>" names produced by generate_unique_name()
+NUMBERED_NAME_PATTERN = re.compile(r'^(.*)_(\d+)$')
+
+class DirectoryNames:
+    """
+    In-memory view of the names in one directory, kept current while renaming.
+    
+    Seeded from the directory listing, so collision checks are set lookups
+    instead of one os.path.exists() round trip per candidate (slow on network
+    shares). The filesystem is only asked when a candidate differs from an
+    existing name only by letter case (the directory may be on a
+    case-insensitive filesystem). Names created by another process after the
+    listing are caught by rename_no_replace(), which refuses to overwrite
+    them; the caller then add()s the name and asks for the next candidate.
+    
+    Per-stem counters remember how far the "_1", "_2", ... suffixes are
+    taken, so the next free suffix is found without rescanning from 1.
+    """
+    
+    def __init__(self, directory, names=None):
+        """
+        Args:
+            directory: Directory the names belong to
+            names: Names already listed (default: read the directory)
+        """
+        self.directory = directory
+        self.names = set(os.listdir(directory) if names is None else names)
+        self._folded = defaultdict(int)
+        for name in self.names:
+            self._folded[name.casefold()] += 1
+        self._counters = {}
+        self.probes = 0
+    
+    def _probe(self, name):
+        self.probes += 1
+        return os.path.exists(os.path.join(self.directory, name))
+    
+    def is_free(self, name):
+        """True if no entry called name is known (probing only on a case-only clash)."""
+        if name in self.names:
+            return False
+        if self._folded.get(name.casefold()):
+            return not self._probe(name)
+        return True
+    
+    def add(self, name):
+        if name not in self.names:
+            self.names.add(name)
+            self._folded[name.casefold()] += 1
+    
+    def discard(self, name):
+        if name in self.names:
+            self.names.remove(name)
+            self._folded[name.casefold()] -= 1
+            # A freed "<stem>_<n>" name makes suffix n available again
+            stem, ext = os.path.splitext(name)
+            numbered = NUMBERED_NAME_PATTERN.match(stem)
+            if numbered:
+                key = numbered.group(1) + ext
+                if key in self._counters:
+                    self._counters[key] = min(self._counters[key], int(numbered.group(2)))
+    
+    def rename(self, old_name, new_name):
+        """Record a completed rename."""
+        self.discard(old_name)
+        self.add(new_name)
+    
+    def next_numbered_name(self, name):
+        """
+        First free "<stem>_<n><ext>" variant of name (n starting at 1).
+        """
+        stem, ext = os.path.splitext(name)
+        counter = self._counters.get(name, 1)
+        candidate = f"{stem}_{counter}{ext}"
+        while not self.is_free(candidate):
+            counter += 1
+            candidate = f"{stem}_{counter}{ext}"
+        self._counters[name] = counter
+        return candidate
+
+# Advisory lock file taken in each processed directory
+LOCK_FILENAME = '.rename_subtitles.lock'
+LOCK_POLL_SECONDS = 0.1
+
+class DirectoryLock:
+    """
+    Advisory per-directory lock: fcntl.flock() on a lock file in the directory.
+    
+    Held from the directory scan until the report is written, so two runs
+    never choose names or rename in the same directory at once, while runs
+    on different directories proceed in parallel. Only processes that take
+    the lock are held off. The lock file is left in place (removing it would
+    let a waiting process lock a file that is already unlinked); the kernel
+    releases the lock when the process exits, however it exits.
+    """
+    
+    def __init__(self, directory, policy=None, timeout=None):
+        """
+        Args:
+            directory: Directory to lock
+            policy: 'wait', 'skip' or 'off' (default: directory_lock from config.ini)
+            timeout: Longest wait in seconds, 0 = no limit (default: lock_timeout from config.ini)
+        """
+        self.directory = directory
+        self.policy = CONFIG['directory_lock'] if policy is None else policy
+        self.timeout = CONFIG['lock_timeout'] if timeout is None else timeout
+        self.waited = 0.0
+        self.held = False
+        self._fd = None
+    
+    @property
+    def active(self):
+        """True if this lock really locks (policy is not 'off' and fcntl exists)."""
+        return self.policy != 'off' and fcntl is not None
+    
+    def acquire(self):
+        """
+        Take the lock according to the policy.
+        
+        Returns:
+            True if the directory may be processed (locked, or locking is off or
+            unavailable), False if it is busy and the policy says skip or the
+            timeout expired
+        """
+        if not self.active:
+            return True
+        try:
+            self._fd = os.open(os.path.join(self.directory, LOCK_FILENAME), os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            print(f"[WARNING] Could not create lock file in {self.directory}: {e} - continuing unlocked")
+            return True
+        
+        start = time.perf_counter()
+        try:
+            if self.policy == 'wait' and not self.timeout:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+                self.held = True
+                return True
+            while True:
+                try:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    self.held = True
+                    return True
+                except BlockingIOError:
+                    if self.policy == 'skip' or time.perf_counter() - start >= self.timeout:
+                        os.close(self._fd)
+                        self._fd = None
+                        return False
+                    time.sleep(LOCK_POLL_SECONDS)
+        finally:
+            self.waited += time.perf_counter() - start
+    
+    def release(self):
+        if self._fd is not None:
+            if self.held:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+            self.held = False
+    
+    def busy_message(self):
+        """Console line for a directory that was not processed because it is locked."""
+        if self.policy == 'skip':
+            return f"[INFO] Another run is processing {self.directory} - skipped"
+        return f"[WARNING] Gave up waiting for another run in {self.directory} after {self.waited:.1f}s - skipped"
+    
+    def summary(self):
+        """One-line report for the PERFORMANCE section."""
+        if not self.active:
+            return "off" if self.policy == 'off' else "unavailable on this platform"
+        return f"waited {self.waited:.3f}s (policy: {self.policy})"
+
+# renameat2() flag: fail with EEXIST instead of replacing the target (Linux 3.15+)
+RENAME_NOREPLACE = 1
+AT_FDCWD = -100
+
+def _load_renameat2():
+    """Return libc's renameat2() (Linux, glibc 2.28+), or None if it is not available."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        function = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    function.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint)
+    function.restype = ctypes.c_int
+    return function
+
+_renameat2 = _load_renameat2()
+
+def _rename_no_replace_portable(old_path, new_path):
+    """rename_no_replace() for platforms or filesystems without renameat2(RENAME_NOREPLACE)."""
+    if os.name == 'nt':
+        os.rename(old_path, new_path)  # Never replaces an existing file on Windows
+        return
+    try:
+        # A hard link cannot replace an existing name, so link + unlink is a no-replace rename
+        os.link(old_path, new_path, follow_symlinks=False)
+    except FileExistsError:
+        raise
+    except (OSError, NotImplementedError):
+        # No hard links on this filesystem: check, then rename (not atomic)
+        if os.path.lexists(new_path):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), new_path)
+        os.rename(old_path, new_path)
+        return
+    os.unlink(old_path)
+
+def rename_no_replace(old_path, new_path):
+    """
+    Rename a file, refusing to overwrite an existing target.
+    
+    On Linux this is a single renameat2(RENAME_NOREPLACE) call: the existence
+    check and the rename happen atomically in the kernel, so a file created by
+    a concurrent run is never silently replaced. Filesystems that do not
+    support the flag, and other platforms, use _rename_no_replace_portable().
+    
+    Args:
+        old_path: Current path
+        new_path: Target path
+        
+    Raises:
+        FileExistsError: new_path already exists
+        OSError: The rename failed for another reason
+    """
+    global _renameat2
+    if old_path == new_path:
+        return
+    if _renameat2 is not None:
+        if _renameat2(AT_FDCWD, os.fsencode(old_path), AT_FDCWD, os.fsencode(new_path), RENAME_NOREPLACE) == 0:
+            return
+        error = ctypes.get_errno()
+        if error == errno.ENOSYS:
+            _renameat2 = None  # Kernel older than 3.15
+        elif error != errno.EINVAL:
+            raise OSError(error, os.strerror(error), old_path, None, new_path)
+        # EINVAL: this filesystem does not support RENAME_NOREPLACE
+    _rename_no_replace_portable(old_path, new_path)
+
+# How place_file() put a file in place, cheapest first
+PLACE_RENAME = 'rename'
+PLACE_REFLINK = 'reflink'
+PLACE_COPY_FILE_RANGE = 'copy_file_range'
+PLACE_SENDFILE = 'sendfile'
+PLACE_BUFFERED = 'buffered'
+
+FICLONE = 0x40049409  # Linux ioctl: the target shares the source's extents (Btrfs, XFS, bcachefs)
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+# Errors that mean "this copy method cannot do it here", not "the copy failed"
+COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY, errno.EBADF}
+
+class PlacementStats:
+    """Files placed by copying (instead of renaming), by method, and bytes copied."""
+    
+    def __init__(self):
+        self.methods = defaultdict(int)
+        self.bytes_copied = 0
+        self._lock = threading.Lock()
+    
+    def record(self, method, size=0):
+        with self._lock:
+            self.methods[method] += 1
+            self.bytes_copied += size
+    
+    @property
+    def copied_files(self):
+        return sum(count for method, count in self.methods.items() if method != PLACE_RENAME)
+    
+    def summary(self):
+        """One-line report for the PERFORMANCE section."""
+        methods = ', '.join(f"{count} {method}" for method, count in sorted(self.methods.items()))
+        return f"{methods} | {self.bytes_copied / (1024 * 1024):.1f} MB copied"
+
+_placement_stats = PlacementStats()
+
+def _copy_with_copy_file_range(src_fd, dst_fd):
+    offset = 0
+    while True:
+        copied = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK_SIZE, offset, offset)
+        if not copied:
+            return
+        offset += copied
+
+def _copy_with_sendfile(src_fd, dst_fd):
+    offset = 0
+    while True:
+        sent = os.sendfile(dst_fd, src_fd, offset, COPY_CHUNK_SIZE)
+        if not sent:
+            return
+        offset += sent
+
+def _copy_file_data(source_file, target_file):
+    """
+    Copy an open source file into an empty open target file, cheapest method first.
+    
+    Tries a reflink (no data copied at all), then copy_file_range() (copied
+    inside the kernel, offloaded to the storage where it can), then
+    sendfile(), then a buffered read/write loop. A method that is not
+    supported for this pair of files falls through to the next one.
+    
+    Returns:
+        Method used (PLACE_REFLINK, PLACE_COPY_FILE_RANGE, PLACE_SENDFILE or PLACE_BUFFERED)
+    """
+    src_fd = source_file.fileno()
+    dst_fd = target_file.fileno()
+    if fcntl is not None and sys.platform.startswith('linux'):
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            return PLACE_REFLINK
+        except OSError:
+            pass  # Different filesystems, or no reflinks on this one
+    
+    for method, copy, available in ((PLACE_COPY_FILE_RANGE, _copy_with_copy_file_range, hasattr(os, 'copy_file_range')),
+                                    (PLACE_SENDFILE, _copy_with_sendfile, hasattr(os, 'sendfile'))):
+        if not available:
+            continue
+        try:
+            copy(src_fd, dst_fd)
+            return method
+        except OSError as e:
+            if e.errno not in COPY_FALLBACK_ERRNOS:
+                raise
+            os.ftruncate(dst_fd, 0)  # Start the next method from scratch
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+    
+    source_file.seek(0)
+    shutil.copyfileobj(source_file, target_file, COPY_CHUNK_SIZE)
+    target_file.flush()
+    return PLACE_BUFFERED
+
+def _fsync_directory(directory):
+    """Make a new directory entry durable (not possible on every platform - then skipped)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def place_file(source_path, target_path, mode='move'):
+    """
+    Put a file at target_path without ever replacing an existing file.
+    
+    move: a plain rename. When the source is on another filesystem (EXDEV -
+    e.g. subtitles on a downloads SSD, videos on a media disk) the file is
+    copied instead and the source is deleted only once the copy is durable.
+    copy: the file is always copied; the source stays.
+    
+    Copies are written to a hidden temporary file next to the target, get
+    the source's permissions and times, are fsynced, and are then renamed
+    into place (refusing to replace), so the target never appears half
+    written and a crash leaves at most the temporary file behind.
+    
+    Args:
+        source_path: File to place
+        target_path: Where it goes
+        mode: 'move' or 'copy'
+        
+    Returns:
+        Method used (PLACE_RENAME or one of the copy methods)
+        
+    Raises:
+        FileExistsError: If target_path exists
+    """
+    if mode == 'move':
+        try:
+            rename_no_replace(source_path, target_path)
+            _placement_stats.record(PLACE_RENAME)
+            return PLACE_RENAME
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    
+    if os.path.lexists(target_path):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), target_path)
+    target_directory, target_name = os.path.split(target_path)
+    temp_path = os.path.join(target_directory, f".{target_name}.partial")
+    try:
+        with open(source_path, 'rb') as source_file, open(temp_path, 'wb') as target_file:
+            method = _copy_file_data(source_file, target_file)
+            st = os.fstat(source_file.fileno())
+            os.chmod(temp_path, stat.S_IMODE(st.st_mode))
+            os.utime(temp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            os.fsync(target_file.fileno())
+        rename_no_replace(temp_path, target_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(target_directory)
+    
+    if mode == 'move':
+        os.unlink(source_path)
+    _placement_stats.record(method, st.st_size)
+    return method
+
+def _standard_subtitle_name(base_name, subtitle_ext):
+    """{video_base}.ar{ext}, or {video_base}{ext} without a language suffix."""
+    if CONFIG['language_suffix']:
+        return f"{base_name}.{CONFIG['language_suffix']}{subtitle_ext}"
+    return f"{base_name}{subtitle_ext}"
+
+def _specific_subtitle_name(base_name, subtitle_ext, subtitle):
+    """{video_base}.ar_{original_sub_name}{ext}, used when the standard name is taken."""
+    original_base = os.path.splitext(subtitle)[0]
+    original_cleaned = SUBTITLE_SUFFIX_PATTERN.sub('', original_base)
+    if not original_cleaned:
+        original_cleaned = original_base
+    
+    specific_new_name = f"{base_name}.ar_{original_cleaned}{subtitle_ext}"
+    return PROBLEMATIC_CHARS.sub('_', specific_new_name)
+
+def generate_unique_name(base_name, subtitle_ext, subtitle, directory, directory_names=None):
+    """
+    Generate a unique filename when multiple subtitles match the same video.
     
-    if not os.path.exists(new_path):
+    First attempts the standard format: {video_base}.ar{ext}
+    If that exists, creates a unique variant: {video_base}.ar_{original_sub_name}{ext}
+    If that also exists, adds a numeric counter.
+    
+    Args:
+        base_name: Base name of the video file (without extension)
+        subtitle_ext: Extension of the subtitle file (e.g., '.srt')
+        subtitle: Original subtitle filename
+        directory: Target directory path
+        directory_names: DirectoryNames for directory (default: list the directory)
+        
+    Returns:
+        Tuple of (new_filename, full_path)
+    """
+    if directory_names is None:
+        directory_names = DirectoryNames(directory)
+    
+    # Build filename with optional language suffix
+    new_name = _standard_subtitle_name(base_name, subtitle_ext)
+    new_path = os.path.join(directory, new_name)
+    
+    if directory_names.is_free(new_name):
         return new_name, new_path
     
     # File already exists - create unique name incorporating original subtitle name
-    original_base = os.path.splitext(subtitle)[0]
-    original_cleaned = SUBTITLE_SUFFIX_PATTERN.sub('', original_base)
-    if not original_cleaned:
-        original_cleaned = original_base
-    
-    specific_new_name = f"{base_name}.ar_{original_cleaned}{subtitle_ext}"
-    specific_new_name = PROBLEMATIC_CHARS.sub('_', specific_new_name)
+    specific_new_name = _specific_subtitle_name(base_name, subtitle_ext, subtitle)
     
-    new_path = os.path.join(directory, specific_new_name)
-    counter = 1
     original_specific_name = specific_new_name
+    if not directory_names.is_free(specific_new_name):
+        specific_new_name = directory_names.next_numbered_name(original_specific_name)
+    
+    return specific_new_name, os.path.join(directory, specific_new_name)
+
+# Why a subtitle gets (or keeps) its name - RenameJob.rule
+RULE_EPISODE = 'episode'              # Episode number matches a video
+RULE_ADJUSTED = 'context-adjusted'    # Matches after adjusting the numbering to the videos (S02E015 -> S02E15)
+RULE_MOVIE = 'movie'                  # Single video + single subtitle without episode numbers
+RULE_NO_MATCH = 'no match'            # Episode detected, but no video has it
+RULE_NO_EPISODE = 'no episode'        # No episode number detected
+RULE_SWAP = 'swap'                    # Temporary name that breaks a rename cycle
+
+# How a taken target name was avoided - RenameJob.resolution
+COLLISION_NONE = 'none'
+COLLISION_ORIGINAL_NAME = 'original name appended'   # {video_base}.ar_{original_sub_name}{ext}
+COLLISION_NUMBERED = 'numbered'                       # ... plus a _1, _2, ... counter
+COLLISION_RETRIED = 'retried'                         # Target appeared after planning
+
+class RenameJob:
+    """
+    One subtitle decision: where it goes, why, and how a name collision was avoided.
+    
+    new_name is None for subtitles that keep their name (rule says why), and
+    changes only if the target appears between planning and renaming.
+    source is the name the file has right before the rename - the subtitle
+    name, unless a swap cycle parked the file under a temporary name.
+    source_dir is set for subtitles that come from another directory
+    (--subtitles-from); they are placed into the video directory.
+    """
+    __slots__ = ('subtitle', 'new_name', 'target_video', 'base_name', 'subtitle_ext',
+                 'source', 'episode', 'rule', 'resolution', 'source_dir', 'next_step')
+    
+    def __init__(self, subtitle, new_name, target_video, base_name, subtitle_ext,
+                 episode=None, rule=RULE_EPISODE, resolution=COLLISION_NONE, source_dir=None):
+        self.subtitle = subtitle
+        self.new_name = new_name
+        self.target_video = target_video
+        self.base_name = base_name
+        self.subtitle_ext = subtitle_ext
+        self.source = subtitle
+        self.episode = episode
+        self.rule = rule
+        self.resolution = resolution
+        self.source_dir = source_dir
+        self.next_step = None  # RULE_SWAP only: the job that renames the parked file on from new_name
+    
+    @property
+    def frees_source(self):
+        """True if performing the job frees its source name in the video directory."""
+        return self.source_dir is None and CONFIG['placement'] == 'move'
+    
+    def reserve(self, directory_names):
+        """Record the job's outcome in directory_names as if it had been performed."""
+        if self.frees_source:
+            directory_names.rename(self.source, self.new_name)
+        else:
+            directory_names.add(self.new_name)
+
+# Saved rename plans (--save-plan / --apply-plan)
+PLAN_FORMAT_VERSION = 1
+PLAN_SWAP_SUFFIX = '.swap'
+
+class RenamePlan:
+    """
+    Every subtitle decision for one directory, made before any file is touched.
+    
+    The plan is the single record of what was (or would be) renamed: the
+    per-subtitle console lines, the CSV export and --save-plan all read it
+    instead of re-deriving the matching. A saved plan can be applied later, in bulk,
+    somewhere else (plan on a fast machine, apply next to the storage).
+    """
+    
+    def __init__(self, directory, decisions=None, created=None, notes=None):
+        self.directory = directory
+        self.decisions = list(decisions or [])
+        self.created = created or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.notes = dict(notes or {})  # Subtitle -> console lines printed before its outcome
+    
+    def add(self, decision, notes=None):
+        self.decisions.append(decision)
+        if notes:
+            self.notes[decision.subtitle] = list(notes)
+    
+    @property
+    def jobs(self):
+        """Decisions that rename a file."""
+        return [decision for decision in self.decisions if decision.new_name is not None]
+    
+    def rename_map(self):
+        """Original subtitle name -> new name, for every rename in the plan."""
+        return {job.subtitle: job.new_name for job in self.jobs}
+    
+    def execution_order(self, directory_names):
+        """
+        Order the renames so that no target is still held by another planned subtitle.
+        
+        A rename whose target is the current name of another subtitle in the
+        plan runs after that subtitle moved away. Renames that form a cycle
+        (a -> b, b -> a) cannot be ordered: one file of the cycle is first
+        parked under a temporary name, and its real rename runs from there
+        once the rest of the cycle is done.
+        
+        Args:
+            directory_names: DirectoryNames of the target directory (temporary names are reserved there)
+            
+        Returns:
+            List of RenameJob steps; parking steps have rule RULE_SWAP
+        """
+        jobs = self.jobs
+        by_source = {job.subtitle: job for job in jobs if job.frees_source}
+        done = set()
+        steps = []
+        for start in jobs:
+            # Follow "target is held by" links until a finished job, a free target or a cycle
+            path = []
+            on_path = set()
+            job = start
+            while job is not None and job.subtitle not in done and job.subtitle not in on_path:
+                path.append(job)
+                on_path.add(job.subtitle)
+                job = by_source.get(job.new_name)
+            if job is not None and job.subtitle in on_path:
+                temp_name = f".{job.subtitle}{PLAN_SWAP_SUFFIX}"
+                if not directory_names.is_free(temp_name):
+                    temp_name = directory_names.next_numbered_name(temp_name)
+                directory_names.add(temp_name)
+                swap = RenameJob(job.subtitle, temp_name, None, None, None, job.episode, RULE_SWAP)
+                swap.next_step = job
+                steps.append(swap)
+                job.source = temp_name
+            steps.extend(reversed(path))
+            done.update(on_path)
+        return steps
+    
+    def to_dict(self, with_notes=False):
+        """JSON-ready form of the plan (console notes only if with_notes)."""
+        data = {
+            'version': PLAN_FORMAT_VERSION,
+            'created': self.created,
+            'directory': self.directory,
+            'language_suffix': CONFIG['language_suffix'],
+            'decisions': [{
+                'source': decision.subtitle,
+                'target': decision.new_name,
+                'video': decision.target_video,
+                'episode': decision.episode,
+                'rule': decision.rule,
+                'resolution': decision.resolution,
+                'source_dir': decision.source_dir,
+            } for decision in self.decisions],
+        }
+        if with_notes:
+            data['notes'] = self.notes
+        return data
+    
+    def save(self, plan_path):
+        """Write the plan as JSON."""
+        with open(plan_path, 'w', encoding='utf-8') as plan_file:
+            json.dump(self.to_dict(), plan_file, ensure_ascii=False, indent=2)
+            plan_file.write('\n')
+    
+    @classmethod
+    def load(cls, plan_path):
+        """
+        Read a plan written by save().
+        
+        Raises:
+            ValueError: If the file is not a valid plan (see from_dict)
+        """
+        with open(plan_path, 'r', encoding='utf-8') as plan_file:
+            return cls.from_dict(json.load(plan_file))
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a plan from to_dict() output.
+        
+        Raises:
+            ValueError: If data is not a valid plan (unknown version, names
+                with path separators, two renames from or to the same name)
+        """
+        if not isinstance(data, dict) or data.get('version') != PLAN_FORMAT_VERSION:
+            raise ValueError(f"unsupported rename plan format (expected version {PLAN_FORMAT_VERSION})")
+        
+        decisions = []
+        sources = set()
+        targets = set()
+        for entry in data.get('decisions', []):
+            source = entry.get('source')
+            target = entry.get('target')
+            for name in (source, target):
+                if name is not None and (not isinstance(name, str) or not name or name in ('.', '..')
+                                         or os.path.basename(name) != name or '/' in name):
+                    raise ValueError(f"invalid file name in rename plan: {name!r}")
+            if source is None:
+                raise ValueError("rename plan entry without a source file")
+            if source in sources or (target is not None and target in targets):
+                raise ValueError(f"rename plan renames '{source}' or into '{target}' more than once")
+            sources.add(source)
+            if target is not None:
+                targets.add(target)
+            
+            source_dir = entry.get('source_dir')
+            if source_dir is not None and (not isinstance(source_dir, str) or not os.path.isabs(source_dir)):
+                raise ValueError(f"invalid source directory in rename plan: {source_dir!r}")
+            video = entry.get('video')
+            base_name = os.path.splitext(video)[0] if video else os.path.splitext(target or source)[0]
+            decisions.append(RenameJob(source, target, video, base_name, os.path.splitext(source)[1],
+                                       entry.get('episode'), entry.get('rule', RULE_EPISODE),
+                                       entry.get('resolution', COLLISION_NONE), source_dir))
+        return cls(data.get('directory'), decisions, data.get('created'), data.get('notes'))
+
+# Per-folder manifest of parsed episodes ([Performance] episode_manifest)
+MANIFEST_FILENAME = '.rename_subtitles.manifest'
+MANIFEST_FORMAT_VERSION = 1
+MANIFEST_KINDS = {MEDIA_VIDEO: 'v', MEDIA_SUBTITLE: 's'}
+
+class ManifestStats:
+    """Entries taken from folder manifests versus entries that had to be parsed."""
+    
+    def __init__(self):
+        self.reused = 0
+        self.parsed = 0
+        self.discarded = 0
+    
+    def summary(self):
+        """One-line report for the PERFORMANCE section."""
+        total = self.reused + self.parsed
+        return (f"{self.reused} entries reused | {self.parsed} new or changed entries parsed | "
+                f"{(self.reused / total * 100) if total else 0.0:.1f}% reused"
+                f"{f' | {self.discarded} manifests discarded (patterns changed)' if self.discarded else ''}")
+
+_manifest_stats = ManifestStats()
+
+def _encode_manifest_episode(episode):
+    """EpisodeNumber -> compact JSON value: [season, episode, widths...], its label, or None."""
+    if episode is None:
+        return None
+    if episode._label is not None:
+        return episode._label
+    return [episode.season, episode.episode, episode.season_width, episode.episode_width]
+
+def _decode_manifest_episode(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return EpisodeNumber.from_label(value)
+    return EpisodeNumber(*value)
+
+_manifest_fingerprint_value = None
+
+def _manifest_fingerprint():
+    """episode_patterns_fingerprint() of the active patterns, computed once per process."""
+    global _manifest_fingerprint_value
+    if _manifest_fingerprint_value is None:
+        _manifest_fingerprint_value = episode_patterns_fingerprint(EPISODE_PATTERNS)
+    return _manifest_fingerprint_value
+
+class DirectoryManifest:
+    """
+    Hidden per-folder record of the episode parsed from each video and subtitle.
+    
+    Maps each file name to [inode, mtime_ns, kind (v/s), episode], the
+    episode stored as its integers (see _encode_manifest_episode), in one
+    compact JSON document - loaded by the C JSON parser, with no regex work.
+    A file whose inode, mtime and kind still match gets its episode straight
+    from the manifest (put in the episode cache while scanning); only new or
+    changed files are parsed. The manifest carries the episode pattern
+    fingerprint, so one made with other patterns is discarded.
+    """
+    
+    def __init__(self, directory, fingerprint):
+        """
+        Args:
+            directory: Folder the manifest belongs to
+            fingerprint: Current episode_patterns_fingerprint() value
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILENAME)
+        self.fingerprint = fingerprint
+        self.entries = {}   # Name -> [inode, mtime_ns, kind, encoded episode] as last saved
+        self.current = {}   # Name -> (inode, mtime_ns, kind) as seen by this run's scan
+    
+    @classmethod
+    def load(cls, directory):
+        """
+        Read the manifest of directory.
+        
+        Returns:
+            DirectoryManifest (empty if there is none, it is unreadable or it
+            was written with other episode patterns)
+        """
+        manifest = cls(directory, _manifest_fingerprint())
+        try:
+            with open(manifest.path, 'rb') as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            return manifest
+        if not isinstance(data, dict) or data.get('format') != MANIFEST_FORMAT_VERSION:
+            return manifest
+        if data.get('fingerprint') != manifest.fingerprint:
+            _manifest_stats.discarded += 1
+            return manifest
+        files = data.get('files')
+        if isinstance(files, dict):
+            manifest.entries = files
+        return manifest
+    
+    def check(self, scanned):
+        """
+        Note scanned media files; those the manifest knows unchanged get their episode cached.
+        
+        Args:
+            scanned: List of (MEDIA_VIDEO or MEDIA_SUBTITLE, os.DirEntry) from scan_media_files()
+        """
+        entries = self.entries
+        current = self.current
+        store = _episode_cache.store
+        reused = 0
+        for kind, entry in scanned:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            name = entry.name
+            state = current[name] = (st.st_ino, st.st_mtime_ns, MANIFEST_KINDS[kind])
+            saved = entries.get(name)
+            if saved is not None and len(saved) == 4 and tuple(saved[:3]) == state:
+                try:
+                    store(name, _decode_manifest_episode(saved[3]))
+                except (TypeError, ValueError):
+                    continue  # Damaged entry: parse the name instead
+                reused += 1
+        _manifest_stats.reused += reused
+        _manifest_stats.parsed += len(scanned) - reused
+    
+    def record_renames(self, jobs):
+        """Replace the renamed subtitles' old entries by their new names."""
+        for job in jobs:
+            if job.frees_source:
+                self.current.pop(job.subtitle, None)
+            try:
+                st = os.stat(os.path.join(self.directory, job.new_name))
+            except OSError:
+                continue
+            self.current[job.new_name] = (st.st_ino, st.st_mtime_ns, MANIFEST_KINDS[MEDIA_SUBTITLE])
+    
+    def save(self):
+        """Write the manifest for the files seen (atomically: a crash leaves the previous one intact)."""
+        files = {}
+        unknown = []
+        for name, (inode, mtime_ns, kind) in self.current.items():
+            saved = self.entries.get(name)
+            if isinstance(saved, list) and len(saved) == 4 and saved[:3] == [inode, mtime_ns, kind]:
+                files[name] = saved
+                continue
+            found, episode = _episode_cache.peek(name)
+            if found:
+                files[name] = [inode, mtime_ns, kind, _encode_manifest_episode(episode)]
+            else:
+                unknown.append(name)  # Renamed subtitles (or evicted from the cache)
+        for name, episode in get_episode_numbers(unknown).items():
+            files[name] = [*self.current[name], _encode_manifest_episode(episode)]
+        
+        temp_path = os.path.join(self.directory, f"{MANIFEST_FILENAME}.tmp")
+        with open(temp_path, 'w', encoding='ascii') as f:
+            json.dump({'format': MANIFEST_FORMAT_VERSION, 'fingerprint': self.fingerprint, 'files': files},
+                      f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+# Checkpoints of interrupted runs (--resume)
+CHECKPOINT_FILENAME = '.rename_checkpoint.json'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_EVERY = 200         # Save after this many renames...
+CHECKPOINT_SECONDS = 2.0       # ...or once the last save is this old
+
+class RenameCheckpoint:
+    """
+    Progress of one run, kept in the directory so an interrupted run can be resumed.
+    
+    Holds everything the final report needs: the original file lists, each
+    file's parsed episode, the RenamePlan (with its console notes) and the
+    renames already done. A resumed run therefore neither rescans the media
+    files nor re-parses them, finishes only the remaining renames, and prints
+    one report for the combined run. Saved atomically after planning, every
+    CHECKPOINT_EVERY renames or CHECKPOINT_SECONDS, and when the run is
+    interrupted; removed once the run completes.
+    """
+    
+    def __init__(self, directory, plan, video_files=(), subtitle_files=(), completed=(), elapsed=0.0, episodes=None):
+        """
+        Args:
+            directory: Directory being processed
+            plan: RenamePlan of the run (filled while planning)
+            video_files: Original video filenames
+            subtitle_files: Original subtitle filenames
+            completed: Subtitles already renamed
+            elapsed: Seconds spent by earlier sessions of this run
+            episodes: Filename -> EpisodeNumber or None, restored from a saved checkpoint
+        """
+        self.path = os.path.join(directory, CHECKPOINT_FILENAME)
+        self.plan = plan
+        self.video_files = list(video_files)
+        self.subtitle_files = list(subtitle_files)
+        self.completed = set(completed)
+        self.elapsed = elapsed
+        self.episodes = episodes or {}
+        self.resumed = episodes is not None
+        self._session_start = time.time()
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+    
+    def start(self, video_files, subtitle_files):
+        """Record the original file lists of a new run."""
+        self.video_files = list(video_files)
+        self.subtitle_files = list(subtitle_files)
+    
+    def mark_done(self, job):
+        """Record a completed rename, saving every CHECKPOINT_EVERY renames or CHECKPOINT_SECONDS."""
+        self.completed.add(job.subtitle)
+        self._unsaved += 1
+        if self._unsaved >= CHECKPOINT_EVERY or time.monotonic() - self._last_save >= CHECKPOINT_SECONDS:
+            self.save()
+    
+    def save(self):
+        """Write the checkpoint atomically (write a temporary file, fsync, replace)."""
+        episodes = dict(self.episodes)
+        for filename in self.video_files + self.subtitle_files:
+            found, episode = _episode_cache.peek(filename)
+            if found:
+                episodes[filename] = episode
+        data = {
+            'version': CHECKPOINT_VERSION,
+            'elapsed': self.elapsed + time.time() - self._session_start,
+            'videos': self.video_files,
+            'subtitles': self.subtitle_files,
+            'episodes': {filename: str(episode) if episode else None for filename, episode in episodes.items()},
+            'plan': self.plan.to_dict(with_notes=True),
+            'completed': sorted(self.completed),
+        }
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump(data, checkpoint_file, ensure_ascii=False)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temp_path, self.path)
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+    
+    def remove(self):
+        """Delete the checkpoint (the run completed)."""
+        for path in (self.path, self.path + '.tmp'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def seed_episode_cache(self):
+        """Put the saved episodes into the episode cache, so the resumed run does not parse them again."""
+        for filename, episode in self.episodes.items():
+            _episode_cache.store(filename, episode)
+    
+    @classmethod
+    def load(cls, directory):
+        """
+        Read the checkpoint left in directory by an interrupted run.
+        
+        Returns:
+            RenameCheckpoint, or None if there is none
+            
+        Raises:
+            ValueError: If the checkpoint cannot be used
+        """
+        path = os.path.join(directory, CHECKPOINT_FILENAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as checkpoint_file:
+                data = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
+        if not isinstance(data, dict) or data.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"unsupported checkpoint format (expected version {CHECKPOINT_VERSION})")
+        episodes = {filename: EpisodeNumber.from_label(label) if label else None
+                    for filename, label in data.get('episodes', {}).items()}
+        plan = RenamePlan.from_dict(data.get('plan'))
+        plan.directory = directory
+        return cls(directory, plan, data.get('videos', []), data.get('subtitles', []),
+                   data.get('completed', []), data.get('elapsed', 0.0), episodes)
+
+class RenameThroughput:
+    """Renames performed and wall-clock time spent performing them."""
+    
+    def __init__(self):
+        self.renames = 0
+        self.seconds = 0.0
+        self.workers = 1
+    
+    def summary(self):
+        """One-line report for the PERFORMANCE section."""
+        rate = self.renames / self.seconds if self.seconds else 0.0
+        return (f"{self.renames} renames in {self.seconds:.2f}s ({rate:.1f} renames/sec, "
+                f"{self.workers} worker{'s' if self.workers != 1 else ''})")
+
+_rename_throughput = RenameThroughput()
+
+# Rename journal (--undo)
+JOURNAL_FILENAME = 'rename_journal.jsonl'
+JOURNAL_SYNC_EVERY = 64        # fsync after this many entries...
+JOURNAL_SYNC_SECONDS = 1.0     # ...or once the oldest unsynced entry is this old
+
+class RenameJournal:
+    """
+    Append-only record of every rename, one JSON object per line.
+    
+    Each entry holds the run id, the directory, the old and new name, a
+    timestamp and the identity of the renamed file (inode, size, mtime), so
+    undo can tell whether the file was modified since with one stat() per
+    entry instead of a directory rescan. Lines are written as the renames
+    happen; fsync is batched (every JOURNAL_SYNC_EVERY entries or
+    JOURNAL_SYNC_SECONDS) so journaling does not slow renames down. A power
+    loss can cost the unsynced tail; a torn last line is skipped on reading.
+    """
+    
+    def __init__(self, journal_path, run_id=None):
+        """
+        Args:
+            journal_path: Journal file (created on the first rename)
+            run_id: Identifier shared by every entry of this run (default: timestamp + process id)
+        """
+        self.path = journal_path
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.entries = 0
+        self.syncs = 0
+        self._file = None
+        self._pending = 0
+        self._oldest_pending = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, directory, old_name, new_name, source_dir=None, mode='move'):
+        """
+        Append one completed rename (thread-safe).
+        
+        Args:
+            directory: Directory the file is in now
+            old_name: Name before the rename
+            new_name: Name after the rename
+            source_dir: Directory the file came from, if not directory
+            mode: 'copy' if the original was left in place
+        """
+        try:
+            st = os.stat(os.path.join(directory, new_name))
+            identity = {'inode': st.st_ino, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        except OSError:
+            identity = {}
+        entry = {'run': self.run_id, 'time': datetime.now().isoformat(timespec='seconds'),
+                 'directory': directory, 'old': old_name, 'new': new_name, **identity}
+        if source_dir is not None and source_dir != directory:
+            entry['source_directory'] = source_dir
+        if mode == 'copy':
+            entry['mode'] = mode
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()  # In the OS right away; only the fsync is batched
+            self.entries += 1
+            self._pending += 1
+            now = time.monotonic()
+            if self._pending == 1:
+                self._oldest_pending = now
+            if self._pending >= JOURNAL_SYNC_EVERY or now - self._oldest_pending >= JOURNAL_SYNC_SECONDS:
+                self._sync()
+    
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self.syncs += 1
+    
+    def close(self):
+        """Sync outstanding entries and close the file."""
+        with self._lock:
+            if self._file is not None:
+                if self._pending:
+                    self._sync()
+                self._file.close()
+                self._file = None
+
+_rename_journal = None
+_rename_journal_failed = False
+_rename_journal_run_id = None  # Set in library mode so every worker process journals under one run
+_rename_journal_lock = threading.Lock()  # Rename worker threads may open the journal at the same time
+
+def get_rename_journal():
+    """
+    Return this run's RenameJournal, creating it on first use.
+    
+    Returns:
+        RenameJournal, or None if disabled in config.ini
+    """
+    global _rename_journal
+    if _rename_journal is None and CONFIG['rename_journal'] and not _rename_journal_failed:
+        with _rename_journal_lock:
+            if _rename_journal is None:
+                _rename_journal = RenameJournal(get_script_directory() / JOURNAL_FILENAME, _rename_journal_run_id)
+    return _rename_journal
+
+def journal_rename(directory, old_name, new_name, source_dir=None, mode=None):
+    """Record a completed rename in the journal (a failing journal is reported once, then disabled)."""
+    global _rename_journal_failed
+    journal = get_rename_journal()
+    if journal is None:
+        return
+    try:
+        journal.record(directory, old_name, new_name, source_dir, mode or CONFIG['placement'])
+    except OSError as e:
+        print(f"[WARNING] Could not write rename journal {journal.path}: {e}")
+        print("[INFO] Continuing without rename journal")
+        _rename_journal_failed = True
+        close_rename_journal()
+
+def close_rename_journal():
+    """Sync and close the rename journal if it was opened."""
+    global _rename_journal
+    if _rename_journal is not None:
+        try:
+            _rename_journal.close()
+        except OSError as e:
+            print(f"[WARNING] Could not sync rename journal: {e}")
+        _rename_journal = None
+
+def load_rename_journal(journal_path):
+    """
+    Read every entry of a rename journal, in the order they were written.
+    
+    Lines that cannot be parsed (a write torn by a crash) are skipped.
+    """
+    entries = []
+    with open(journal_path, 'r', encoding='utf-8') as journal_file:
+        for line in journal_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and all(key in entry for key in ('run', 'directory', 'old', 'new')):
+                entries.append(entry)
+    return entries
+
+def select_journal_runs(entries, selection):
+    """
+    Resolve an --undo selection to run ids.
+    
+    Args:
+        entries: Journal entries from load_rename_journal()
+        selection: 'last', a run id, or 'FIRST..LAST' (inclusive, in journal
+                   order; either end may be left out)
+        
+    Returns:
+        List of run ids
+        
+    Raises:
+        ValueError: If the journal is empty or a run id is unknown
+    """
+    runs = list(dict.fromkeys(entry['run'] for entry in entries))
+    if not runs:
+        raise ValueError("the rename journal is empty")
+    if selection == 'last':
+        return runs[-1:]
+    
+    if '..' in selection:
+        first, last = selection.split('..', 1)
+        bounds = [first or runs[0], last or runs[-1]]
+    else:
+        bounds = [selection, selection]
+    for run in bounds:
+        if run not in runs:
+            raise ValueError(f"run '{run}' is not in the rename journal (last run: {runs[-1]})")
+    start, end = sorted(runs.index(run) for run in bounds)
+    return runs[start:end + 1]
+
+def undo_renames(selection, journal_path=None):
+    """
+    Revert the renames of one or more runs by replaying the journal backwards.
+    
+    Files are located through the journal alone (no directory rescan). An
+    entry is skipped with a warning if its file is gone, was modified since
+    (inode, size or mtime differ), or if its old name is taken again. Files
+    that came from another directory are moved back there; copies (placement
+    = copy) are deleted, the original is still in place. The restoring
+    renames are journaled as a new run, so an undo can be undone, and the
+    folders involved are recorded in the library catalog again (if enabled).
+    
+    Args:
+        selection: Runs to revert (see select_journal_runs)
+        journal_path: Journal file (default: rename_journal.jsonl next to this script)
+        
+    Returns:
+        Tuple of (restored, skipped) entry counts
+    """
+    if journal_path is None:
+        journal_path = get_script_directory() / JOURNAL_FILENAME
+    entries = load_rename_journal(journal_path)
+    runs = select_journal_runs(entries, selection)
+    selected = set(runs)
+    replay = [entry for entry in entries if entry['run'] in selected]
+    
+    print(f"\nUNDO: {len(replay)} renames from {len(runs)} run{'s' if len(runs) != 1 else ''} "
+          f"({runs[0]}{f' .. {runs[-1]}' if len(runs) > 1 else ''})")
+    print("=" * 60)
+    
+    # Lock every directory involved, in sorted order so that concurrent undos cannot deadlock
+    locks = {}
+    busy = set()
+    for directory in sorted({entry['directory'] for entry in replay}):
+        if not os.path.isdir(directory):
+            continue
+        lock = DirectoryLock(directory)
+        if lock.acquire():
+            locks[directory] = lock
+        else:
+            print(lock.busy_message())
+            busy.add(directory)
+    
+    restored = 0
+    skipped = 0
+    changed = {}  # Directory -> restoring renames made in it (for the library catalog)
+    for entry in reversed(replay):
+        directory, old_name, new_name = entry['directory'], entry['old'], entry['new']
+        if directory in busy:
+            skipped += 1
+            continue
+        new_path = os.path.join(directory, new_name)
+        try:
+            st = os.stat(new_path)
+        except FileNotFoundError:
+            print(f"[WARNING] '{new_name}' no longer exists in {directory} - skipped")
+            skipped += 1
+            continue
+        if 'inode' in entry and (st.st_ino, st.st_size, st.st_mtime_ns) != (entry['inode'], entry['size'], entry['mtime_ns']):
+            print(f"[WARNING] '{new_name}' was modified since run {entry['run']} - not restored")
+            skipped += 1
+            continue
+        if entry.get('mode') == 'copy':
+            os.remove(new_path)
+            print(f"REMOVED COPY: '{new_name}' (original '{old_name}' was kept)")
+            changed.setdefault(directory, [])
+            restored += 1
+            continue
+        old_directory = entry.get('source_directory', directory)
+        try:
+            place_file(new_path, os.path.join(old_directory, old_name), 'move')
+        except FileExistsError:
+            print(f"[WARNING] '{old_name}' exists again - '{new_name}' was not restored")
+            skipped += 1
+            continue
+        journal_rename(old_directory, new_name, old_name, directory, 'move')
+        print(f"RESTORED: '{new_name}' -> '{old_name}'"
+              f"{f' in {old_directory}' if old_directory != directory else ''}")
+        changed.setdefault(directory, [])
+        changed.setdefault(old_directory, []).append((new_name, old_name))
+        restored += 1
+    
+    for directory, renames in sorted(changed.items()):
+        recatalog_directory(directory, renames)
+    for lock in locks.values():
+        lock.release()
+    lock_wait = sum(lock.waited for lock in locks.values())
+    
+    print("=" * 60)
+    print(f"COMPLETED TASK: {restored} file{'s' if restored != 1 else ''} restored"
+          f"{f' | {skipped} skipped' if skipped else ''}")
+    if locks:
+        print(f"Directory Lock: waited {lock_wait:.3f}s for {len(locks)} director{'ies' if len(locks) != 1 else 'y'}")
+    print("=" * 60)
+    return restored, skipped
+
+def _perform_rename(job, directory, directory_names, lock):
+    """Rename (place) one job's subtitle; if its target appeared after planning, move on to the next free name."""
+    old_path = os.path.join(job.source_dir or directory, job.source)
+    while True:
+        try:
+            place_file(old_path, os.path.join(directory, job.new_name), CONFIG['placement'])
+            journal_rename(directory, job.source, job.new_name, job.source_dir)
+            return
+        except FileExistsError:
+            # Created after the directory was listed - take the next candidate
+            with lock:
+                job.resolution = COLLISION_RETRIED
+                directory_names.add(job.new_name)
+                if job.rule == RULE_SWAP:
+                    # Park under another temporary name; the rest of the cycle continues from there
+                    job.new_name = directory_names.next_numbered_name(job.new_name)
+                    if job.next_step is not None:
+                        job.next_step.source = job.new_name
+                else:
+                    job.new_name, _ = generate_unique_name(job.base_name, job.subtitle_ext, job.subtitle,
+                                                           directory, directory_names)
+                directory_names.add(job.new_name)
+
+def execute_renames(jobs, directory, directory_names, workers=1):
+    """
+    Perform planned renames, yielding each job in plan order once it is done.
+    
+    With more than one worker the renames run on a thread pool. Jobs are
+    grouped into chains first: a job whose target is the source name of an
+    earlier job must wait for that rename, so it joins the earlier job's
+    chain. Chains run in parallel, jobs within a chain run in order, and the
+    caller still receives (and prints) the jobs in plan order.
+    
+    Args:
+        jobs: RenameJob list, targets already reserved in directory_names
+        directory: Working directory path
+        directory_names: DirectoryNames for directory
+        workers: Thread pool size (1 = rename one file at a time)
+        
+    Yields:
+        Each RenameJob after its rename completed (new_name is final)
+    """
+    lock = threading.Lock()
+    start = time.perf_counter()
+    _rename_throughput.workers = workers
     
-    while os.path.exists(new_path):
-        name_part, ext_part = os.path.splitext(original_specific_name)
-        specific_new_name = f"{name_part}_{counter}{ext_part}"
-        new_path = os.path.join(directory, specific_new_name)
-        counter += 1
+    if workers <= 1 or len(jobs) <= 1:
+        try:
+            for job in jobs:
+                _perform_rename(job, directory, directory_names, lock)
+                _rename_throughput.renames += 1
+                yield job
+        finally:
+            _rename_throughput.seconds += time.perf_counter() - start
+        return
     
-    return specific_new_name, new_path
+    chains = []
+    chain_of_source = {}
+    job_chain = []
+    for job in jobs:
+        chain = chain_of_source.get(job.new_name)
+        if chain is None:
+            chain = len(chains)
+            chains.append([])
+        chains[chain].append(job)
+        if job.frees_source:
+            chain_of_source[job.source] = chain
+        job_chain.append(chain)
+    
+    def run_chain(chain_jobs):
+        for job in chain_jobs:
+            _perform_rename(job, directory, directory_names, lock)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_chain, chain_jobs) for chain_jobs in chains]
+            for job, chain in zip(jobs, job_chain):
+                futures[chain].result()
+                _rename_throughput.renames += 1
+                yield job
+    finally:
+        _rename_throughput.seconds += time.perf_counter() - start
 
 def build_episode_context(video_files):
     """
@@ -446,31 +3727,28 @@ def build_episode_context(video_files):
         
     Returns:
         Tuple of (video_episodes dict, temp_video_dict)
-        - video_episodes: Maps (season, episode) tuples to canonical episode strings
-        - temp_video_dict: Maps episode strings to video filenames
+        - video_episodes: Maps (season, episode) tuples to canonical EpisodeNumber records
+        - temp_video_dict: Maps EpisodeNumber records to video filenames
     """
     video_episodes = {}
     temp_video_dict = {}
+    episodes = get_episode_numbers(video_files)
     
     # Process alphabetically to ensure deterministic pattern selection when multiple
     # videos have the same episode number with different formatting
     for video in sorted(video_files):
-        episode_string = get_episode_number_cached(video)
-        if episode_string:
-            season, episode = extract_season_episode_numbers(episode_string)
-            if season and episode:
-                season_num, episode_num = int(season), int(episode)
-                key = (season_num, episode_num)
-                
-                if key not in video_episodes:
-                    video_episodes[key] = episode_string
-                    temp_video_dict[episode_string] = video
-                elif episode_string not in temp_video_dict:
-                    temp_video_dict[episode_string] = video
+        episode = episodes[video]
+        if episode:
+            if episode.key not in video_episodes:
+                video_episodes[episode.key] = episode
+                temp_video_dict[episode] = video
+            elif episode not in temp_video_dict:
+                temp_video_dict[episode] = video
     
     return video_episodes, temp_video_dict
 
-def process_subtitles(subtitle_files, video_episodes, temp_video_dict, directory, rename_mapping=None):
+def process_subtitles(subtitle_files, video_episodes, temp_video_dict, directory, rename_mapping=None, directory_names=None,
+                      plan=None, dry_run=False, checkpoint=None, source_dir=None):
     """
     Process and rename subtitle files to match their corresponding videos.
     
@@ -486,60 +3764,342 @@ def process_subtitles(subtitle_files, video_episodes, temp_video_dict, directory
         video_episodes: Episode standardization map from build_episode_context()
         temp_video_dict: Video filename lookup map from build_episode_context()
         directory: Working directory path
+        directory_names: DirectoryNames for directory (default: list the directory)
+        plan: RenamePlan that receives every decision (optional)
+        dry_run: Only plan and report; no file is renamed
+        checkpoint: RenameCheckpoint that records progress (optional); if it
+            was resumed, its saved plan is finished instead of planning again
+        source_dir: Directory the subtitles are in, if not directory (--subtitles-from)
         
     Returns:
-        Number of successfully renamed files
+        Number of successfully renamed files (planned renames in a dry run)
     """
     renamed_count = 0
     if rename_mapping is None:
         rename_mapping = {}
+    if directory_names is None:
+        directory_names = DirectoryNames(directory)
     
     print("PROCESSING SUBTITLES:")
     print("-" * 40)
     
+    # Plan every rename first (in memory), then perform them and report in order
+    finished = set()
+    if checkpoint is not None and checkpoint.resumed:
+        outcomes, finished = resume_subtitle_outcomes(checkpoint, subtitle_files, video_episodes, temp_video_dict,
+                                                      directory, directory_names)
+    else:
+        outcomes = list(plan_subtitle_renames(subtitle_files, video_episodes, temp_video_dict, directory, directory_names, plan,
+                                              source_dir))
+    jobs = [job for _, job in outcomes if job is not None and job.subtitle not in finished]
+    
+    if dry_run:
+        completed = iter(jobs)
+    else:
+        if checkpoint is not None:
+            checkpoint.save()
+        completed = execute_renames(jobs, directory, directory_names, CONFIG['rename_workers'])
+    try:
+        for messages, job in outcomes:
+            if job is not None and job.subtitle not in finished:
+                next(completed)
+                if checkpoint is not None:
+                    checkpoint.mark_done(job)
+            renamed_count += report_subtitle_outcome(messages, job)
+    finally:
+        if not dry_run:
+            completed.close()
+            if checkpoint is not None:
+                checkpoint.save()  # Progress up to an interruption
+    
+    return renamed_count
+
+def resume_subtitle_outcomes(checkpoint, subtitle_files, video_episodes, temp_video_dict, directory, directory_names):
+    """
+    Rebuild the outcomes of an interrupted run from its checkpoint.
+    
+    Renames recorded as done, or whose source is gone while the target
+    exists (done after the last save), are not repeated. Pending renames
+    keep their planned names. Subtitles the interrupted run had not planned
+    yet are planned now.
+    
+    Returns:
+        Tuple of (outcomes like plan_subtitle_renames() yields, set of subtitles already renamed)
+    """
+    plan = checkpoint.plan
+    names = directory_names.names
+    source_names = {}  # Listings of other subtitle directories (--subtitles-from)
+    outcomes = []
+    finished = set()
+    for decision in plan.decisions:
+        notes = plan.notes.get(decision.subtitle, [])
+        if decision.new_name is None:
+            outcomes.append((notes, None))
+            continue
+        if decision.source_dir is None:
+            sources = names
+        else:
+            if decision.source_dir not in source_names:
+                source_names[decision.source_dir] = set(os.listdir(decision.source_dir))
+            sources = source_names[decision.source_dir]
+        if decision.subtitle in checkpoint.completed or (
+                decision.new_name in names and (decision.subtitle not in sources or not decision.frees_source)):
+            finished.add(decision.subtitle)
+        elif decision.subtitle not in sources:
+            print(f"[WARNING] '{decision.subtitle}' not found - skipped")
+            decision.new_name = None
+            outcomes.append((notes, None))
+            continue
+        else:
+            decision.reserve(directory_names)
+        outcomes.append((notes, decision))
+    
+    planned = {decision.subtitle for decision in plan.decisions}
+    remaining = [subtitle for subtitle in subtitle_files if subtitle not in planned and subtitle in names]
+    outcomes.extend(plan_subtitle_renames(remaining, video_episodes, temp_video_dict, directory, directory_names, plan))
+    return outcomes, finished
+
+def plan_subtitle_renames(subtitle_files, video_episodes, temp_video_dict, directory, directory_names, plan=None,
+                          source_dir=None):
+    """
+    Decide what happens to each subtitle, without touching the filesystem.
+    
+    Target names are reserved in directory_names as they are chosen, exactly
+    as if each rename had already happened.
+    
+    Args:
+        subtitle_files: List of subtitle filenames to process
+        video_episodes: Episode standardization map from build_episode_context()
+        temp_video_dict: Video filename lookup map from build_episode_context()
+        directory: Working directory path
+        directory_names: DirectoryNames for directory
+        plan: RenamePlan that receives every decision, renamed or not (optional)
+        source_dir: Directory the subtitles are in, if not directory (--subtitles-from)
+        
+    Yields:
+        Tuples of (console messages, RenameJob or None) in subtitle name order
+    """
+    episodes = get_episode_numbers(subtitle_files)
     for subtitle in sorted(subtitle_files):
-        ep = get_episode_number_cached(subtitle)
+        ep = episodes[subtitle]
+        messages = []
         
         # Standardize episode format to match video files (handles padding differences)
-        adjusted_episode_string = ep
-        if ep:
-            season, episode = extract_season_episode_numbers(ep)
-            if season and episode:
-                key = (int(season), int(episode))
-                if key in video_episodes:
-                    video_pattern = video_episodes[key]
-                    if video_pattern != ep:
-                        print(f"'{subtitle}' -> {ep} adjusted to {video_pattern} (context-aware)")
-                    adjusted_episode_string = video_pattern
+        adjusted_episode = ep
+        if ep and ep.key in video_episodes:
+            video_pattern = video_episodes[ep.key]
+            if video_pattern != ep:
+                messages.append(f"'{subtitle}' -> {ep} adjusted to {video_pattern} (context-aware)")
+            adjusted_episode = video_pattern
 
         # Find corresponding video file and perform rename
         target_video = None
-        if adjusted_episode_string and adjusted_episode_string in temp_video_dict:
-            target_video = temp_video_dict[adjusted_episode_string]
+        if adjusted_episode and adjusted_episode in temp_video_dict:
+            target_video = temp_video_dict[adjusted_episode]
         elif ep and ep in temp_video_dict:
             target_video = temp_video_dict[ep]
-            adjusted_episode_string = ep
+            adjusted_episode = ep
 
         if target_video:
             base_name = os.path.splitext(target_video)[0]
             subtitle_ext = os.path.splitext(subtitle)[1]
             
-            new_name, new_path = generate_unique_name(base_name, subtitle_ext, subtitle, directory)
-            
-            if "ar_" in new_name or "_" in os.path.basename(new_path):
-                print(f"CONFLICT RESOLVED: Multiple subtitles match '{target_video}' -> renamed '{subtitle}' to unique name '{new_name}'")
+            new_name, _ = generate_unique_name(base_name, subtitle_ext, subtitle, directory, directory_names)
+            if new_name == _standard_subtitle_name(base_name, subtitle_ext):
+                resolution = COLLISION_NONE
+            elif new_name == _specific_subtitle_name(base_name, subtitle_ext, subtitle):
+                resolution = COLLISION_ORIGINAL_NAME
             else:
-                print(f"RENAMED: '{subtitle}' -> '{new_name}'")
-            
-            old_path = os.path.join(directory, subtitle)
-            os.rename(old_path, new_path)
-            renamed_count += 1
+                resolution = COLLISION_NUMBERED
+            job = RenameJob(subtitle, new_name, target_video, base_name, subtitle_ext, str(adjusted_episode),
+                            RULE_ADJUSTED if adjusted_episode != ep else RULE_EPISODE, resolution, source_dir)
+            job.reserve(directory_names)
+            decision = job
         elif ep:
-            print(f"NO MATCH: '{subtitle}' -> episode {ep} has no matching video")
+            messages.append(f"NO MATCH: '{subtitle}' -> episode {ep} has no matching video")
+            job = None
+            decision = RenameJob(subtitle, None, None, None, None, str(ep), RULE_NO_MATCH)
         else:
-            print(f"NO EPISODE: '{subtitle}' -> could not detect episode number")
+            messages.append(f"NO EPISODE: '{subtitle}' -> could not detect episode number")
+            job = None
+            decision = RenameJob(subtitle, None, None, None, None, None, RULE_NO_EPISODE)
+        
+        if plan is not None:
+            plan.add(decision, messages)
+        yield messages, job
+
+def report_subtitle_outcome(messages, job):
+    """
+    Print the console lines for one planned subtitle (after its rename completed).
     
-    return renamed_count
+    Returns:
+        1 if the subtitle was renamed, 0 otherwise
+    """
+    for message in messages:
+        print(message)
+    if job is None:
+        return 0
+    action = "copied" if CONFIG['placement'] == 'copy' else "renamed"
+    if "ar_" in job.new_name or "_" in job.new_name:
+        print(f"CONFLICT RESOLVED: Multiple subtitles match '{job.target_video}' -> {action} '{job.subtitle}' to unique name '{job.new_name}'")
+    else:
+        print(f"{action.upper()}: '{job.subtitle}' -> '{job.new_name}'")
+    return 1
+
+# Bounded queues between pipeline stages: batches of directory entries / planned subtitles
+PIPELINE_QUEUE_SIZE = 64
+PIPELINE_BATCH_SIZE = 256
+
+def print_files_found(video_files, subtitle_files):
+    """Print the FILES FOUND header for a directory."""
+    print(f"\nFILES FOUND: {len(video_files)} videos | {len(subtitle_files)} subtitles")
+    print("=" * 60)
+    
+    if video_files:
+        print(f"Videos: {video_files[:4]}{'...' if len(video_files) > 4 else ''}")
+    if subtitle_files:
+        print(f"Subtitles: {subtitle_files[:4]}{'...' if len(subtitle_files) > 4 else ''}")
+    print()
+
+def build_video_context(video_files):
+    """Build the episode context from the videos, learn the dominant pattern and print it."""
+    video_episodes, temp_video_dict = build_episode_context(video_files)
+    if CONFIG['adaptive_pattern_order']:
+        _adaptive_order.learn_dominant()
+    
+    if video_episodes:
+        print("PROCESSING VIDEOS:")
+        print("-" * 40)
+        print(f"EPISODE PATTERNS DETECTED FROM VIDEO FILES: {[str(ep) for ep in list(video_episodes.values())[:10]]}{'...' if len(video_episodes) > 10 else ''}")
+    print()
+    return video_episodes, temp_video_dict
+
+async def run_rename_pipeline(directory, plan=None, checkpoint=None, manifest=None):
+    """
+    Scan, parse, plan, rename and report one directory as overlapping stages.
+    
+    Stages are connected by bounded asyncio queues, so a fast stage waits for
+    a slow one instead of buffering the whole directory:
+      scanner  -> (thread) streams entry batches from scan_media_files()
+      parser   -> parses each batch while the scanner keeps reading
+      planner  -> starts once the video context is complete (all videos seen)
+      renamer  -> runs each rename on the thread pool as soon as it is planned
+      reporter -> prints outcomes in subtitle order as their renames finish
+    Blocking filesystem calls (directory reads, renames) run in the executor.
+    Console output is the same as the sequential path.
+    
+    Args:
+        directory: Working directory path
+        plan: RenamePlan that receives every decision (optional)
+        checkpoint: RenameCheckpoint that records progress (optional)
+        manifest: DirectoryManifest that supplies known episodes (optional)
+        
+    Returns:
+        Tuple of (files, video_files, subtitle_files, directory_names,
+        video_episodes, temp_video_dict, renamed_count)
+    """
+    loop = asyncio.get_running_loop()
+    workers = CONFIG['rename_workers']
+    executor = ThreadPoolExecutor(max_workers=workers + 1)  # Renames plus the scanner
+    files, video_files, subtitle_files = [], [], []
+    all_names = set()
+    
+    try:
+        # Scanner -> parser
+        scanned = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        
+        def scanner():
+            batch = []
+            try:
+                for kind, entry in scan_media_files(directory, all_names):
+                    if manifest is not None:
+                        try:
+                            entry.stat()  # Cached by the DirEntry, so manifest.check() makes no syscall
+                        except OSError:
+                            pass
+                    batch.append((kind, entry))
+                    if len(batch) >= PIPELINE_BATCH_SIZE:
+                        asyncio.run_coroutine_threadsafe(scanned.put(batch), loop).result()
+                        batch = []
+            finally:
+                asyncio.run_coroutine_threadsafe(scanned.put(batch), loop).result()
+                asyncio.run_coroutine_threadsafe(scanned.put(None), loop).result()
+        
+        scan_done = loop.run_in_executor(executor, scanner)
+        while (batch := await scanned.get()) is not None:
+            # The episode cache is not thread-safe: only this thread may touch it
+            if manifest is not None:
+                manifest.check(batch)
+            get_episode_numbers(entry.name for _, entry in batch)  # Fills the episode cache during the scan
+            for kind, entry in batch:
+                files.append(entry.name)
+                (video_files if kind == MEDIA_VIDEO else subtitle_files).append(entry.name)
+        await scan_done
+        directory_names = DirectoryNames(directory, all_names)
+        if checkpoint is not None:
+            checkpoint.start(video_files, subtitle_files)
+        
+        print_files_found(video_files, subtitle_files)
+        video_episodes, temp_video_dict = build_video_context(video_files)
+        
+        print("PROCESSING SUBTITLES:")
+        print("-" * 40)
+        
+        # Planner -> renamer -> reporter
+        planned = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        reported = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        lock = threading.Lock()
+        slots = asyncio.Semaphore(workers)
+        start = time.perf_counter()
+        _rename_throughput.workers = workers
+        
+        async def planner():
+            for outcome in plan_subtitle_renames(subtitle_files, video_episodes, temp_video_dict, directory, directory_names, plan):
+                await planned.put(outcome)
+            await planned.put(None)
+            if checkpoint is not None:
+                checkpoint.save()  # Whole plan known
+        
+        async def perform(job, after):
+            if after is not None:
+                await after  # The target is the old name of an earlier subtitle
+            async with slots:
+                await loop.run_in_executor(executor, _perform_rename, job, directory, directory_names, lock)
+        
+        async def renamer():
+            renaming = {}  # Source name -> task renaming it
+            while (outcome := await planned.get()) is not None:
+                messages, job = outcome
+                task = None
+                if job is not None:
+                    task = asyncio.ensure_future(perform(job, renaming.get(job.new_name)))
+                    if job.frees_source:
+                        renaming[job.source] = task
+                await reported.put((messages, job, task))
+            await reported.put(None)
+        
+        async def reporter():
+            count = 0
+            while (item := await reported.get()) is not None:
+                messages, job, task = item
+                if task is not None:
+                    await task
+                    _rename_throughput.renames += 1
+                    if checkpoint is not None:
+                        checkpoint.mark_done(job)
+                count += report_subtitle_outcome(messages, job)
+            return count
+        
+        try:
+            _, _, renamed_count = await asyncio.gather(planner(), renamer(), reporter())
+        finally:
+            if checkpoint is not None:
+                checkpoint.save()  # Progress up to an interruption
+        _rename_throughput.seconds += time.perf_counter() - start
+    finally:
+        executor.shutdown(wait=True)
+    
+    return files, video_files, subtitle_files, directory_names, video_episodes, temp_video_dict, renamed_count
 
 def analyze_results(files, video_files, subtitle_files, video_episodes, temp_video_dict):
     """
@@ -559,91 +4119,138 @@ def analyze_results(files, video_files, subtitle_files, video_episodes, temp_vid
         
     Returns:
         Tuple of (found_matches set, not_found_episodes set, unidentified_files list)
+        - Episode sets hold EpisodeNumber records ("(None)" marks an unidentified subtitle)
     """
     found_matches = set()
     not_found_episodes = set()
     unidentified_files = []
     
+    episodes = get_episode_numbers(list(video_files) + list(subtitle_files))
+    
     # Build map of which episodes have matching subtitles
     subtitle_episodes = {}
     for subtitle in subtitle_files:
-        ep = get_episode_number_cached(subtitle)
+        ep = episodes[subtitle]
         if ep:
-            season, episode = extract_season_episode_numbers(ep)
-            if season and episode:
-                key = (int(season), int(episode))
-                adjusted_ep = video_episodes.get(key, ep)
-                if adjusted_ep in temp_video_dict or ep in temp_video_dict:
-                    found_matches.add(adjusted_ep if adjusted_ep in temp_video_dict else ep)
-                else:
-                    not_found_episodes.add(adjusted_ep)
-                subtitle_episodes[key] = True
+            adjusted_ep = video_episodes.get(ep.key, ep)
+            if adjusted_ep in temp_video_dict or ep in temp_video_dict:
+                found_matches.add(adjusted_ep if adjusted_ep in temp_video_dict else ep)
+            else:
+                not_found_episodes.add(adjusted_ep)
+            subtitle_episodes[ep.key] = True
         else:
             not_found_episodes.add("(None)")
     
     # Identify videos that don't have corresponding subtitle files
     for video in video_files:
-        ep = get_episode_number_cached(video)
-        if ep:
-            season, episode = extract_season_episode_numbers(ep)
-            if season and episode:
-                key = (int(season), int(episode))
-                if key not in subtitle_episodes:
-                    not_found_episodes.add(video_episodes.get(key, ep))
+        ep = episodes[video]
+        if ep and ep.key not in subtitle_episodes:
+            not_found_episodes.add(video_episodes.get(ep.key, ep))
     
     # Collect files where episode pattern detection failed
     for filename in files:
         # Check if file is a video or subtitle based on CONFIG
-        video_exts = tuple(f'.{ext}' for ext in CONFIG['video_extensions'])
-        subtitle_exts = tuple(f'.{ext}' for ext in CONFIG['subtitle_extensions'])
-        if filename.lower().endswith(video_exts + subtitle_exts):
-            if not get_episode_number_cached(filename):
+        if media_kind(filename) is not None:
+            episode = episodes[filename] if filename in episodes else get_episode_number_cached(filename)
+            if not episode:
                 unidentified_files.append(filename)
     
     return found_matches, not_found_episodes, unidentified_files
 
-def rename_subtitles_to_match_videos():
+def rename_subtitles_to_match_videos(dry_run=False, plan=None, checkpoint=None, subtitle_dir=None):
+    """
+    Match and rename the subtitles in the current directory, then print the analysis.
+    
+    Args:
+        dry_run: Only build the plan; no file is renamed
+        plan: RenamePlan that receives every decision (default: a new plan)
+        checkpoint: RenameCheckpoint to record progress in, or a loaded one to
+            resume (default: a new checkpoint unless dry_run)
+        subtitle_dir: Take the subtitles from this directory instead of the
+            current one and place them next to the videos (--subtitles-from)
+        
+    Returns:
+        Tuple of (renamed_count, movie_mode_detected, original_video_files,
+        original_subtitle_files, rename_mapping)
+    """
     directory = os.getcwd()
-    files = os.listdir(directory)
+    _adaptive_order.reset()
+    rename_mapping = {}  # Maps original_name -> new_name (or None if not renamed)
+    if checkpoint is not None and checkpoint.resumed:
+        plan = checkpoint.plan
+    elif plan is None:
+        plan = RenamePlan(directory)
+    if checkpoint is None and not dry_run:
+        checkpoint = RenameCheckpoint(directory, plan)
     
-    # Separate video and subtitle files by extension (from CONFIG)
-    video_exts = tuple(f'.{ext}' for ext in CONFIG['video_extensions'])
-    subtitle_exts = tuple(f'.{ext}' for ext in CONFIG['subtitle_extensions'])
-    video_files = [f for f in files if f.lower().endswith(video_exts)]
-    subtitle_files = [f for f in files if f.lower().endswith(subtitle_exts)]
+    if dry_run:
+        print("\n[INFO] Dry run - planning only, no files will be renamed")
+    
+    manifest = None
+    if CONFIG['episode_manifest'] and not (checkpoint is not None and checkpoint.resumed):
+        manifest = DirectoryManifest.load(directory)
+    
+    if checkpoint is not None and checkpoint.resumed:
+        # Finish an interrupted run: file lists and episodes come from the checkpoint
+        print(f"\n[INFO] Resuming the run planned {plan.created}: "
+              f"{len(checkpoint.completed)} of {len(plan.jobs)} planned renames already done")
+        checkpoint.seed_episode_cache()
+        video_files = checkpoint.video_files
+        subtitle_files = checkpoint.subtitle_files
+        files = video_files + subtitle_files
+        directory_names = DirectoryNames(directory)
+        
+        print_files_found(video_files, subtitle_files)
+        video_episodes, temp_video_dict = build_video_context(video_files)
+        renamed_count = process_subtitles(subtitle_files, video_episodes, temp_video_dict, directory, rename_mapping, directory_names,
+                                          plan, checkpoint=checkpoint)
+    elif CONFIG['pipeline'] and not dry_run and subtitle_dir is None:
+        # Scan, parse, rename and report as overlapping stages
+        (files, video_files, subtitle_files, directory_names,
+         video_episodes, temp_video_dict, renamed_count) = asyncio.run(run_rename_pipeline(directory, plan, checkpoint, manifest))
+    else:
+        # Separate video and subtitle files by extension (from CONFIG) in one pass
+        files = []
+        video_files = []
+        subtitle_files = []
+        all_names = set()
+        scanned = list(scan_media_files(directory, all_names))
+        if manifest is not None:
+            manifest.check(scanned)
+        for kind, entry in scanned:
+            if kind == MEDIA_VIDEO or subtitle_dir is None:
+                files.append(entry.name)
+                (video_files if kind == MEDIA_VIDEO else subtitle_files).append(entry.name)
+        if subtitle_dir is not None:
+            for kind, entry in scan_media_files(subtitle_dir):
+                if kind == MEDIA_SUBTITLE:
+                    files.append(entry.name)
+                    subtitle_files.append(entry.name)
+        directory_names = DirectoryNames(directory, all_names)
+        if checkpoint is not None:
+            checkpoint.start(video_files, subtitle_files)
+        
+        print_files_found(video_files, subtitle_files)
+        
+        # Build episode reference mappings for context-aware matching
+        video_episodes, temp_video_dict = build_video_context(video_files)
+        
+        # Rename subtitle files to match corresponding videos
+        renamed_count = process_subtitles(subtitle_files, video_episodes, temp_video_dict, directory, rename_mapping, directory_names,
+                                          plan, dry_run, checkpoint, subtitle_dir)
+    rename_mapping.update(plan.rename_map())
     
     # Store original file lists for CSV export (before any renaming)
     original_video_files = video_files.copy()
     original_subtitle_files = subtitle_files.copy()
-    rename_mapping = {}  # Maps original_name -> new_name (or None if not renamed)
-
-    print(f"\nFILES FOUND: {len(video_files)} videos | {len(subtitle_files)} subtitles")
-    print("=" * 60)
-    
-    if video_files:
-        print(f"Videos: {video_files[:4]}{'...' if len(video_files) > 4 else ''}")
-    if subtitle_files:
-        print(f"Subtitles: {subtitle_files[:4]}{'...' if len(subtitle_files) > 4 else ''}")
-    print()
-
-    # Build episode reference mappings for context-aware matching
-    video_episodes, temp_video_dict = build_episode_context(video_files)
-    
-    if video_episodes:
-        print("PROCESSING VIDEOS:")
-        print("-" * 40)
-        print(f"EPISODE PATTERNS DETECTED FROM VIDEO FILES: {list(video_episodes.values())[:10]}{'...' if len(video_episodes) > 10 else ''}")
-    print()
-
-    # Rename subtitle files to match corresponding videos
-    renamed_count = process_subtitles(subtitle_files, video_episodes, temp_video_dict, directory, rename_mapping)
     
     print("-" * 40)
     print()
     
     # Activate movie matching mode if no TV episodes were found
-    remaining_video_files = [v for v in video_files if not get_episode_number_cached(v)]
-    remaining_subtitle_files = [s for s in subtitle_files if not get_episode_number_cached(s)]
+    episodes = get_episode_numbers(video_files + subtitle_files)
+    remaining_video_files = [v for v in video_files if not episodes[v]]
+    remaining_subtitle_files = [s for s in subtitle_files if not episodes[s]]
     movie_mode_detected = False
     
     if renamed_count == 0 and len(remaining_video_files) == 1 and len(remaining_subtitle_files) == 1:
@@ -661,19 +4268,51 @@ def rename_subtitles_to_match_videos():
                     new_name = f"{base_name}{subtitle_ext}"
             else:
                 new_name = f"{base_name}{subtitle_ext}"
-            old_path = os.path.join(directory, subtitle_file)
+            old_path = os.path.join(subtitle_dir or directory, subtitle_file)
             new_path = os.path.join(directory, new_name)
             print("MOVIE MODE: Found potential movie match!")
-            print(f"RENAMED: '{subtitle_file}' -> '{new_name}'")
-            os.rename(old_path, new_path)
-            rename_mapping[subtitle_file] = new_name
-            renamed_count += 1
-            movie_mode_detected = True
+            try:
+                if dry_run:
+                    if not directory_names.is_free(new_name):
+                        raise FileExistsError(new_name)
+                else:
+                    place_file(old_path, new_path, CONFIG['placement'])
+            except FileExistsError:
+                print(f"[WARNING] '{new_name}' already exists - '{subtitle_file}' was not renamed")
+            else:
+                if not dry_run:
+                    journal_rename(directory, subtitle_file, new_name, subtitle_dir)
+                print(f"{'COPIED' if CONFIG['placement'] == 'copy' else 'RENAMED'}: '{subtitle_file}' -> '{new_name}'")
+                movie_job = RenameJob(subtitle_file, new_name, video_file, base_name, subtitle_ext, rule=RULE_MOVIE,
+                                      source_dir=subtitle_dir)
+                movie_job.reserve(directory_names)
+                for decision in plan.decisions:
+                    if decision.subtitle == subtitle_file:
+                        decision.new_name = new_name
+                        decision.target_video = video_file
+                        decision.base_name = base_name
+                        decision.subtitle_ext = subtitle_ext
+                        decision.rule = RULE_MOVIE
+                        decision.source_dir = subtitle_dir
+                rename_mapping[subtitle_file] = new_name
+                renamed_count += 1
+                movie_mode_detected = True
         else:
             print("MOVIE MODE: No movie-subtitle match found.")
     elif len(remaining_video_files) > 1:
         print(f"MOVIE MODE: {len(remaining_video_files)} video files detected -> skipping movie matching logic.")
     
+    if checkpoint is not None and not dry_run:
+        checkpoint.remove()  # Every rename of the run is done
+    if manifest is not None and not dry_run:
+        manifest.record_renames(plan.jobs)
+        try:
+            manifest.save()
+        except OSError as e:
+            print(f"[WARNING] Could not save episode manifest {manifest.path}: {e}")
+    if not dry_run:
+        catalog_directory(directory, video_files, subtitle_files, rename_mapping, subtitle_dir)
+    
     print("=" * 60)
     total_candidate_files = len(subtitle_files)
     if renamed_count > 0:
@@ -692,13 +4331,13 @@ def rename_subtitles_to_match_videos():
     
     if found_matches:
         print("FOUND AND RENAMED MATCHING SUBTITLE AND VIDEO FILES FOR THESE EPISODES:")
-        for episode in sorted(found_matches):
+        for episode in sorted(found_matches, key=str):
             print(f"- {episode}")
         print()
 
     if not_found_episodes:
         print("COULDN'T FIND MATCHING SUBTITLE AND VIDEO FILES FOR THESE EPISODES:")
-        for episode in sorted(not_found_episodes):
+        for episode in sorted(not_found_episodes, key=str):
             if episode != "(None)":
                 print(f"- {episode}")
         print()
@@ -711,7 +4350,7 @@ def rename_subtitles_to_match_videos():
     
     return renamed_count, movie_mode_detected, original_video_files, original_subtitle_files, rename_mapping
 
-def export_analysis_to_csv(renamed_count=0, movie_mode=False, original_videos=None, original_subtitles=None, rename_map=None, execution_time=None):
+def export_analysis_to_csv(plan, movie_mode=False, original_videos=None, original_subtitles=None, execution_time=None, cache_stats=None):
     """
     Export detailed analysis to renaming_report.csv in improved format.
     
@@ -721,12 +4360,17 @@ def export_analysis_to_csv(renamed_count=0, movie_mode=False, original_videos=No
     - Match summary showing successful pairings
     - Missing matches and unidentified files
     
+    Every subtitle row comes from its decision in the plan (target, rule and
+    collision resolution); nothing is matched again here. A subtitle without
+    a decision in the plan is reported as SKIPPED.
+    
     Args:
-        renamed_count: Number of subtitles successfully renamed
+        plan: RenamePlan of the run, after its renames were performed
         movie_mode: Whether movie matching mode was activated
         original_videos: List of original video filenames (before renaming)
         original_subtitles: List of original subtitle filenames (before renaming)
-        rename_map: Dictionary mapping original names to new names
+        execution_time: Formatted execution time string
+        cache_stats: Episode cache statistics snapshot (default: current statistics)
     
     Output file: renaming_report.csv in the current directory
     """
@@ -734,42 +4378,30 @@ def export_analysis_to_csv(renamed_count=0, movie_mode=False, original_videos=No
     
     # Use provided original file lists, or fall back to current directory
     if original_videos is None or original_subtitles is None:
-        files = os.listdir(directory)
-        video_exts = tuple(f'.{ext}' for ext in CONFIG['video_extensions'])
-        subtitle_exts = tuple(f'.{ext}' for ext in CONFIG['subtitle_extensions'])
-        video_files = [f for f in files if f.lower().endswith(video_exts)]
-        subtitle_files = [f for f in files if f.lower().endswith(subtitle_exts)]
+        video_files = []
+        subtitle_files = []
+        for kind, entry in scan_media_files(directory):
+            (video_files if kind == MEDIA_VIDEO else subtitle_files).append(entry.name)
     else:
         video_files = original_videos
         subtitle_files = original_subtitles
-        # Build files list from original videos and subtitles
-        files = original_videos + original_subtitles
     
-    if rename_map is None:
-        rename_map = {}
-    
-    # Build episode mappings for analysis
-    video_episodes, temp_video_dict = build_episode_context(video_files)
+    if cache_stats is None:
+        cache_stats = _episode_cache.stats()
     
-    # Generate match/no-match analysis
-    found_matches, not_found_episodes, unidentified_files = analyze_results(
-        files, video_files, subtitle_files, video_episodes, temp_video_dict
-    )
+    decisions = {decision.subtitle: decision for decision in plan.decisions}
+    renamed = plan.jobs
+    matched_videos = {decision.target_video for decision in renamed}
+    video_episodes = get_episode_numbers(video_files)  # Already cached by the run
     
     # Build file data rows for the table
     file_rows = []
     
     # Process video files first
     for video in sorted(video_files):
-        episode_string = get_episode_number_cached(video)
-        if episode_string:
-            # Standardize episode format
-            season, episode = extract_season_episode_numbers(episode_string)
-            if season and episode:
-                key = (int(season), int(episode))
-                if key in video_episodes:
-                    episode_string = video_episodes[key]
-            detected_episode = episode_string
+        episode = video_episodes[video]
+        if episode:
+            detected_episode = episode
         elif movie_mode:
             detected_episode = "Movie"
         else:
@@ -779,87 +4411,60 @@ def export_analysis_to_csv(renamed_count=0, movie_mode=False, original_videos=No
             'filename': video,
             'detected_episode': detected_episode,
             'new_name': "No Change",
-            'action': "--"
+            'action': "--",
+            'rule': "--",
+            'resolution': "--"
         })
     
     # Process subtitle files
     for subtitle in sorted(subtitle_files):
-        episode_string = get_episode_number_cached(subtitle)
-        
-        # Standardize episode format to match video files
-        if episode_string:
-            season, episode = extract_season_episode_numbers(episode_string)
-            if season and episode:
-                key = (int(season), int(episode))
-                if key in video_episodes:
-                    episode_string = video_episodes[key]
-            detected_episode = episode_string
-            
-            # Determine new name based on matching or rename_map
-            if subtitle in rename_map and rename_map[subtitle]:
-                new_name = rename_map[subtitle]
-                action = "RENAMED"
-            elif episode_string in temp_video_dict:
-                video_file = temp_video_dict[episode_string]
-                base_name = os.path.splitext(video_file)[0]
-                subtitle_ext = os.path.splitext(subtitle)[1]
-                # Build filename with optional language suffix
-                if CONFIG['language_suffix']:
-                    new_name = f"{base_name}.{CONFIG['language_suffix']}{subtitle_ext}"
-                else:
-                    new_name = f"{base_name}{subtitle_ext}"
-                action = "RENAMED"
-            else:
-                new_name = "No Change"
-                action = "NO MATCH"
-        elif movie_mode:
+        decision = decisions.get(subtitle)
+        if decision is None:
+            file_rows.append({
+                'filename': subtitle,
+                'detected_episode': "--",
+                'new_name': "No Change",
+                'action': "SKIPPED",
+                'rule': "--",
+                'resolution': "--"
+            })
+            continue
+        
+        if decision.rule == RULE_MOVIE or (movie_mode and decision.episode is None):
             detected_episode = "Movie"
-            # Check rename_map first, then calculate
-            if subtitle in rename_map and rename_map[subtitle]:
-                new_name = rename_map[subtitle]
-                action = "RENAMED"
-            elif len(video_files) == 1:
-                video_file = video_files[0]
-                base_name = os.path.splitext(video_file)[0]
-                subtitle_ext = os.path.splitext(subtitle)[1]
-                # Build filename with optional language suffix
-                if CONFIG['language_suffix']:
-                    new_name = f"{base_name}.{CONFIG['language_suffix']}{subtitle_ext}"
-                else:
-                    new_name = f"{base_name}{subtitle_ext}"
-                action = "RENAMED"
-            else:
-                new_name = "No Change"
-                action = "NO MATCH"
         else:
-            detected_episode = "(UNIDENTIFIED)"
+            detected_episode = decision.episode or "(UNIDENTIFIED)"
+        
+        if decision.new_name is not None:
+            new_name = decision.new_name
+            action = "RENAMED"
+        elif decision.rule == RULE_NO_MATCH:
+            new_name = "No Change"
+            action = "NO MATCH"
+        elif decision.rule == RULE_NO_EPISODE:
             new_name = "No Change"
             action = "--"
+        else:
+            new_name = "No Change"
+            action = "SKIPPED"  # Planned, but its source was gone when the run resumed
         
         file_rows.append({
             'filename': subtitle,
             'detected_episode': detected_episode,
             'new_name': new_name,
-            'action': action
+            'action': action,
+            'rule': decision.rule,
+            'resolution': decision.resolution if decision.new_name is not None else "--"
         })
     
     # Calculate statistics
     total_videos = len(video_files)
     total_subtitles = len(subtitle_files)
-    unmatched_videos = len([ep for ep in not_found_episodes if ep in [video_episodes.get((int(s), int(e))) for s, e in [extract_season_episode_numbers(ep)] if s and e]])
-    # Calculate unmatched subtitles properly:
-    # Unmatched = subtitles with episodes that weren't renamed (excluding unidentified)
-    unidentified_subtitle_count = len([s for s in subtitle_files if not get_episode_number_cached(s)])
-    unmatched_subtitles = max(0, total_subtitles - renamed_count - unidentified_subtitle_count)
-    
-    # Calculate unidentified videos separately
-    unidentified_video_count = len([v for v in video_files if not get_episode_number_cached(v)])
-    
-    # For movie mode, don't count files in unidentified if they were handled
-    unidentified_count = len(unidentified_files)
-    if movie_mode and unidentified_count > 0:
-        # Remove movie files from unidentified count
-        unidentified_count = len([f for f in unidentified_files if f not in video_files and f not in subtitle_files])
+    renamed_count = len(renamed)
+    unmatched_videos = len([v for v in video_files if video_episodes[v] and v not in matched_videos])
+    unmatched_subtitles = len([d for d in decisions.values() if d.new_name is None and d.rule == RULE_NO_MATCH])
+    unidentified_video_count = len([v for v in video_files if not video_episodes[v]])
+    unidentified_subtitle_count = len([s for s in subtitle_files if s in decisions and decisions[s].episode is None])
     
     # Write the CSV report
     csv_filename = "renaming_report.csv"
@@ -886,87 +4491,47 @@ def export_analysis_to_csv(renamed_count=0, movie_mode=False, original_videos=No
         csvfile.write(f"# Subtitles Without Episode Pattern: {unidentified_subtitle_count}\n")
         csvfile.write(f"# Movie Mode: {'Yes' if movie_mode else 'No'}\n")
         csvfile.write(f"# Execution Time: {execution_time if execution_time else 'N/A'}\n")
+        csvfile.write(f"# Episode Cache: {format_cache_stats(cache_stats)}\n")
         csvfile.write("#\n")
         
         # SECTION 2: File Analysis Table
-        csvfile.write("Original Filename,Detected Episode,New Name,Action\n")
+        csvfile.write("Original Filename,Detected Episode,New Name,Action,Rule,Resolution\n")
         for row in file_rows:
-            csvfile.write(f"{row['filename']},{row['detected_episode']},{row['new_name']},{row['action']}\n")
+            csvfile.write(f"{row['filename']},{row['detected_episode']},{row['new_name']},{row['action']},"
+                          f"{row['rule']},{row['resolution']}\n")
         
         csvfile.write("#\n")
         
         # SECTION 3: Match Summary
         if movie_mode:
             csvfile.write("# MOVIE MODE DETECTED:\n")
-            if len(video_files) == 1 and len(subtitle_files) == 1:
-                video_file = video_files[0]
-                subtitle_file = subtitle_files[0]
-                base_name = os.path.splitext(video_file)[0]
-                subtitle_ext = os.path.splitext(subtitle_file)[1]
-                # Build filename with optional language suffix
-                if CONFIG['language_suffix']:
-                    new_name = f"{base_name}.{CONFIG['language_suffix']}{subtitle_ext}"
-                else:
-                    new_name = f"{base_name}{subtitle_ext}"
-                csvfile.write("# Successfully matched single video + subtitle pair\n")
-                csvfile.write(f"# Video: {video_file}\n")
-                csvfile.write(f"# Subtitle: {subtitle_file} -> {new_name}\n")
+            for decision in renamed:
+                if decision.rule == RULE_MOVIE:
+                    csvfile.write("# Successfully matched single video + subtitle pair\n")
+                    csvfile.write(f"# Video: {decision.target_video}\n")
+                    csvfile.write(f"# Subtitle: {decision.subtitle} -> {decision.new_name}\n")
             csvfile.write("#\n")
         
-        if found_matches:
+        episode_jobs = [decision for decision in renamed if decision.rule in (RULE_EPISODE, RULE_ADJUSTED)]
+        if episode_jobs:
             csvfile.write("# MATCHED EPISODES:\n")
-            for episode in sorted(found_matches):
-                if episode in temp_video_dict:
-                    video_file = temp_video_dict[episode]
-                    # Find the subtitle that was matched
-                    base_name = os.path.splitext(video_file)[0]
-                    # Look for renamed subtitle
-                    matched_subtitle = None
-                    for sub in subtitle_files:
-                        sub_ep = get_episode_number_cached(sub)
-                        if sub_ep:
-                            season, ep = extract_season_episode_numbers(sub_ep)
-                            if season and ep:
-                                key = (int(season), int(ep))
-                                if key in video_episodes and video_episodes[key] == episode:
-                                    matched_subtitle = sub
-                                    break
-                    
-                    if matched_subtitle:
-                        subtitle_ext = os.path.splitext(matched_subtitle)[1]
-                        # Build filename with optional language suffix
-                        if CONFIG['language_suffix']:
-                            new_name = f"{base_name}.{CONFIG['language_suffix']}{subtitle_ext}"
-                        else:
-                            new_name = f"{base_name}{subtitle_ext}"
-                        csvfile.write(f"# {episode} -> Video: {video_file} | Subtitle: {matched_subtitle} -> {new_name}\n")
+            for decision in sorted(episode_jobs, key=lambda d: (d.episode, d.subtitle)):
+                csvfile.write(f"# {decision.episode} -> Video: {decision.target_video} | "
+                              f"Subtitle: {decision.subtitle} -> {decision.new_name}\n")
             csvfile.write("#\n")
         
-        if not_found_episodes:
-            # Build subtitle lookup dict for missing matches section
-            temp_subtitle_dict = {}
-            for subtitle in subtitle_files:
-                ep = get_episode_number_cached(subtitle)
-                if ep:
-                    season, episode = extract_season_episode_numbers(ep)
-                    if season and episode:
-                        key = (int(season), int(episode))
-                        adjusted_ep = video_episodes.get(key, ep)
-                        if adjusted_ep not in temp_subtitle_dict:
-                            temp_subtitle_dict[adjusted_ep] = subtitle
-                        if ep not in temp_subtitle_dict:
-                            temp_subtitle_dict[ep] = subtitle
-            
+        missing = [(str(video_episodes[video]), f"Has Video: {video} | Missing: Subtitle")
+                   for video in video_files if video_episodes[video] and video not in matched_videos]
+        missing.extend((decision.episode, f"Has Subtitle: {decision.subtitle} | Missing: Video")
+                       for decision in decisions.values() if decision.new_name is None and decision.rule == RULE_NO_MATCH)
+        if missing:
             csvfile.write("# MISSING MATCHES:\n")
-            for episode in sorted(not_found_episodes):
-                if episode != "(None)":
-                    # Determine what's missing
-                    if episode in temp_video_dict:
-                        csvfile.write(f"# {episode} -> Has Video: {temp_video_dict[episode]} | Missing: Subtitle\n")
-                    else:
-                        csvfile.write(f"# {episode} -> Has Subtitle: {temp_subtitle_dict.get(episode, '(unknown)')} | Missing: Video\n")
+            for episode, line in sorted(missing):
+                csvfile.write(f"# {episode} -> {line}\n")
             csvfile.write("#\n")
         
+        unidentified_files = ([video for video in video_files if not video_episodes[video]] +
+                              [subtitle for subtitle in subtitle_files if subtitle in decisions and decisions[subtitle].episode is None])
         if unidentified_files:
             csvfile.write("# FILES WITHOUT EPISODE PATTERN:\n")
             if movie_mode:
@@ -979,33 +4544,1064 @@ def export_analysis_to_csv(renamed_count=0, movie_mode=False, original_videos=No
     print(f"\nExported file renaming records to:")
     print(f"{csv_path}\n")
 
+def apply_rename_plan(plan_path, directory):
+    """
+    Execute a saved rename plan in directory, in bulk, without matching again.
+    
+    The directory does not have to be the one the plan was made in. Subtitles
+    that are gone are skipped; targets that appeared since planning get the
+    next free name (as during a normal run). Rename cycles are broken with
+    temporary names (see RenamePlan.execution_order).
+    
+    Args:
+        plan_path: Plan file written by --save-plan
+        directory: Directory holding the subtitles
+        
+    Returns:
+        Number of subtitles renamed
+    """
+    plan = RenamePlan.load(plan_path)
+    directory_names = DirectoryNames(directory)
+    
+    print(f"\nAPPLYING RENAME PLAN: {len(plan.jobs)} renames from {plan_path}")
+    print("=" * 60)
+    print(f"Planned: {plan.created} in {plan.directory}")
+    print("-" * 40)
+    
+    present = []
+    for job in plan.jobs:
+        if job.subtitle in directory_names.names if job.source_dir is None else os.path.exists(os.path.join(job.source_dir, job.subtitle)):
+            present.append(job)
+        else:
+            print(f"[WARNING] '{job.subtitle}' not found - skipped")
+    
+    steps = RenamePlan(directory, present).execution_order(directory_names)
+    for step in steps:
+        step.reserve(directory_names)
+    
+    renamed_count = 0
+    for step in execute_renames(steps, directory, directory_names, CONFIG['rename_workers']):
+        if step.rule == RULE_SWAP:
+            print(f"SWAP: '{step.subtitle}' parked as '{step.new_name}' to break a rename cycle")
+        else:
+            print(f"RENAMED: '{step.subtitle}' -> '{step.new_name}'")
+            renamed_count += 1
+    
+    print("=" * 60)
+    print(f"COMPLETED TASK: {renamed_count} subtitle file{'s' if renamed_count != 1 else ''} renamed out of {len(plan.jobs)} planned")
+    print("=" * 60)
+    return renamed_count
+
+# Library catalog ([General] library_catalog, --coverage, --missing)
+CATALOG_FILENAME = 'library_catalog.sqlite'
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    series TEXT COLLATE NOCASE,
+    updated TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    directory_id INTEGER NOT NULL REFERENCES directories(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    series TEXT COLLATE NOCASE,
+    season INTEGER,
+    episode INTEGER,
+    label TEXT,
+    status TEXT NOT NULL,
+    updated TEXT,
+    UNIQUE (directory_id, name)
+);
+CREATE INDEX IF NOT EXISTS files_by_episode ON files (series, season, episode);
+CREATE TABLE IF NOT EXISTS renames (
+    id INTEGER PRIMARY KEY,
+    directory_id INTEGER NOT NULL REFERENCES directories(id) ON DELETE CASCADE,
+    old_name TEXT NOT NULL,
+    new_name TEXT NOT NULL,
+    run TEXT,
+    time TEXT
+);
+CREATE INDEX IF NOT EXISTS renames_by_directory ON renames (directory_id);
+"""
+
+# Pairing status of a catalogued file
+STATUS_SUBTITLED = 'subtitled'        # Video with a subtitle for its episode
+STATUS_MISSING = 'missing'            # Video without one
+STATUS_PAIRED = 'paired'              # Subtitle with a video for its episode
+STATUS_ORPHAN = 'orphan'              # Subtitle without one
+STATUS_UNIDENTIFIED = 'unidentified'  # No episode number found
+
+# Folder names that stand for a season of the series in the folder above
+SEASON_FOLDER_PATTERN = re.compile(r'(?:season|series|saison|staffel|s)[ ._-]*\d{1,4}|specials', re.IGNORECASE)
+
+def series_from_directory(directory):
+    """Series name of a folder: the parent folder's name for season folders ('Show/Season 2'), else its own."""
+    path = os.path.normpath(directory)
+    name = os.path.basename(path)
+    if SEASON_FOLDER_PATTERN.fullmatch(name.strip()):
+        parent = os.path.basename(os.path.dirname(path))
+        if parent:
+            return parent
+    return name
+
+class LibraryCatalog:
+    """
+    SQLite catalog of the library: folders, files, episodes, pairing status and renames.
+    
+    Each processed folder is written as one transaction of upserts: rows of
+    unchanged files are left untouched, changed ones are updated and files
+    that are gone are deleted. WAL mode with a busy timeout lets the worker
+    processes of --recursive write concurrently while queries read. Series
+    names come from the folder layout (see series_from_directory); files
+    are indexed by (series, season, episode), folders by path.
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = path
+        self._connection = sqlite3.connect(str(path), timeout=30)
+        if self._connection.execute("PRAGMA journal_mode").fetchone()[0] != 'wal':
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; never corrupt
+        self._connection.execute("PRAGMA foreign_keys=ON")
+        self._connection.executescript(CATALOG_SCHEMA)
+    
+    def record_directory(self, directory, files, episodes, renames=(), run_id=None):
+        """
+        Bring the catalog entry of one folder up to date.
+        
+        Args:
+            directory: Folder path
+            files: Dict mapping each media filename now in the folder to MEDIA_VIDEO or MEDIA_SUBTITLE
+            episodes: Dict mapping filenames to EpisodeNumber or None
+            renames: (old name, new name) pairs performed by this run
+            run_id: Rename journal run id of this run
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        series = series_from_directory(directory)
+        keys = {MEDIA_VIDEO: set(), MEDIA_SUBTITLE: set()}
+        for name, kind in files.items():
+            if episodes.get(name) is not None:
+                keys[kind].add(episodes[name].key)
+        
+        rows = []
+        for name, kind in files.items():
+            episode = episodes.get(name)
+            if episode is None:
+                status = STATUS_UNIDENTIFIED
+            elif kind == MEDIA_VIDEO:
+                status = STATUS_SUBTITLED if episode.key in keys[MEDIA_SUBTITLE] else STATUS_MISSING
+            else:
+                status = STATUS_PAIRED if episode.key in keys[MEDIA_VIDEO] else STATUS_ORPHAN
+            rows.append((name, kind, series, episode.season if episode else None, episode.episode if episode else None,
+                         str(episode) if episode else None, status, now))
+        
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO directories (path, series, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET series = excluded.series, updated = excluded.updated",
+                (directory, series, now))
+            directory_id = self._connection.execute(
+                "SELECT id FROM directories WHERE path = ?", (directory,)).fetchone()[0]
+            stale = [(directory_id, name) for (name,) in self._connection.execute(
+                "SELECT name FROM files WHERE directory_id = ?", (directory_id,)) if name not in files]
+            self._connection.executemany("DELETE FROM files WHERE directory_id = ? AND name = ?", stale)
+            self._connection.executemany(
+                "INSERT INTO files (directory_id, name, kind, series, season, episode, label, status, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (directory_id, name) DO UPDATE SET kind = excluded.kind, series = excluded.series, "
+                "season = excluded.season, episode = excluded.episode, label = excluded.label, "
+                "status = excluded.status, updated = excluded.updated "
+                "WHERE files.kind IS NOT excluded.kind OR files.series IS NOT excluded.series "
+                "OR files.label IS NOT excluded.label OR files.status IS NOT excluded.status",
+                [(directory_id, *row) for row in rows])
+            self._connection.executemany(
+                "INSERT INTO renames (directory_id, old_name, new_name, run, time) VALUES (?, ?, ?, ?, ?)",
+                [(directory_id, old_name, new_name, run_id, now) for old_name, new_name in renames])
+    
+    def missing(self, series, season=None):
+        """
+        Videos of a series (name matched ignoring case) without a subtitle.
+        
+        Returns:
+            List of (label, video name, folder path) in episode order
+        """
+        query = ("SELECT f.label, f.name, d.path FROM files f JOIN directories d ON d.id = f.directory_id "
+                 "WHERE f.series = ? AND f.kind = ? AND f.status = ?")
+        parameters = [series, MEDIA_VIDEO, STATUS_MISSING]
+        if season is not None:
+            query += " AND f.season = ?"
+            parameters.append(season)
+        return self._connection.execute(query + " ORDER BY f.season, f.episode, f.name", parameters).fetchall()
+    
+    def coverage(self, series=None, season=None):
+        """
+        Subtitle coverage per series and season.
+        
+        Returns:
+            List of (series, season, episodes with a video, of those with a subtitle)
+        """
+        query = ("SELECT series, season, COUNT(DISTINCT episode), "
+                 "COUNT(DISTINCT CASE WHEN status = ? THEN episode END) FROM files WHERE kind = ? AND episode IS NOT NULL")
+        parameters = [STATUS_SUBTITLED, MEDIA_VIDEO]
+        if series is not None:
+            query += " AND series = ?"
+            parameters.append(series)
+        if season is not None:
+            query += " AND season = ?"
+            parameters.append(season)
+        return self._connection.execute(query + " GROUP BY series, season ORDER BY series, season", parameters).fetchall()
+    
+    def similar_series(self, text, limit=10):
+        """Catalogued series names containing text (for 'did you mean' hints)."""
+        escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return [row[0] for row in self._connection.execute(
+            "SELECT DISTINCT series FROM directories WHERE series LIKE ? ESCAPE '\\' ORDER BY series LIMIT ?",
+            (f"%{escaped}%", limit))]
+    
+    def close(self):
+        self._connection.close()
+
+# Opened on first use when library_catalog = true (None until then or when disabled)
+_library_catalog = None
+_library_catalog_failed = False
+
+def get_library_catalog():
+    """
+    Return the shared LibraryCatalog, opening it on first use.
+    
+    Returns:
+        LibraryCatalog, or None if disabled in config.ini or the database
+        could not be opened (a warning is printed once)
+    """
+    global _library_catalog, _library_catalog_failed
+    if _library_catalog is not None or _library_catalog_failed or not CONFIG['library_catalog']:
+        return _library_catalog
+    
+    catalog_path = get_script_directory() / CATALOG_FILENAME
+    try:
+        _library_catalog = LibraryCatalog(catalog_path)
+    except sqlite3.Error as e:
+        print(f"[WARNING] Could not open library catalog {catalog_path}: {e}")
+        print("[INFO] Continuing without library catalog")
+        _library_catalog_failed = True
+    return _library_catalog
+
+def close_library_catalog():
+    """Close the library catalog if it was opened."""
+    global _library_catalog
+    if _library_catalog is not None:
+        _library_catalog.close()
+        _library_catalog = None
+
+def catalog_directory(directory, video_files, subtitle_files, rename_mapping, subtitle_dir=None):
+    """
+    Record a finished run in the library catalog (if enabled).
+    
+    Args:
+        directory: Folder that was processed
+        video_files: Its videos
+        subtitle_files: The subtitles the run started from
+        rename_mapping: Original subtitle name -> new name (None if not renamed)
+        subtitle_dir: Folder the subtitles came from, if not directory (--subtitles-from)
+    """
+    catalog = get_library_catalog()
+    if catalog is None:
+        return
+    files = dict.fromkeys(video_files, MEDIA_VIDEO)
+    renames = []
+    for subtitle in subtitle_files:
+        new_name = rename_mapping.get(subtitle)
+        if subtitle_dir is None and (not new_name or CONFIG['placement'] == 'copy'):
+            files[subtitle] = MEDIA_SUBTITLE
+        if new_name:
+            files[new_name] = MEDIA_SUBTITLE
+            renames.append((subtitle, new_name))
+    _record_in_catalog(catalog, directory, files, renames)
+
+def recatalog_directory(directory, renames=()):
+    """
+    Record a folder in the library catalog (if enabled) from a fresh listing.
+    
+    Used after renames made outside a normal run (--undo), where no file
+    list of the folder is at hand.
+    
+    Args:
+        directory: Folder to record
+        renames: (old name, new name) pairs performed in it
+    """
+    catalog = get_library_catalog()
+    if catalog is None:
+        return
+    try:
+        files = {entry.name: kind for kind, entry in scan_media_files(directory)}
+    except OSError as e:
+        print(f"[WARNING] Could not list {directory} for the library catalog: {e}")
+        return
+    _record_in_catalog(catalog, directory, files, renames)
+
+def _record_in_catalog(catalog, directory, files, renames):
+    """catalog.record_directory() under this run's journal run id; database errors become a warning."""
+    run_id = _rename_journal.run_id if _rename_journal is not None else _rename_journal_run_id
+    try:
+        catalog.record_directory(directory, files, get_episode_numbers(files), renames, run_id)
+    except sqlite3.Error as e:
+        print(f"[WARNING] Could not update library catalog {catalog.path}: {e}")
+
+def open_catalog_for_queries():
+    """Open the library catalog for --coverage / --missing (None, with a message, if there is none yet)."""
+    catalog_path = get_script_directory() / CATALOG_FILENAME
+    if not catalog_path.exists():
+        print(f"[WARNING] No library catalog at {catalog_path}")
+        print("[INFO] Set library_catalog = true in config.ini and process the library (e.g. with --recursive)")
+        return None
+    return LibraryCatalog(catalog_path)
+
+def run_missing_query(series, season=None):
+    """
+    Print the episodes of a series that have a video but no subtitle (--missing).
+    
+    Returns:
+        Number of episodes listed, or None if there is no catalog
+    """
+    catalog = open_catalog_for_queries()
+    if catalog is None:
+        return None
+    try:
+        start = time.perf_counter()
+        rows = catalog.missing(series, season)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"\nMISSING SUBTITLES: {series}{f' season {season}' if season is not None else ''}")
+        print("=" * 60)
+        if not rows and not catalog.coverage(series, season):
+            similar = catalog.similar_series(series)
+            print(f"[WARNING] '{series}' is not in the catalog"
+                  f"{f' - did you mean: ' + ', '.join(similar) if similar else ''}")
+        for label, name, path in rows:
+            print(f"{label}  {name}  ({path})")
+        print("-" * 40)
+        print(f"{len(rows)} episode{'s' if len(rows) != 1 else ''} without subtitles (catalog query: {elapsed_ms:.1f} ms)")
+        return len(rows)
+    finally:
+        catalog.close()
+
+def run_coverage_query(series=None, season=None):
+    """
+    Print subtitle coverage per series and season (--coverage).
+    
+    Returns:
+        Number of (series, season) rows, or None if there is no catalog
+    """
+    catalog = open_catalog_for_queries()
+    if catalog is None:
+        return None
+    try:
+        start = time.perf_counter()
+        rows = catalog.coverage(series, season)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print("\nSUBTITLE COVERAGE:")
+        print("=" * 60)
+        print(f"{'Series':<32} {'Season':>6} {'Episodes':>9} {'Subtitled':>10} {'Coverage':>9}")
+        for series_name, season_number, episodes, subtitled in rows:
+            print(f"{series_name[:32]:<32} {f'S{season_number:02d}':>6} {episodes:>9} {subtitled:>10} "
+                  f"{subtitled / episodes * 100 if episodes else 0.0:>8.1f}%")
+        print("-" * 40)
+        print(f"{len(rows)} season{'s' if len(rows) != 1 else ''} (catalog query: {elapsed_ms:.1f} ms)")
+        return len(rows)
+    finally:
+        catalog.close()
+
+def format_execution_time(seconds):
+    """Human-readable duration, e.g. '4.20 seconds', '3m 12.50s' or '1h 5m 3s'."""
+    if seconds < 60:
+        return f"{seconds:.2f} seconds"
+    if seconds < 3600:
+        minutes = int(seconds // 60)
+        return f"{minutes}m {seconds % 60:.2f}s"
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    return f"{hours}h {minutes}m {seconds % 60:.0f}s"
+
+# Library mode (--recursive)
+LIBRARY_TASK_CHUNK = 4  # Folders handed to a worker process at a time
+
+def compile_folder_matcher(patterns):
+    """
+    Compile folder name patterns (* and ? wildcards, case ignored) into one regex.
+    
+    Returns:
+        Compiled pattern whose fullmatch() tells whether a folder name is
+        ignored, or None if there are no patterns
+    """
+    if not patterns:
+        return None
+    return re.compile('|'.join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns), re.IGNORECASE)
+
+def folder_snapshot(mtime_ns, entry_count, media_names):
+    """
+    Summarize a folder's state for comparison with a later run.
+    
+    Args:
+        mtime_ns: Modification time of the folder itself
+        entry_count: Number of entries in the folder
+        media_names: Names of its video and subtitle files
+        
+    Returns:
+        Tuple of (mtime_ns, entry_count, hash of the sorted media names)
+    """
+    digest = hashlib.sha256('\0'.join(sorted(media_names)).encode('utf-8', 'surrogatepass'))
+    return (mtime_ns, entry_count, digest.hexdigest()[:32])
+
+def take_folder_snapshot(directory):
+    """
+    Snapshot a folder (same result as LibraryWalker gets while listing it).
+    
+    The folder is stat()ed before it is listed, so a change made in between
+    makes the snapshot look outdated (the folder is processed again) rather
+    than current.
+    """
+    mtime_ns = os.stat(directory).st_mtime_ns
+    entry_count = 0
+    media_names = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            entry_count += 1
+            try:
+                if not entry.is_dir() and media_kind(entry.name):
+                    media_names.append(entry.name)
+            except OSError:
+                continue
+    return folder_snapshot(mtime_ns, entry_count, media_names)
+
+SNAPSHOT_FILENAME = 'folder_snapshots.json'
+SNAPSHOT_FORMAT_VERSION = 1
+
+def snapshot_settings_fingerprint():
+    """
+    Fingerprint of the settings that decide how a folder is renamed.
+    
+    Snapshots taken under other settings (language suffix, extensions,
+    placement, episode patterns, ...) do not count: a folder unchanged on
+    disk can still need work after the configuration changed.
+    """
+    settings = {key: CONFIG[key] for key in ('language_suffix', 'video_extensions', 'subtitle_extensions',
+                                             'placement', 'enable_export', 'episode_engine')}
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    digest.update(episode_patterns_fingerprint(EPISODE_PATTERNS).encode('ascii'))
+    return digest.hexdigest()[:32]
+
+class FolderSnapshots:
+    """
+    Snapshots of the folders processed by --recursive, kept between runs.
+    
+    Each folder maps to [mtime_ns, entry_count, names_hash, seconds]: its
+    folder_snapshot() right after it was processed, and how long processing
+    took (to report the time saved by skipping it). The file is tagged with
+    snapshot_settings_fingerprint(); under other settings it starts empty.
+    """
+    
+    def __init__(self, path, fingerprint):
+        """
+        Args:
+            path: JSON file the snapshots are kept in
+            fingerprint: Current snapshot_settings_fingerprint() value
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.folders = {}
+        self.invalidated = False
+    
+    @classmethod
+    def load(cls, path, fingerprint):
+        """
+        Read the snapshots written by an earlier run.
+        
+        Returns:
+            FolderSnapshots (empty if the file is missing, unreadable or
+            written under other settings - a warning is printed if unreadable)
+        """
+        snapshots = cls(path, fingerprint)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return snapshots
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not read folder snapshots {path}: {e} - processing every folder")
+            return snapshots
+        if (not isinstance(data, dict) or data.get('version') != SNAPSHOT_FORMAT_VERSION
+                or data.get('fingerprint') != fingerprint or not isinstance(data.get('folders'), dict)):
+            snapshots.invalidated = True
+            return snapshots
+        snapshots.folders = data['folders']
+        return snapshots
+    
+    def unchanged(self, directory, snapshot):
+        """True if directory looks exactly as it did after it was last processed."""
+        entry = self.folders.get(directory)
+        return isinstance(entry, list) and entry[:3] == list(snapshot)
+    
+    def seconds(self, directory):
+        """Time the last processing of directory took."""
+        entry = self.folders.get(directory)
+        return entry[3] if isinstance(entry, list) and len(entry) > 3 else 0.0
+    
+    def record(self, directory, snapshot, seconds):
+        self.folders[directory] = [*snapshot, round(seconds, 3)]
+    
+    def forget_missing(self, root, directories):
+        """Drop folders under root that no longer hold media (or no longer exist)."""
+        present = set(directories)
+        prefix = os.path.join(root, '')
+        for directory in [d for d in self.folders if (d == root or d.startswith(prefix)) and d not in present]:
+            del self.folders[directory]
+    
+    def save(self):
+        """Write the snapshots (atomically: a crash leaves the previous file intact)."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SNAPSHOT_FORMAT_VERSION, 'fingerprint': self.fingerprint,
+                       'folders': self.folders}, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+class LibraryWalker:
+    """
+    Find the folders of a library that hold videos or subtitles, listing folders in parallel.
+    
+    Each folder is listed with os.scandir() on a thread pool, so on network
+    shares many listings are in flight at once instead of one round trip
+    after another. Subfolders matching the ignore_folders patterns are pruned
+    before they are ever listed. Symlinked folders are followed once the
+    real folders are done, and every folder is identified by (device, inode)
+    and listed only once, so symlink loops end instead of recursing forever
+    and a folder reachable both directly and through a symlink is always
+    found under its real path. Every folder found gets a folder_snapshot()
+    from the same listing (see snapshots).
+    """
+    
+    def __init__(self, root, ignore_matcher=None, threads=None):
+        """
+        Args:
+            root: Library root (included if it holds media itself)
+            ignore_matcher: Compiled pattern of ignored folder names
+                (default: ignore_folders from config.ini)
+            threads: Folders listed at once (default: walker_threads from config.ini)
+        """
+        self.root = root
+        self.ignore_matcher = compile_folder_matcher(CONFIG['ignore_folders']) if ignore_matcher is None else ignore_matcher
+        self.threads = threads or CONFIG['walker_threads']
+        self.listed = 0
+        self.pruned = 0
+        self.revisits = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.snapshots = {}  # Folder found -> folder_snapshot()
+    
+    def _list(self, directory, mtime_ns):
+        """
+        List one folder (runs on a pool thread).
+        
+        Args:
+            directory: Folder to list
+            mtime_ns: Its modification time, from the stat() made before listing it
+        
+        Returns:
+            Tuple of (folder_snapshot() or None if the folder holds no media,
+            [(subfolder path, (device, inode), is symlink, mtime_ns)], subfolders pruned)
+        """
+        matcher = self.ignore_matcher
+        media_names = []
+        entry_count = 0
+        subdirectories = []
+        pruned = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                entry_count += 1
+                try:
+                    if not entry.is_dir():
+                        if media_kind(entry.name):
+                            media_names.append(entry.name)
+                        continue
+                    if matcher is not None and matcher.fullmatch(entry.name):
+                        pruned += 1
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                subdirectories.append((entry.path, (st.st_dev, st.st_ino), entry.is_symlink(), st.st_mtime_ns))
+        snapshot = folder_snapshot(mtime_ns, entry_count, media_names) if media_names else None
+        return snapshot, subdirectories, pruned
+    
+    def walk(self):
+        """
+        Walk the library.
+        
+        Returns:
+            List of the folders holding at least one video or subtitle file,
+            in a stable (sorted, depth-first) order
+        """
+        start_time = time.perf_counter()
+        root_stat = os.stat(self.root)
+        visited = {(root_stat.st_dev, root_stat.st_ino)}
+        found = []
+        symlinked = []  # Followed after the real folders, in sorted order
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            pending = {pool.submit(self._list, self.root, root_stat.st_mtime_ns): self.root}
+            while pending or symlinked:
+                if not pending:
+                    for path, identity, _, mtime_ns in sorted(symlinked):
+                        if identity in visited:
+                            self.revisits += 1  # A symlink back into the tree (or to a folder seen elsewhere)
+                        else:
+                            visited.add(identity)
+                            pending[pool.submit(self._list, path, mtime_ns)] = path
+                    symlinked = []
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory = pending.pop(future)
+                    try:
+                        snapshot, subdirectories, pruned = future.result()
+                    except OSError as e:
+                        print(f"[WARNING] Could not list {directory}: {e}")
+                        self.errors += 1
+                        continue
+                    self.listed += 1
+                    self.pruned += pruned
+                    if snapshot is not None:
+                        found.append(directory)
+                        self.snapshots[directory] = snapshot
+                    for subdirectory in subdirectories:
+                        path, identity, is_symlink, mtime_ns = subdirectory
+                        if is_symlink:
+                            symlinked.append(subdirectory)
+                        elif identity not in visited:  # Bind mounts can show a folder twice
+                            visited.add(identity)
+                            pending[pool.submit(self._list, path, mtime_ns)] = path
+        self.seconds = time.perf_counter() - start_time
+        root_depth = len(os.path.normpath(self.root).split(os.sep))
+        return sorted(found, key=lambda path: os.path.normpath(path).split(os.sep)[root_depth:])
+    
+    def summary(self):
+        """One-line report for the LIBRARY PERFORMANCE section."""
+        rate = self.listed / self.seconds if self.seconds else 0.0
+        notes = [f"{self.pruned} subtrees pruned"]
+        if self.revisits:
+            notes.append(f"{self.revisits} symlinked folders already visited")
+        if self.errors:
+            notes.append(f"{self.errors} unreadable")
+        return (f"{self.listed} folders listed in {self.seconds:.2f}s ({rate:.1f} folders/sec, "
+                f"{self.threads} thread{'s' if self.threads != 1 else ''}) | {' | '.join(notes)}")
+
+def available_cpu_count():
+    """CPU cores this process may run on (respects CPU affinity where the platform reports it)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _init_library_worker(run_id):
+    """Process pool initializer: journal the whole library sweep as one run."""
+    global _rename_journal_run_id
+    _rename_journal_run_id = run_id
+
+def _run_library_directory(directory, dry_run, resume, result):
+    """Per-directory body of process_library_directory() (runs with stdout captured)."""
+    global _episode_cache
+    directory_lock = DirectoryLock(directory)
+    locked = directory_lock.acquire()
+    result['lock_wait'] = directory_lock.waited
+    if not locked:
+        print(directory_lock.busy_message())
+        return 'locked'
+    try:
+        os.chdir(directory)
+        checkpoint = None
+        try:
+            checkpoint = RenameCheckpoint.load(directory)
+        except ValueError as e:
+            print(f"[WARNING] Could not read checkpoint: {e}")
+        if checkpoint is not None and not resume:
+            print("[WARNING] An interrupted run left a checkpoint here - starting over (use --resume to finish it)")
+            checkpoint = None
+        
+        start_time = time.time() - (checkpoint.elapsed if checkpoint is not None else 0.0)
+        # A fresh cache per folder keeps each folder's report independent of which worker ran it
+        _episode_cache = EpisodeCache(CONFIG['episode_cache_size'])
+        manifest_before = (_manifest_stats.reused, _manifest_stats.parsed)
+        plan = checkpoint.plan if checkpoint is not None else RenamePlan(directory)
+        renamed_count, movie_mode_detected, original_videos, original_subtitles, _ = rename_subtitles_to_match_videos(
+            dry_run, plan, checkpoint)
+        time_str = format_execution_time(time.time() - start_time)
+        
+        cache_stats = _episode_cache.stats()
+        result.update(manifest_reused=_manifest_stats.reused - manifest_before[0],
+                      manifest_parsed=_manifest_stats.parsed - manifest_before[1])
+        result.update(files=len(original_videos) + len(original_subtitles), subtitles=len(original_subtitles),
+                      renamed=renamed_count, cache_hits=cache_stats['hits'], cache_misses=cache_stats['misses'])
+        print(f"Folder Summary: {result['files']} files | {renamed_count}/{len(original_subtitles)} subtitles renamed | {time_str}")
+        if CONFIG['episode_engine'] == 'legacy' and CONFIG['adaptive_pattern_order']:
+            print(f"Adaptive Pattern Order: {_adaptive_order.summary()}")
+        if directory_lock.active:
+            print(f"Directory Lock: {directory_lock.summary()}")
+        
+        if CONFIG['enable_export'] and not dry_run:
+            export_analysis_to_csv(plan, movie_mode_detected, original_videos, original_subtitles, time_str, cache_stats)
+        if not dry_run:
+            result['snapshot'] = take_folder_snapshot(directory)  # The folder as this run left it
+        return 'done'
+    finally:
+        if _rename_journal is not None:
+            result['journal_entries'] = _rename_journal.entries
+        close_rename_journal()  # Synced per folder; the next folder reopens it under the same run id
+        persistent_cache = get_persistent_cache()
+        if persistent_cache is not None:
+            try:
+                persistent_cache.flush()
+            except sqlite3.Error as e:
+                print(f"[WARNING] Could not save persistent cache: {e}")
+        directory_lock.release()
+
+def process_library_directory(directory, dry_run=False, resume=False):
+    """
+    Match and rename one folder of a library (--recursive); runs in a worker process.
+    
+    Everything the run prints is captured and returned, so the parent can
+    print each folder's report in one piece and in folder order however the
+    work was spread over the processes. The CSV report is written into the
+    folder itself, as in a single-folder run.
+    
+    Args:
+        directory: Folder to process
+        dry_run: Only plan; no file is renamed and no CSV is written
+        resume: Finish an interrupted run where the folder has a checkpoint
+        
+    Returns:
+        Dictionary with directory, status ('done', 'locked', 'failed' or
+        'interrupted'), output, seconds, the run's counts (files, subtitles,
+        renamed, cache_hits, cache_misses, journal_entries, manifest_reused,
+        manifest_parsed, lock_wait in seconds) and the folder's
+        snapshot after the run (None for dry runs and unfinished folders)
+    """
+    result = {'directory': directory, 'status': 'failed', 'files': 0, 'subtitles': 0, 'renamed': 0,
+              'cache_hits': 0, 'cache_misses': 0, 'journal_entries': 0, 'manifest_reused': 0, 'manifest_parsed': 0,
+              'lock_wait': 0.0, 'snapshot': None}
+    start_time = time.time()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            result['status'] = _run_library_directory(directory, dry_run, resume, result)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not process {directory}: {e}")
+        except KeyboardInterrupt:
+            print("[INFO] Interrupted - progress saved; run again with --resume to finish")
+            result['status'] = 'interrupted'
+    result['output'] = output.getvalue()
+    result['seconds'] = time.time() - start_time
+    return result
+
+def prepare_library_databases(dry_run=False):
+    """
+    Create the SQLite databases the library workers share, in WAL mode, before the pool starts.
+    
+    Switching a new database to WAL needs an exclusive lock, so workers doing
+    it at the same moment on first use failed with "database is locked". The
+    databases are closed again right away (a connection must not be carried
+    into forked workers), and each worker then opens an existing WAL database.
+    """
+    get_persistent_cache()
+    if not dry_run:
+        get_library_catalog()
+    close_persistent_cache()
+    close_library_catalog()
+
+def save_folder_snapshots(snapshots):
+    """Save folder snapshots if there are any (a failure only costs the skipping next time)."""
+    if snapshots is None:
+        return
+    try:
+        snapshots.save()
+    except OSError as e:
+        print(f"[WARNING] Could not save folder snapshots {snapshots.path}: {e}")
+
+def run_library(root, dry_run=False, resume=False, force=False):
+    """
+    Process every folder with media under root on a pool of worker processes.
+    
+    The library is searched with a LibraryWalker. Folders whose snapshot
+    matches the one recorded after they were last processed are skipped
+    (see FolderSnapshots), unless force is set. Workers are forked where
+    the platform allows it, so they start with the configuration already
+    loaded and every regex already compiled. Folder
+    reports are printed in folder order, followed by a library-wide
+    PERFORMANCE summary.
+    
+    Args:
+        root: Library root
+        dry_run: Only plan; no file is renamed and no CSV is written
+        resume: Finish interrupted runs in folders that have a checkpoint
+        force: Process unchanged folders too
+        
+    Returns:
+        Number of folders that could not be processed
+    """
+    global _rename_journal_run_id
+    start_time = time.time()
+    walker = LibraryWalker(root)
+    library = walker.walk()
+    
+    snapshots = None
+    directories = library
+    if CONFIG['folder_snapshots']:
+        snapshots = FolderSnapshots.load(get_script_directory() / SNAPSHOT_FILENAME, snapshot_settings_fingerprint())
+        if not force:
+            directories = [d for d in library if not snapshots.unchanged(d, walker.snapshots[d])]
+    to_process = set(directories)
+    unchanged = [d for d in library if d not in to_process]
+    
+    workers = max(1, min(CONFIG['library_workers'] or available_cpu_count(), len(directories)))
+    run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    
+    print(f"\nLIBRARY MODE: {len(library)} folder{'s' if len(library) != 1 else ''} with media under {root}")
+    if unchanged:
+        print(f"Unchanged since the last run: {len(unchanged)} (skipped - use --force to process them anyway)")
+    elif snapshots is not None and snapshots.invalidated:
+        print("[INFO] Settings changed since the last run - processing every folder")
+    print(f"Worker processes: {workers}")
+    print("=" * 60)
+    
+    task = partial(process_library_directory, dry_run=dry_run, resume=resume)
+    totals = defaultdict(int)
+    statuses = defaultdict(int)
+    pool = None
+    if workers == 1:
+        _rename_journal_run_id = run_id
+        results = map(task, directories)
+    else:
+        prepare_library_databases(dry_run)
+        # fork: no re-import in the workers (config.ini is not read again, patterns are not recompiled)
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                   initializer=_init_library_worker, initargs=(run_id,))
+        results = pool.map(task, directories, chunksize=LIBRARY_TASK_CHUNK)
+    try:
+        for result in results:
+            print(f"\nFOLDER: {result['directory']}")
+            print("=" * 60)
+            print(result['output'], end='')
+            statuses[result['status']] += 1
+            for counter in ('files', 'subtitles', 'renamed', 'cache_hits', 'cache_misses', 'journal_entries',
+                            'manifest_reused', 'manifest_parsed', 'lock_wait'):
+                totals[counter] += result[counter]
+            totals['folder_seconds'] += result['seconds']
+            if snapshots is not None and result['snapshot'] is not None:
+                snapshots.record(result['directory'], result['snapshot'], result['seconds'])
+    except KeyboardInterrupt:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        print("\n[INFO] Interrupted - progress saved; run again with --resume to finish")
+        if not dry_run:
+            save_folder_snapshots(snapshots)
+        sys.exit(130)
+    if pool is not None:
+        pool.shutdown()
+    if snapshots is not None and not dry_run:
+        snapshots.forget_missing(root, library)
+        save_folder_snapshots(snapshots)
+    
+    elapsed_time = time.time() - start_time
+    lookups = totals['cache_hits'] + totals['cache_misses']
+    print("\nLIBRARY PERFORMANCE:")
+    print("=" * 60)
+    print(f"Total Execution Time: {format_execution_time(elapsed_time)}")
+    print(f"Library Walk: {walker.summary()}")
+    not_done = [f"{statuses[status]} {label}" for status, label in
+                (('locked', 'locked by another run'), ('failed', 'failed'), ('interrupted', 'interrupted'))
+                if statuses[status]]
+    print(f"Folders Processed: {statuses['done']}/{len(directories)}{''.join(f' | {note}' for note in not_done)}")
+    if snapshots is not None:
+        saved = sum(snapshots.seconds(d) for d in unchanged)
+        print(f"Folder Snapshots: {len(unchanged)} unchanged folder{'s' if len(unchanged) != 1 else ''} skipped "
+              f"(~{format_execution_time(saved)} saved){' | --force: snapshots ignored' if force else ''}")
+    print(f"Folder Throughput: {len(directories) / elapsed_time if elapsed_time else 0.0:.1f} folders/sec "
+          f"({workers} worker process{'es' if workers != 1 else ''}, "
+          f"{totals['folder_seconds'] / elapsed_time if elapsed_time else 0.0:.1f}x parallel speedup)")
+    print(f"Files Processed: {totals['files']}")
+    print(f"Subtitles Renamed: {totals['renamed']}/{totals['subtitles']}")
+    print(f"Episode Cache: {totals['cache_hits']} hits | {totals['cache_misses']} misses | "
+          f"hit rate {(totals['cache_hits'] / lookups * 100) if lookups else 0.0:.1f}%")
+    if CONFIG['episode_manifest']:
+        manifest_entries = totals['manifest_reused'] + totals['manifest_parsed']
+        print(f"Episode Manifest: {totals['manifest_reused']} entries reused | "
+              f"{totals['manifest_parsed']} new or changed entries parsed | "
+              f"{(totals['manifest_reused'] / manifest_entries * 100) if manifest_entries else 0.0:.1f}% reused")
+    if DirectoryLock(root).active:
+        print(f"Directory Lock: waited {totals['lock_wait']:.3f}s in total (policy: {CONFIG['directory_lock']})")
+    if totals['journal_entries']:
+        print(f"Rename Journal: {totals['journal_entries']} entries | run {run_id} (revert with --undo {run_id})")
+    print("=" * 60)
+    return statuses['failed']
+
+def parse_arguments(argv=None):
+    """
+    Parse command line arguments.
+    
+    Running without arguments keeps the original behavior: process the
+    current working directory.
+    """
+    parser = argparse.ArgumentParser(
+        description="Rename subtitle files to match their corresponding video files."
+    )
+    parser.add_argument('directory', nargs='?',
+                        help="Folder to process (default: current working directory)")
+    parser.add_argument('--compare-engines', metavar='CORPUS',
+                        help="Run every episode detection engine over CORPUS (a file with one "
+                             "filename per line, or a folder) and report disagreements; no files are renamed")
+    parser.add_argument('--optimize-patterns', metavar='CORPUS',
+                        help="Replay CORPUS and propose a cheaper episode pattern order that keeps "
+                             "every result identical; no files are renamed")
+    parser.add_argument('--recursive', action='store_true',
+                        help="Process every folder with media under the folder (a whole library), "
+                             "on several processes (see [Performance] library_workers)")
+    parser.add_argument('--force', action='store_true',
+                        help="With --recursive: also process folders unchanged since the last run")
+    parser.add_argument('--coverage', metavar='SERIES', nargs='?', const='',
+                        help="Show subtitle coverage per season from the library catalog "
+                             "(all series, or only SERIES); no files are renamed")
+    parser.add_argument('--missing', metavar='SERIES',
+                        help="List the episodes of SERIES that have no subtitle, from the library catalog")
+    parser.add_argument('--season', type=int, metavar='N',
+                        help="With --coverage or --missing: only season N")
+    parser.add_argument('--subtitles-from', metavar='DIR',
+                        help="Take the subtitles from DIR (e.g. a downloads folder, also on another drive) "
+                             "and place them next to the matching videos")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Match and report as usual, but rename nothing (no CSV is written)")
+    parser.add_argument('--save-plan', metavar='FILE',
+                        help="Write every rename decision to FILE (JSON), e.g. together with --dry-run")
+    parser.add_argument('--apply-plan', metavar='FILE',
+                        help="Rename the files as recorded in a saved plan, without matching again")
+    parser.add_argument('--resume', action='store_true',
+                        help="Finish a run that was interrupted, from the checkpoint it left in the folder")
+    parser.add_argument('--undo', metavar='RUNS', nargs='?', const='last',
+                        help="Revert renames recorded in the rename journal: 'last' (default), "
+                             "a run id, or FIRST..LAST for a range of runs")
+    args = parser.parse_args(argv)
+    if args.recursive:
+        for option, value in (('--subtitles-from', args.subtitles_from), ('--save-plan', args.save_plan),
+                              ('--apply-plan', args.apply_plan)):
+            if value:
+                parser.error(f"{option} cannot be combined with --recursive")
+    return args
+
 if __name__ == "__main__":
     """
     Main execution block.
     CSV export is now performed AFTER renaming to accurately report results.
     Export is controlled by config.ini (enable_export setting).
     """
+    args = parse_arguments()
+    
+    if args.compare_engines:
+        sys.exit(1 if run_engine_comparison(args.compare_engines) else 0)
+    
+    if args.optimize_patterns:
+        run_pattern_optimizer(args.optimize_patterns)
+        sys.exit(0)
+    
+    if args.missing is not None or args.coverage is not None:
+        try:
+            if args.missing is not None:
+                found = run_missing_query(args.missing, args.season)
+            else:
+                found = run_coverage_query(args.coverage or None, args.season)
+        except sqlite3.Error as e:
+            print(f"[WARNING] Could not read library catalog: {e}")
+            found = None
+        sys.exit(1 if found is None else 0)
+    
+    # Resolve before changing directory, so relative plan paths mean what the user typed
+    save_plan = os.path.abspath(args.save_plan) if args.save_plan else None
+    subtitle_dir = os.path.abspath(args.subtitles_from) if args.subtitles_from else None
+    apply_plan = os.path.abspath(args.apply_plan) if args.apply_plan else None
+    
+    if args.directory:
+        os.chdir(args.directory)
+    
+    if args.undo:
+        try:
+            undo_renames(args.undo)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not undo: {e}")
+            sys.exit(1)
+        finally:
+            close_rename_journal()
+        sys.exit(0)
+    
+    if args.recursive:
+        failed = run_library(os.getcwd(), args.dry_run, args.resume, args.force)
+        close_persistent_cache()
+        close_library_catalog()
+        sys.exit(1 if failed else 0)
+    
+    # One run at a time per directory (see [General] directory_lock)
+    directory_lock = DirectoryLock(os.getcwd())
+    if not directory_lock.acquire():
+        print(directory_lock.busy_message())
+        sys.exit(0 if directory_lock.policy == 'skip' else 1)
+    
+    if apply_plan:
+        try:
+            apply_rename_plan(apply_plan, os.getcwd())
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not apply rename plan {apply_plan}: {e}")
+            sys.exit(1)
+        finally:
+            close_rename_journal()
+        sys.exit(0)
+    
     # Track execution time
     start_time = time.time()
     
-    renamed_count, movie_mode_detected, original_videos, original_subtitles, rename_map = rename_subtitles_to_match_videos()
+    checkpoint = None
+    try:
+        checkpoint = RenameCheckpoint.load(os.getcwd())
+    except ValueError as e:
+        print(f"[WARNING] Could not read checkpoint: {e}")
+    if args.resume and checkpoint is None:
+        print(f"[WARNING] No interrupted run to resume in {os.getcwd()}")
+        sys.exit(1)
+    if checkpoint is not None and not args.resume:
+        print("[WARNING] An interrupted run left a checkpoint here - use --resume to finish it instead of starting over")
+        checkpoint = None
+    if checkpoint is not None:
+        start_time -= checkpoint.elapsed  # Report the combined run
+    
+    plan = checkpoint.plan if checkpoint is not None else RenamePlan(os.getcwd())
+    try:
+        renamed_count, movie_mode_detected, original_videos, original_subtitles, _ = rename_subtitles_to_match_videos(
+            args.dry_run, plan, checkpoint, subtitle_dir)
+    except KeyboardInterrupt:
+        close_rename_journal()
+        print("\n[INFO] Interrupted - progress saved; run again with --resume to finish")
+        sys.exit(130)
+    
+    if save_plan:
+        plan.save(save_plan)
+        print(f"[INFO] Rename plan saved to: {save_plan}\n")
     
     # Calculate execution time
     end_time = time.time()
     elapsed_time = end_time - start_time
     
     # Format time (human-readable)
-    if elapsed_time < 60:
-        time_str = f"{elapsed_time:.2f} seconds"
-    elif elapsed_time < 3600:
-        minutes = int(elapsed_time // 60)
-        seconds = elapsed_time % 60
-        time_str = f"{minutes}m {seconds:.2f}s"
-    else:
-        hours = int(elapsed_time // 3600)
-        minutes = int((elapsed_time % 3600) // 60)
-        seconds = elapsed_time % 60
-        time_str = f"{hours}h {minutes}m {seconds:.0f}s"
+    time_str = format_execution_time(elapsed_time)
     
     # Display performance summary
     print("PERFORMANCE:")
@@ -1013,7 +5609,36 @@ if __name__ == "__main__":
     print(f"Total Execution Time: {time_str}")
     print(f"Files Processed: {len(original_videos) + len(original_subtitles)}")
     print(f"Subtitles Renamed: {renamed_count}/{len(original_subtitles)}")
+    cache_stats = _episode_cache.stats()
+    print(f"Episode Cache: {format_cache_stats(cache_stats)}")
+    print(f"Pattern Telemetry: {_pattern_telemetry.summary()}")
+    if CONFIG['episode_engine'] == 'legacy' and CONFIG['adaptive_pattern_order']:
+        print(f"Adaptive Pattern Order: {_adaptive_order.summary()}")
+    if CONFIG['episode_engine'] == 'legacy' and CONFIG['pattern_prefilter']:
+        print(f"Pattern Prefilter: {_pattern_prefilter.summary()}")
+    if _rename_throughput.renames:
+        print(f"Rename Throughput: {_rename_throughput.summary()}")
+    if _placement_stats.copied_files:
+        print(f"Placement: {_placement_stats.summary()}")
+    if CONFIG['episode_manifest']:
+        print(f"Episode Manifest: {_manifest_stats.summary()}")
+    if directory_lock.active:
+        print(f"Directory Lock: {directory_lock.summary()}")
+    if _rename_journal is not None and _rename_journal.entries:
+        _rename_journal.close()
+        print(f"Rename Journal: {_rename_journal.entries} entries | {_rename_journal.syncs} fsyncs | "
+              f"run {_rename_journal.run_id} (revert with --undo {_rename_journal.run_id})")
+    persistent_cache = get_persistent_cache()
+    if persistent_cache is not None:
+        persistent_cache.flush()
+        print(f"Persistent Cache: {persistent_cache.hits} parses saved | {persistent_cache.misses} new filenames parsed"
+              f"{f' | {persistent_cache.invalidated} stale entries discarded' if persistent_cache.invalidated else ''}")
     print("=" * 60)
     
-    if CONFIG['enable_export']:
-        export_analysis_to_csv(renamed_count, movie_mode_detected, original_videos, original_subtitles, rename_map, time_str)
+    if CONFIG['enable_export'] and not args.dry_run:
+        export_analysis_to_csv(plan, movie_mode_detected, original_videos, original_subtitles, time_str, cache_stats)
+    
+    close_persistent_cache()
+    close_library_catalog()
+    close_rename_journal()
+    directory_lock.release()
@@ -0,0 +1,31 @@
+"""Shared fixtures for the rename_subtitles_to_match_videos_ar tests."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import rename_subtitles_to_match_videos_ar as rs  # noqa: E402
+
+
+@pytest.fixture
+def script(tmp_path_factory, monkeypatch):
+    """
+    The script module with its state files (journal, caches, snapshots) kept in a temporary directory.
+    
+    CONFIG changes made through monkeypatch.setitem are undone after each test.
+    """
+    state_dir = tmp_path_factory.mktemp('script_state')
+    monkeypatch.setattr(rs, 'get_script_directory', lambda: state_dir)
+    monkeypatch.setattr(rs, '_rename_journal', None)
+    monkeypatch.setattr(rs, '_rename_journal_failed', False)
+    monkeypatch.setattr(rs, '_rename_journal_run_id', None)
+    monkeypatch.setattr(rs, '_persistent_cache', None)
+    monkeypatch.setattr(rs, '_persistent_cache_failed', False)
+    monkeypatch.setattr(rs, '_library_catalog', None)
+    monkeypatch.setattr(rs, '_library_catalog_failed', False)
+    yield rs
+    rs.close_rename_journal()
+    rs.close_persistent_cache()
+    rs.close_library_catalog()
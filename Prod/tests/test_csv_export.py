@@ -0,0 +1,52 @@
+"""renaming_report.csv is built from the RenamePlan decisions."""
+
+
+def _table(csv_path):
+    lines = csv_path.read_text(encoding='utf-8').splitlines()
+    header = lines.index("Original Filename,Detected Episode,New Name,Action,Rule,Resolution")
+    rows = {}
+    for line in lines[header + 1:]:
+        if line.startswith('#'):
+            break
+        filename, *columns = line.split(',')
+        rows[filename] = columns
+    return rows
+
+
+def test_rows_come_from_the_plan(script, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    plan = script.RenamePlan(str(tmp_path))
+    plan.add(script.RenameJob('Show S01E01.srt', 'Show S01E01.ar_Show S01E01.srt', 'Show S01E01.mkv',
+                              'Show S01E01', '.srt', 'S01E01', script.RULE_EPISODE,
+                              script.COLLISION_ORIGINAL_NAME))
+    plan.add(script.RenameJob('Show S01E09.srt', None, None, None, None, 'S01E09', script.RULE_NO_MATCH))
+    plan.add(script.RenameJob('notes.srt', None, None, None, None, None, script.RULE_NO_EPISODE))
+    # A subtitle with a matching video but no decision must not be reported as renamed
+    videos = ['Show S01E01.mkv', 'Show S01E02.mkv']
+    subtitles = ['Show S01E01.srt', 'Show S01E02.srt', 'Show S01E09.srt', 'notes.srt']
+    
+    script.export_analysis_to_csv(plan, False, videos, subtitles, '0.01 seconds')
+    
+    csv_path = tmp_path / 'renaming_report.csv'
+    rows = _table(csv_path)
+    assert rows['Show S01E01.srt'] == ['S01E01', 'Show S01E01.ar_Show S01E01.srt', 'RENAMED', 'episode',
+                                       'original name appended']
+    assert rows['Show S01E02.srt'] == ['--', 'No Change', 'SKIPPED', '--', '--']
+    assert rows['Show S01E09.srt'] == ['S01E09', 'No Change', 'NO MATCH', 'no match', '--']
+    assert rows['notes.srt'] == ['(UNIDENTIFIED)', 'No Change', '--', 'no episode', '--']
+    
+    report = csv_path.read_text(encoding='utf-8')
+    assert "# Renamed: 1/4 subtitles" in report
+    assert "# S01E02 -> Has Video: Show S01E02.mkv | Missing: Subtitle" in report
+    assert "# S01E09 -> Has Subtitle: Show S01E09.srt | Missing: Video" in report
+
+
+def test_resumed_decision_without_source_is_skipped(script, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    decision = script.RenameJob('Show S01E01.srt', None, 'Show S01E01.mkv', 'Show S01E01', '.srt', 'S01E01')
+    plan = script.RenamePlan(str(tmp_path), [decision])
+    
+    script.export_analysis_to_csv(plan, False, ['Show S01E01.mkv'], ['Show S01E01.srt'])
+    
+    rows = _table(tmp_path / 'renaming_report.csv')
+    assert rows['Show S01E01.srt'] == ['S01E01', 'No Change', 'SKIPPED', 'episode', '--']
@@ -0,0 +1,114 @@
+"""DirectoryLock policies ([General] directory_lock and lock_timeout)."""
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+fcntl = pytest.importorskip('fcntl')
+
+
+@pytest.fixture
+def other_run(script, tmp_path):
+    """The directory's lock, held through a second file descriptor as another run would hold it."""
+    fd = os.open(tmp_path / script.LOCK_FILENAME, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    yield fd
+    os.close(fd)
+
+
+def _release_after(fd, seconds):
+    timer = threading.Timer(seconds, fcntl.flock, (fd, fcntl.LOCK_UN))
+    timer.start()
+    return timer
+
+
+@pytest.mark.parametrize('policy', ['wait', 'skip'])
+def test_a_free_directory_is_locked_at_once(script, tmp_path, policy):
+    lock = script.DirectoryLock(str(tmp_path), policy, 0)
+    
+    assert lock.acquire() and lock.held
+    other = script.DirectoryLock(str(tmp_path), 'skip', 0)
+    assert not other.acquire()  # Until it is released
+    lock.release()
+    assert other.acquire()
+    other.release()
+
+
+def test_wait_blocks_until_the_other_run_finishes(script, tmp_path, other_run):
+    timer = _release_after(other_run, 0.3)
+    lock = script.DirectoryLock(str(tmp_path), 'wait', 0)
+    
+    assert lock.acquire()
+    timer.join()
+    assert lock.waited >= 0.25
+    assert 'waited' in lock.summary() and 'policy: wait' in lock.summary()
+    lock.release()
+
+
+def test_wait_with_a_timeout_takes_the_lock_once_it_is_free(script, tmp_path, other_run):
+    timer = _release_after(other_run, 0.2)
+    lock = script.DirectoryLock(str(tmp_path), 'wait', 5)
+    
+    assert lock.acquire()
+    timer.join()
+    assert 0.15 <= lock.waited < 5
+    lock.release()
+
+
+def test_wait_gives_up_after_lock_timeout(script, tmp_path, other_run):
+    lock = script.DirectoryLock(str(tmp_path), 'wait', 0.3)
+    
+    assert not lock.acquire()
+    assert lock.waited >= 0.3 and not lock.held
+    assert lock.busy_message().startswith('[WARNING] Gave up waiting')
+    lock.release()  # Nothing to release
+
+
+def test_skip_returns_at_once(script, tmp_path, other_run):
+    lock = script.DirectoryLock(str(tmp_path), 'skip', 10)
+    
+    assert not lock.acquire()
+    assert lock.waited < 0.1
+    assert lock.busy_message().startswith('[INFO] Another run is processing')
+
+
+def test_off_never_locks(script, tmp_path, other_run):
+    lock = script.DirectoryLock(str(tmp_path), 'off', 0)
+    
+    assert not lock.active
+    assert lock.acquire() and not lock.held
+    assert lock.summary() == 'off'
+
+
+def test_policy_and_timeout_default_to_the_config(script, tmp_path, monkeypatch):
+    monkeypatch.setitem(script.CONFIG, 'directory_lock', 'skip')
+    monkeypatch.setitem(script.CONFIG, 'lock_timeout', 2.5)
+    
+    lock = script.DirectoryLock(str(tmp_path))
+    
+    assert (lock.policy, lock.timeout) == ('skip', 2.5)
+
+
+def test_lock_held_by_another_process(script, tmp_path):
+    holder = subprocess.Popen(
+        [sys.executable, '-c',
+         'import fcntl, os, sys, time\n'
+         'fd = os.open(sys.argv[1], os.O_RDWR | os.O_CREAT)\n'
+         'fcntl.flock(fd, fcntl.LOCK_EX)\n'
+         'print("locked", flush=True)\n'
+         'time.sleep(0.4)\n',
+         str(tmp_path / script.LOCK_FILENAME)],
+        stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == 'locked'
+        assert not script.DirectoryLock(str(tmp_path), 'skip', 0).acquire()
+        
+        lock = script.DirectoryLock(str(tmp_path), 'wait', 0)
+        assert lock.acquire()  # The kernel drops the lock when the holder exits
+        assert lock.waited >= 0.2
+        lock.release()
+    finally:
+        holder.wait(timeout=10)
+        holder.stdout.close()
@@ -0,0 +1,80 @@
+"""Every episode detection engine agrees with the legacy pattern loop on the Dev fixtures."""
+import os
+from pathlib import Path
+
+import pytest
+
+DEV_DIR = Path(__file__).resolve().parents[2] / 'Dev'
+
+
+def _fixture_names():
+    names = set()
+    for _, _, filenames in os.walk(DEV_DIR):
+        names.update(filenames)
+    return sorted(names)
+
+
+FIXTURE_NAMES = _fixture_names()
+
+
+@pytest.fixture
+def reference(script, monkeypatch):
+    """Fixed-order legacy results, without the prefilter."""
+    monkeypatch.setitem(script.CONFIG, 'pattern_prefilter', False)
+    return {name: script.get_episode_number_legacy(name) for name in FIXTURE_NAMES}
+
+
+def test_fixtures_were_found(reference):
+    assert len(FIXTURE_NAMES) > 100
+    assert sum(1 for episode in reference.values() if episode) > 50
+
+
+@pytest.mark.parametrize('engine', ['combined', 'lexer'])
+def test_engine_agrees_with_legacy(script, reference, engine):
+    parse = script.EPISODE_ENGINES[engine]
+    disagreements = {name: (reference[name], parse(name)) for name in FIXTURE_NAMES if parse(name) != reference[name]}
+    assert disagreements == {}
+
+
+def test_prefilter_agrees_with_legacy(script, reference, monkeypatch):
+    monkeypatch.setitem(script.CONFIG, 'pattern_prefilter', True)
+    results = {name: script.get_episode_number_legacy(name) for name in FIXTURE_NAMES}
+    assert results == reference
+
+
+@pytest.mark.parametrize('use_prefilter', [False, True], ids=['fixed-order', 'prefilter'])
+def test_adaptive_order_agrees_with_legacy(script, reference, use_prefilter):
+    patterns = script.EPISODE_PATTERNS
+    prefilter = script.PatternPrefilter(patterns) if use_prefilter else None
+
+    # One filename at a time, learning a dominant pattern from the videos first
+    adaptive = script.AdaptivePatternOrder(patterns, prefilter)
+    videos = [name for name in FIXTURE_NAMES if name.endswith(('.mkv', '.mp4'))]
+    for name in videos:
+        adaptive.get_episode_number(name)
+    adaptive.learn_dominant()
+    assert {name: adaptive.get_episode_number(name) for name in FIXTURE_NAMES} == reference
+
+    # Batch parsing, which reuses one regex resolution per filename shape
+    batch = script.AdaptivePatternOrder(patterns, prefilter)
+    assert batch.get_episode_numbers(FIXTURE_NAMES) == reference
+
+
+def test_compare_episode_engines_reports_no_disagreements(script):
+    disagreements, timings = script.compare_episode_engines(FIXTURE_NAMES, ['legacy', 'combined', 'lexer'])
+    assert disagreements == []
+    assert set(timings) == {'legacy', 'combined', 'lexer'}
+
+
+@pytest.mark.parametrize('adaptive', [True, False], ids=['adaptive', 'fixed-order'])
+def test_bulk_parsing_follows_adaptive_pattern_order(script, reference, monkeypatch, adaptive):
+    monkeypatch.setitem(script.CONFIG, 'episode_engine', 'legacy')
+    monkeypatch.setitem(script.CONFIG, 'adaptive_pattern_order', adaptive)
+    monkeypatch.setitem(script.CONFIG, 'persistent_cache', False)
+    monkeypatch.setattr(script, '_episode_cache', script.EpisodeCache(0))
+    batches = []
+    monkeypatch.setattr(script._adaptive_order, 'get_episode_numbers',
+                        lambda filenames: batches.append(filenames) or {name: reference[name] for name in filenames})
+
+    assert script.get_episode_numbers(FIXTURE_NAMES) == reference
+    assert bool(batches) == adaptive
@@ -0,0 +1,101 @@
+"""Renames on a thread pool ([Performance] rename_workers) and their journal."""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_concurrent_first_renames_share_one_journal(script, monkeypatch):
+    created = []
+    
+    class SlowJournal(script.RenameJournal):
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.05)  # Widen the window between the None check and the assignment
+            super().__init__(*args, **kwargs)
+            created.append(self)
+    
+    monkeypatch.setattr(script, 'RenameJournal', SlowJournal)
+    start = threading.Barrier(8)
+    
+    def first_use(_):
+        start.wait()
+        return script.get_rename_journal()
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        journals = list(pool.map(first_use, range(8)))
+    
+    assert len(created) == 1
+    assert all(journal is created[0] for journal in journals)
+
+
+def _jobs(script, directory, pairs):
+    for source, _ in pairs:
+        (directory / source).write_text(source, encoding='utf-8')
+    jobs = [script.RenameJob(source, target, 'video.mkv', target[:-4], '.srt', 'S01E01') for source, target in pairs]
+    plan = script.RenamePlan(str(directory), jobs)
+    directory_names = script.DirectoryNames(str(directory))
+    steps = plan.execution_order(directory_names)
+    for step in steps:
+        step.reserve(directory_names)
+    return steps, directory_names
+
+
+def _slow_place_file(script, monkeypatch, delays, finished):
+    """Delay place_file per source name and record the order renames finish in."""
+    place_file = script.place_file
+    
+    def slow(old_path, new_path, mode):
+        name = os.path.basename(old_path)
+        time.sleep(delays.get(name, 0))
+        place_file(old_path, new_path, mode)
+        finished.append(name)
+    
+    monkeypatch.setattr(script, 'place_file', slow)
+
+
+def _contents(directory):
+    return {path.name: path.read_text(encoding='utf-8') for path in directory.iterdir()
+            if path.name != '.rename_subtitles.lock'}
+
+
+def test_jobs_are_yielded_in_plan_order_when_they_finish_out_of_order(script, tmp_path, monkeypatch):
+    pairs = [(f"sub{i}.srt", f"Show S01E0{i}.srt") for i in range(6)]
+    steps, directory_names = _jobs(script, tmp_path, pairs)
+    finished = []
+    _slow_place_file(script, monkeypatch, {source: 0.05 * (6 - i) for i, (source, _) in enumerate(pairs)}, finished)
+    
+    yielded = list(script.execute_renames(steps, str(tmp_path), directory_names, workers=6))
+    
+    assert yielded == steps
+    assert finished[0] != steps[0].source  # The first job really was the slowest
+    assert _contents(tmp_path) == {target: source for source, target in pairs}
+
+
+def test_a_chain_runs_in_order_on_one_worker(script, tmp_path, monkeypatch):
+    # a.srt -> b.srt has to wait for b.srt -> c.srt, however slow that rename is
+    pairs = [('a.srt', 'b.srt'), ('b.srt', 'c.srt'), ('x.srt', 'y.srt')]
+    steps, directory_names = _jobs(script, tmp_path, pairs)
+    finished = []
+    _slow_place_file(script, monkeypatch, {'b.srt': 0.1}, finished)
+    
+    yielded = list(script.execute_renames(steps, str(tmp_path), directory_names, workers=4))
+    
+    assert [(job.source, job.new_name) for job in yielded] == [('b.srt', 'c.srt'), ('a.srt', 'b.srt'), ('x.srt', 'y.srt')]
+    assert all(job.resolution != script.COLLISION_RETRIED for job in yielded)
+    assert finished.index('b.srt') < finished.index('a.srt')
+    assert finished[0] == 'x.srt'  # The independent job did not wait for the chain
+    assert _contents(tmp_path) == {'b.srt': 'a.srt', 'c.srt': 'b.srt', 'y.srt': 'x.srt'}
+
+
+def test_cycles_and_chains_on_a_thread_pool(script, tmp_path):
+    # Two rotations (each parked through a .swap name), a chain and a plain rename
+    pairs = [('a.srt', 'b.srt'), ('b.srt', 'c.srt'), ('c.srt', 'a.srt'),
+             ('d.srt', 'e.srt'), ('e.srt', 'd.srt'),
+             ('f.srt', 'g.srt'), ('g.srt', 'h.srt'),
+             ('i.srt', 'j.srt')]
+    steps, directory_names = _jobs(script, tmp_path, pairs)
+    
+    yielded = list(script.execute_renames(steps, str(tmp_path), directory_names, workers=4))
+    
+    assert yielded == steps
+    assert _contents(tmp_path) == {target: source for source, target in pairs}
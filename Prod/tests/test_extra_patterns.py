@@ -0,0 +1,54 @@
+"""[Patterns] entries from config.ini under every episode engine."""
+import re
+
+import pytest
+
+
+def _validate(script, engine, patterns):
+    return script.validate_configuration({'episode_engine': engine, 'extra_patterns': patterns})
+
+
+@pytest.mark.parametrize('engine', ['legacy', 'combined', 'lexer'])
+def test_named_groups_and_backreferences_are_rejected(script, engine, capsys):
+    validated = _validate(script, engine, [
+        ('named', r'0: Ep(?P<ep>\d+)x(?P=ep)'),
+        ('named2', r'0: Pt(?P<ep>\d+)'),
+        ('backref', r'0: (\d+)x\1'),
+        ('conditional', r'0: (\d+)(?(1)v|w)'),
+    ])
+    
+    assert validated['extra_patterns'] == ()
+    assert validated['episode_engine'] == engine
+    output = capsys.readouterr().out
+    for name in ('named', 'named2', 'backref', 'conditional'):
+        assert f"Rejected episode pattern '{name}'" in output
+    
+    # The remaining table still compiles into one alternation for the combined engine
+    patterns = script.merge_episode_patterns(script.BUILTIN_EPISODE_PATTERNS, validated['extra_patterns'])
+    matcher = script.CombinedEpisodeMatcher(patterns)
+    index, match, _ = matcher.search('Show Pt07 - 3.mkv')
+    assert index == len(patterns) - 1
+    assert patterns[index][1](match) == ('01', '03')
+
+
+@pytest.mark.parametrize('engine', ['legacy', 'combined'])
+def test_plain_extra_patterns_work_in_the_combined_matcher(script, engine):
+    validated = _validate(script, engine, [
+        ('part', r'0: (?i)Pt(\d+)'),
+        ('bracketed', r'0: \[(\d{1,2})\.(\d{1,3})\]'),
+    ])
+    
+    assert [name for name, _, _, _ in validated['extra_patterns']] == ['part', 'bracketed']
+    patterns = script.merge_episode_patterns(script.BUILTIN_EPISODE_PATTERNS, validated['extra_patterns'])
+    matcher = script.CombinedEpisodeMatcher(patterns)
+    for filename, expected in (('Show pt07.mkv', ('01', '07')), ('Show [2.15].mkv', ('02', '15'))):
+        index, match, _ = matcher.search(filename)
+        assert patterns[index][1](match) == expected
+    # Every stage of the alternation compiles
+    for count in range(1, len(patterns) + 1):
+        assert isinstance(matcher._stage(count), re.Pattern)
+
+
+def test_lexer_falls_back_to_legacy_only_for_accepted_patterns(script):
+    validated = _validate(script, 'lexer', [('part', r'0: Pt(\d+)')])
+    assert validated['episode_engine'] == 'legacy'
@@ -0,0 +1,199 @@
+"""--recursive: library mode over a pool of worker processes."""
+import sqlite3
+
+import pytest
+
+
+def make_library(root, folders=12, episodes=3):
+    """root/Show NN/Season 1 folders, each with matching videos and subtitles."""
+    directories = []
+    for show in range(folders):
+        directory = root / f"Show {show:02d}" / 'Season 1'
+        directory.mkdir(parents=True)
+        for episode in range(1, episodes + 1):
+            (directory / f"Show {show:02d} S01E{episode:02d}.mkv").touch()
+            (directory / f"show.{show:02d}.1x{episode:02d}.srt").write_text(str(episode), encoding='utf-8')
+        directories.append(directory)
+    return directories
+
+
+@pytest.fixture
+def library_config(script, monkeypatch):
+    monkeypatch.setitem(script.CONFIG, 'enable_export', False)
+    monkeypatch.setitem(script.CONFIG, 'directory_lock', 'wait')
+    monkeypatch.setitem(script.CONFIG, 'folder_snapshots', True)
+    return script
+
+
+def test_workers_share_new_databases(library_config, tmp_path, monkeypatch, capsys):
+    script = library_config
+    monkeypatch.setitem(script.CONFIG, 'persistent_cache', True)
+    monkeypatch.setitem(script.CONFIG, 'library_catalog', True)
+    monkeypatch.setitem(script.CONFIG, 'library_workers', 8)
+    monkeypatch.setattr(script, 'LIBRARY_TASK_CHUNK', 1)
+    directories = make_library(tmp_path / 'library', folders=24)
+    
+    assert script.run_library(str(tmp_path / 'library')) == 0
+    
+    output = capsys.readouterr().out
+    assert 'Could not open' not in output and 'Could not save' not in output
+    assert 'Subtitles Renamed: 72/72' in output
+    state_dir = script.get_script_directory()
+    for filename in (script.PERSISTENT_CACHE_FILENAME, script.CATALOG_FILENAME):
+        with sqlite3.connect(state_dir / filename) as connection:
+            assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    with sqlite3.connect(state_dir / script.CATALOG_FILENAME) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM directories").fetchone()[0] == len(directories)
+        assert connection.execute("SELECT COUNT(*) FROM renames").fetchone()[0] == 72
+
+
+def test_prepare_library_databases_leaves_nothing_open(library_config, monkeypatch):
+    script = library_config
+    monkeypatch.setitem(script.CONFIG, 'persistent_cache', True)
+    monkeypatch.setitem(script.CONFIG, 'library_catalog', True)
+    
+    script.prepare_library_databases(dry_run=True)
+    
+    state_dir = script.get_script_directory()
+    assert (state_dir / script.PERSISTENT_CACHE_FILENAME).exists()
+    assert not (state_dir / script.CATALOG_FILENAME).exists()  # A dry run never writes the catalog
+    assert script._persistent_cache is None and script._library_catalog is None
+
+
+def test_a_locked_cache_at_the_end_of_a_folder_is_a_warning(library_config, tmp_path, monkeypatch):
+    script = library_config
+    monkeypatch.setitem(script.CONFIG, 'persistent_cache', True)
+    directory = make_library(tmp_path / 'library', folders=1)[0]
+    
+    def locked_flush(self):
+        raise sqlite3.OperationalError('database is locked')
+    
+    monkeypatch.setattr(script.PersistentEpisodeCache, 'flush', locked_flush)
+    monkeypatch.chdir(tmp_path)
+    
+    result = script.process_library_directory(str(directory))
+    
+    assert result['status'] == 'done'
+    assert result['renamed'] == 3
+    assert '[WARNING] Could not save persistent cache: database is locked' in result['output']
+
+
+def test_folder_reports_include_pattern_order_and_lock_wait(library_config, tmp_path, monkeypatch, capsys):
+    script = library_config
+    monkeypatch.setitem(script.CONFIG, 'library_workers', 1)
+    monkeypatch.setitem(script.CONFIG, 'episode_engine', 'legacy')
+    monkeypatch.setitem(script.CONFIG, 'adaptive_pattern_order', True)
+    monkeypatch.setitem(script.CONFIG, 'lock_timeout', 0.2)
+    free, busy = make_library(tmp_path / 'library', folders=2)
+    holder = script.DirectoryLock(str(busy), 'wait', 0)
+    assert holder.acquire()
+    try:
+        assert script.run_library(str(tmp_path / 'library')) == 0
+    finally:
+        holder.release()
+    
+    output = capsys.readouterr().out
+    free_report = output.split(f"FOLDER: {free}")[1].split('FOLDER:')[0]
+    busy_report = output.split(f"FOLDER: {busy}")[1].split('LIBRARY PERFORMANCE')[0]
+    assert 'Adaptive Pattern Order: dominant pattern #0' in free_report
+    assert 'Directory Lock: waited' in free_report and '(policy: wait)' in free_report
+    assert 'Gave up waiting for another run' in busy_report
+    assert 'Folders Processed: 1/2 | 1 locked by another run' in output
+    total = float(output.split('Directory Lock: waited ')[-1].split('s in total')[0])
+    assert total >= 0.2
+
+
+def _sweep(script, root, capsys, **options):
+    assert script.run_library(str(root), **options) == 0
+    return capsys.readouterr().out
+
+
+@pytest.fixture
+def one_worker(library_config, monkeypatch):
+    monkeypatch.setitem(library_config.CONFIG, 'library_workers', 1)
+    return library_config
+
+
+def test_a_second_sweep_skips_unchanged_folders(one_worker, tmp_path, capsys):
+    script = one_worker
+    directories = make_library(tmp_path / 'library', folders=3)
+    assert 'Folders Processed: 3/3' in _sweep(script, tmp_path / 'library', capsys)
+    
+    output = _sweep(script, tmp_path / 'library', capsys)
+    
+    assert 'Unchanged since the last run: 3' in output
+    assert 'Folders Processed: 0/0' in output and 'FOLDER:' not in output
+    
+    (directories[1] / 'Show 01 S01E04.mkv').touch()
+    output = _sweep(script, tmp_path / 'library', capsys)
+    assert 'Unchanged since the last run: 2' in output
+    assert f"FOLDER: {directories[1]}" in output and 'Folders Processed: 1/1' in output
+
+
+def test_changed_settings_invalidate_the_snapshots(one_worker, tmp_path, monkeypatch, capsys):
+    script = one_worker
+    make_library(tmp_path / 'library', folders=2)
+    _sweep(script, tmp_path / 'library', capsys)
+    fingerprint = script.snapshot_settings_fingerprint()
+    monkeypatch.setitem(script.CONFIG, 'language_suffix', 'en')
+    
+    assert script.snapshot_settings_fingerprint() != fingerprint
+    output = _sweep(script, tmp_path / 'library', capsys)
+    
+    assert '[INFO] Settings changed since the last run - processing every folder' in output
+    assert 'Folders Processed: 2/2' in output
+    snapshots = script.FolderSnapshots.load(script.get_script_directory() / script.SNAPSHOT_FILENAME,
+                                            script.snapshot_settings_fingerprint())
+    assert not snapshots.invalidated and len(snapshots.folders) == 2  # Re-recorded under the new settings
+
+
+def test_force_processes_unchanged_folders(one_worker, tmp_path, capsys):
+    script = one_worker
+    make_library(tmp_path / 'library', folders=2)
+    _sweep(script, tmp_path / 'library', capsys)
+    
+    output = _sweep(script, tmp_path / 'library', capsys, force=True)
+    
+    assert 'Unchanged since the last run' not in output
+    assert 'Folders Processed: 2/2' in output and '--force: snapshots ignored' in output
+
+
+def test_a_dry_run_records_no_snapshots(one_worker, tmp_path, capsys):
+    script = one_worker
+    make_library(tmp_path / 'library', folders=2)
+    _sweep(script, tmp_path / 'library', capsys, dry_run=True)
+    
+    output = _sweep(script, tmp_path / 'library', capsys)
+    
+    assert 'Folders Processed: 2/2' in output
+
+
+def test_walker_prunes_ignored_folders(script, tmp_path, monkeypatch):
+    monkeypatch.setitem(script.CONFIG, 'ignore_folders', ['Sample', 'Extras'])
+    directories = make_library(tmp_path, folders=2)
+    for name in ('Sample', 'Extras'):
+        (directories[0] / name).mkdir()
+        (directories[0] / name / 'Show 00 S01E01.mkv').touch()
+    (directories[1] / 'Samples').mkdir()  # Matches whole names only
+    (directories[1] / 'Samples' / 'clip.mkv').touch()
+    
+    walker = script.LibraryWalker(str(tmp_path))
+    
+    assert walker.walk() == [str(directories[0]), str(directories[1]), str(directories[1] / 'Samples')]
+    assert walker.pruned == 2
+
+
+def test_walker_ends_symlink_loops(script, tmp_path):
+    library = tmp_path / 'library'
+    directories = make_library(library, folders=2)
+    (directories[0] / 'loop').symlink_to(library, target_is_directory=True)  # Back up to the root
+    (library / 'alias').symlink_to(directories[1], target_is_directory=True)  # A second way in
+    outside = make_library(tmp_path / 'elsewhere', folders=1)[0]
+    (library / 'linked').symlink_to(outside.parent, target_is_directory=True)
+    
+    walker = script.LibraryWalker(str(library))
+    found = walker.walk()
+    
+    assert found == [str(directories[0]), str(directories[1]), str(library / 'linked' / 'Season 1')]
+    assert walker.revisits == 2
+    assert len(walker.snapshots) == 3
@@ -0,0 +1,124 @@
+"""LibraryCatalog upserts, --coverage / --missing queries and --undo."""
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def catalog(script, monkeypatch):
+    monkeypatch.setitem(script.CONFIG, 'library_catalog', True)
+    return script.get_library_catalog()
+
+
+def _record(script, catalog, directory, names, renames=()):
+    files = {name: script.media_kind(name) for name in names}
+    catalog.record_directory(str(directory), files, script.get_episode_numbers(files), renames, 'run-1')
+
+
+def _rows(script, query, *parameters):
+    with sqlite3.connect(script.get_script_directory() / script.CATALOG_FILENAME) as connection:
+        return connection.execute(query, parameters).fetchall()
+
+
+def _files(script):
+    return dict(_rows(script, "SELECT name, status FROM files"))
+
+
+def test_record_directory_pairs_files_by_episode(script, catalog, tmp_path):
+    _record(script, catalog, tmp_path / 'Show' / 'Season 1',
+            ['Show S01E01.mkv', 'Show S01E01.ar.srt', 'Show S01E02.mkv', 'Show S01E03.ar.srt', 'extras.mkv'],
+            [('show.1x01.srt', 'Show S01E01.ar.srt')])
+    
+    assert _files(script) == {'Show S01E01.mkv': script.STATUS_SUBTITLED, 'Show S01E01.ar.srt': script.STATUS_PAIRED,
+                              'Show S01E02.mkv': script.STATUS_MISSING, 'Show S01E03.ar.srt': script.STATUS_ORPHAN,
+                              'extras.mkv': script.STATUS_UNIDENTIFIED}
+    assert _rows(script, "SELECT series FROM directories") == [('Show',)]
+    assert _rows(script, "SELECT old_name, new_name, run FROM renames") == [
+        ('show.1x01.srt', 'Show S01E01.ar.srt', 'run-1')]
+
+
+def test_changed_rows_are_updated_and_vanished_rows_deleted(script, catalog, tmp_path):
+    directory = tmp_path / 'Show'
+    _record(script, catalog, directory, ['Show S01E01.mkv', 'Show S01E01.ar.srt', 'Show S01E02.mkv'])
+    
+    _record(script, catalog, directory, ['Show S01E01.mkv', 'Show S01E02.mkv', 'Show S01E02.ar.srt'])
+    
+    assert _files(script) == {'Show S01E01.mkv': script.STATUS_MISSING, 'Show S01E02.mkv': script.STATUS_SUBTITLED,
+                              'Show S01E02.ar.srt': script.STATUS_PAIRED}
+    assert _rows(script, "SELECT COUNT(*) FROM directories") == [(1,)]
+
+
+def test_an_unchanged_file_keeps_its_row(script, catalog, tmp_path):
+    names = ['Show S01E01.mkv', 'Show S01E01.ar.srt']
+    _record(script, catalog, tmp_path / 'Show', names)
+    with sqlite3.connect(script.get_script_directory() / script.CATALOG_FILENAME) as connection:
+        connection.execute("UPDATE files SET updated = 'earlier'")
+    
+    _record(script, catalog, tmp_path / 'Show', names)
+    
+    assert _rows(script, "SELECT DISTINCT updated FROM files") == [('earlier',)]
+
+
+@pytest.fixture
+def library(script, catalog, tmp_path):
+    """Two seasons of one series and a second series, recorded and closed."""
+    _record(script, catalog, tmp_path / 'Show' / 'Season 1',
+            ['Show S01E01.mkv', 'Show S01E01.ar.srt', 'Show S01E02.mkv', 'Show S01E03.mkv'])
+    _record(script, catalog, tmp_path / 'Show' / 'Season 2', ['Show S02E01.mkv', 'Show S02E01.ar.srt'])
+    _record(script, catalog, tmp_path / 'Other Show', ['Other Show S01E01.mkv'])
+    script.close_library_catalog()
+    return tmp_path
+
+
+def test_coverage_query(script, library, capsys):
+    assert script.run_coverage_query() == 3
+    
+    output = capsys.readouterr().out
+    lines = [line.split() for line in output.splitlines()]
+    assert ['Other', 'Show', 'S01', '1', '0', '0.0%'] in lines
+    assert ['Show', 'S01', '3', '1', '33.3%'] in lines
+    assert ['Show', 'S02', '1', '1', '100.0%'] in lines
+    assert script.run_coverage_query('show', 2) == 1  # Series names match ignoring case
+
+
+def test_missing_query(script, library, capsys):
+    assert script.run_missing_query('Show') == 2
+    
+    output = capsys.readouterr().out
+    assert f"S01E02  Show S01E02.mkv  ({library / 'Show' / 'Season 1'})" in output
+    assert 'S01E03  Show S01E03.mkv' in output
+    assert '2 episodes without subtitles' in output
+    assert script.run_missing_query('Show', 2) == 0
+
+
+def test_missing_query_suggests_similar_series(script, library, capsys):
+    assert script.run_missing_query('Other') == 0
+    assert "[WARNING] 'Other' is not in the catalog - did you mean: Other Show" in capsys.readouterr().out
+
+
+def test_queries_without_a_catalog(script, capsys):
+    assert script.run_coverage_query() is None
+    assert script.run_missing_query('Show') is None
+    assert '[WARNING] No library catalog at' in capsys.readouterr().out
+
+
+def test_undo_brings_the_catalog_up_to_date(script, catalog, tmp_path, monkeypatch):
+    monkeypatch.setitem(script.CONFIG, 'enable_export', False)
+    monkeypatch.setitem(script.CONFIG, 'library_workers', 1)
+    directory = tmp_path / 'Show' / 'Season 1'
+    directory.mkdir(parents=True)
+    for episode in (1, 2):
+        (directory / f"Show S01E0{episode}.mkv").touch()
+        (directory / f"show.1x0{episode}.srt").write_text(str(episode), encoding='utf-8')
+    assert script.run_library(str(tmp_path / 'Show')) == 0
+    assert sorted(_files(script)) == ['Show S01E01.ar.srt', 'Show S01E01.mkv', 'Show S01E02.ar.srt', 'Show S01E02.mkv']
+    script.close_rename_journal()
+    monkeypatch.setattr(script, '_rename_journal', None)
+    monkeypatch.setattr(script, '_rename_journal_run_id', 'undo-1')
+    
+    assert script.undo_renames('last') == (2, 0)
+    
+    assert _files(script) == {'Show S01E01.mkv': script.STATUS_SUBTITLED, 'show.1x01.srt': script.STATUS_PAIRED,
+                              'Show S01E02.mkv': script.STATUS_SUBTITLED, 'show.1x02.srt': script.STATUS_PAIRED}
+    assert sorted(_rows(script, "SELECT old_name, new_name FROM renames WHERE run = 'undo-1'")) == [
+        ('Show S01E01.ar.srt', 'show.1x01.srt'), ('Show S01E02.ar.srt', 'show.1x02.srt')]
@@ -0,0 +1,32 @@
+"""The asyncio pipeline ([Performance] pipeline) with a folder manifest."""
+import threading
+
+
+def test_manifest_is_checked_on_the_loop_thread(script, tmp_path, monkeypatch):
+    library = tmp_path / 'Show'
+    library.mkdir()
+    for episode in range(1, 6):
+        (library / f"Show S01E{episode:02d}.mkv").touch()
+        (library / f"show.1x{episode:02d}.srt").touch()
+    monkeypatch.chdir(library)
+    monkeypatch.setitem(script.CONFIG, 'pipeline', True)
+    monkeypatch.setitem(script.CONFIG, 'episode_manifest', True)
+    monkeypatch.setitem(script.CONFIG, 'rename_workers', 4)
+    monkeypatch.setattr(script, 'PIPELINE_BATCH_SIZE', 2)
+    
+    check_threads = set()
+    original_check = script.DirectoryManifest.check
+    
+    def recording_check(self, scanned):
+        check_threads.add(threading.current_thread())
+        return original_check(self, scanned)
+    
+    monkeypatch.setattr(script.DirectoryManifest, 'check', recording_check)
+    
+    renamed_count, *_ = script.rename_subtitles_to_match_videos()
+    
+    assert renamed_count == 5
+    assert check_threads == {threading.main_thread()}
+    assert sorted(path.name for path in library.glob('*.srt')) == [
+        f"Show S01E{episode:02d}.ar.srt" for episode in range(1, 6)]
+    assert (library / script.MANIFEST_FILENAME).exists()
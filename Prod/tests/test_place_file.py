@@ -0,0 +1,166 @@
+"""place_file() and the _copy_file_data() fallback chain ([General] placement)."""
+import errno
+import os
+import threading
+
+import pytest
+
+DATA = b'1\n00:00:01,000 --> 00:00:02,000\nsubtitle\n' * 100
+
+
+def _error(code):
+    return OSError(code, os.strerror(code))
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'downloads' / 'show.1x01.srt'
+    path.parent.mkdir()
+    path.write_bytes(DATA)
+    os.chmod(path, 0o640)
+    os.utime(path, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+    return path
+
+
+@pytest.fixture
+def layers(script, monkeypatch):
+    """
+    Replace each copy layer with a fake that copies the data or fails with a chosen errno.
+    
+    A failing layer writes some junk first, so the next layer must start from scratch.
+    """
+    if script.fcntl is None or not script.sys.platform.startswith('linux'):
+        pytest.skip("reflinks are only tried on Linux")
+    failures = {}
+    calls = []
+    
+    def fail_if_asked(layer, dst_fd):
+        calls.append(layer)
+        if layer in failures:
+            os.write(dst_fd, b'junk')
+            raise _error(failures[layer])
+    
+    def ioctl(dst_fd, request, src_fd):
+        assert request == script.FICLONE
+        fail_if_asked(script.PLACE_REFLINK, dst_fd)
+        os.write(dst_fd, os.pread(src_fd, len(DATA) + 1, 0))
+        return 0
+    
+    def copy_file_range(src_fd, dst_fd, count, offset_src, offset_dst):
+        fail_if_asked(script.PLACE_COPY_FILE_RANGE, dst_fd)
+        return os.pwrite(dst_fd, os.pread(src_fd, count, offset_src), offset_dst)
+    
+    def sendfile(out_fd, in_fd, offset, count):
+        fail_if_asked(script.PLACE_SENDFILE, out_fd)
+        return os.write(out_fd, os.pread(in_fd, count, offset))
+    
+    monkeypatch.setattr(script.fcntl, 'ioctl', ioctl)
+    monkeypatch.setattr(os, 'copy_file_range', copy_file_range, raising=False)
+    monkeypatch.setattr(os, 'sendfile', sendfile, raising=False)
+    return failures, calls
+
+
+def _partials(directory):
+    return [path.name for path in directory.iterdir() if path.name.endswith('.partial')]
+
+
+def test_move_on_one_filesystem_is_a_rename(script, source, tmp_path):
+    target = tmp_path / 'downloads' / 'Show S01E01.ar.srt'
+    assert script.place_file(str(source), str(target)) == script.PLACE_RENAME
+    assert target.read_bytes() == DATA
+    assert not source.exists()
+
+
+@pytest.mark.parametrize('failing, expected', [
+    ({}, 'reflink'),
+    ({'reflink': errno.EOPNOTSUPP}, 'copy_file_range'),
+    ({'reflink': errno.EXDEV, 'copy_file_range': errno.EXDEV}, 'sendfile'),
+    ({'reflink': errno.EINVAL, 'copy_file_range': errno.ENOSYS, 'sendfile': errno.EINVAL}, 'buffered'),
+    ({'reflink': errno.ENOTTY, 'copy_file_range': errno.EINVAL, 'sendfile': errno.ENOSYS}, 'buffered'),
+])
+def test_copy_falls_through_unsupported_layers(script, source, tmp_path, layers, failing, expected):
+    failures, calls = layers
+    failures.update(failing)
+    target = tmp_path / 'Show S01E01.ar.srt'
+    
+    method = script.place_file(str(source), str(target), 'copy')
+    
+    assert method == expected
+    tried = list(dict.fromkeys(calls))
+    assert tried == [layer for layer in ('reflink', 'copy_file_range', 'sendfile') if layer in failing or layer == expected]
+    assert target.read_bytes() == DATA
+    assert source.read_bytes() == DATA  # copy keeps the original
+    assert (target.stat().st_mode & 0o777, target.stat().st_mtime_ns) == (0o640, 1_600_000_000_000_000_000)
+    assert _partials(tmp_path) == []
+
+
+def test_move_across_filesystems_copies_then_deletes_the_source(script, source, tmp_path, layers, monkeypatch):
+    failures, _ = layers
+    failures.update({'reflink': errno.EXDEV, 'copy_file_range': errno.EXDEV})
+    real_rename_no_replace = script.rename_no_replace
+    
+    def rename_no_replace(old_path, new_path):
+        if old_path == str(source):
+            raise _error(errno.EXDEV)
+        real_rename_no_replace(old_path, new_path)
+    
+    monkeypatch.setattr(script, 'rename_no_replace', rename_no_replace)
+    target = tmp_path / 'Show S01E01.ar.srt'
+    
+    assert script.place_file(str(source), str(target), 'move') == script.PLACE_SENDFILE
+    assert target.read_bytes() == DATA
+    assert not source.exists()
+    assert _partials(tmp_path) == []
+
+
+def test_failed_copy_leaves_no_partial_file(script, source, tmp_path, layers):
+    failures, _ = layers
+    failures.update({'reflink': errno.EOPNOTSUPP, 'copy_file_range': errno.EIO})  # EIO is a real failure
+    target = tmp_path / 'Show S01E01.ar.srt'
+    
+    with pytest.raises(OSError) as raised:
+        script.place_file(str(source), str(target), 'copy')
+    
+    assert raised.value.errno == errno.EIO
+    assert not target.exists()
+    assert source.read_bytes() == DATA
+    assert _partials(tmp_path) == []
+
+
+def test_copy_never_replaces_an_existing_target(script, source, tmp_path):
+    target = tmp_path / 'Show S01E01.ar.srt'
+    target.write_bytes(b'existing')
+    with pytest.raises(FileExistsError):
+        script.place_file(str(source), str(target), 'copy')
+    assert target.read_bytes() == b'existing'
+    assert _partials(tmp_path) == []
+
+
+def test_target_created_during_copy_retries_with_the_next_free_name(script, source, tmp_path, layers, monkeypatch):
+    """The final no-replace rename fails with EEXIST: the .partial file goes and _perform_rename picks a new name."""
+    failures, _ = layers
+    failures['reflink'] = errno.EOPNOTSUPP
+    monkeypatch.setitem(script.CONFIG, 'placement', 'copy')
+    (tmp_path / 'Show S01E01.mkv').touch()
+    directory_names = script.DirectoryNames(str(tmp_path))
+    job = script.RenameJob('show.1x01.srt', 'Show S01E01.ar.srt', 'Show S01E01.mkv', 'Show S01E01', '.srt',
+                           'S01E01', source_dir=str(source.parent))
+    job.reserve(directory_names)
+    real_rename_no_replace = script.rename_no_replace
+    
+    def rename_no_replace(old_path, new_path):
+        if os.path.basename(new_path) == 'Show S01E01.ar.srt':
+            (tmp_path / 'Show S01E01.ar.srt').write_bytes(b'another run')  # Wins the race
+            assert _partials(tmp_path) == ['.Show S01E01.ar.srt.partial']
+        real_rename_no_replace(old_path, new_path)
+    
+    monkeypatch.setattr(script, 'rename_no_replace', rename_no_replace)
+    
+    script._perform_rename(job, str(tmp_path), directory_names, threading.Lock())
+    
+    assert job.resolution == script.COLLISION_RETRIED
+    assert job.new_name == 'Show S01E01.ar_show.1x01.srt'
+    assert (tmp_path / 'Show S01E01.ar.srt').read_bytes() == b'another run'
+    assert (tmp_path / job.new_name).read_bytes() == DATA
+    assert source.read_bytes() == DATA
+    assert _partials(tmp_path) == []
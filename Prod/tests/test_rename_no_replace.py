@@ -0,0 +1,102 @@
+"""rename_no_replace(): renameat2(RENAME_NOREPLACE) and its portable fallbacks."""
+import ctypes
+import errno
+import os
+import threading
+
+import pytest
+
+
+def _failing_renameat2(error):
+    calls = []
+    
+    def renameat2(*args):
+        calls.append(args)
+        ctypes.set_errno(error)
+        return -1
+    
+    renameat2.calls = calls
+    return renameat2
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / 'old.srt').write_text('subtitle', encoding='utf-8')
+    (tmp_path / 'taken.srt').write_text('keep me', encoding='utf-8')
+    return tmp_path
+
+
+def test_renames_and_refuses_to_replace(script, files):
+    with pytest.raises(FileExistsError):
+        script.rename_no_replace(str(files / 'old.srt'), str(files / 'taken.srt'))
+    assert (files / 'taken.srt').read_text(encoding='utf-8') == 'keep me'
+    
+    script.rename_no_replace(str(files / 'old.srt'), str(files / 'new.srt'))
+    assert sorted(path.name for path in files.iterdir()) == ['new.srt', 'taken.srt']
+
+
+@pytest.mark.parametrize('error, keeps_renameat2', [(errno.EINVAL, True), (errno.ENOSYS, False)],
+                         ids=['EINVAL', 'ENOSYS'])
+def test_unsupported_flag_falls_back_to_link_and_unlink(script, files, monkeypatch, error, keeps_renameat2):
+    renameat2 = _failing_renameat2(error)
+    monkeypatch.setattr(script, '_renameat2', renameat2)
+    links = []
+    real_link = os.link
+    monkeypatch.setattr(os, 'link', lambda *args, **kwargs: links.append(args) or real_link(*args, **kwargs))
+    
+    script.rename_no_replace(str(files / 'old.srt'), str(files / 'new.srt'))
+    
+    assert len(renameat2.calls) == 1 and len(links) == 1
+    assert (files / 'new.srt').read_text(encoding='utf-8') == 'subtitle'
+    assert not (files / 'old.srt').exists()
+    # EINVAL is per filesystem, ENOSYS means the kernel lacks renameat2 entirely
+    assert (script._renameat2 is renameat2) == keeps_renameat2
+    
+    with pytest.raises(FileExistsError):
+        script.rename_no_replace(str(files / 'new.srt'), str(files / 'taken.srt'))
+    assert (files / 'taken.srt').read_text(encoding='utf-8') == 'keep me'
+
+
+def test_other_renameat2_errors_are_raised(script, files, monkeypatch):
+    monkeypatch.setattr(script, '_renameat2', _failing_renameat2(errno.EACCES))
+    with pytest.raises(PermissionError):
+        script.rename_no_replace(str(files / 'old.srt'), str(files / 'new.srt'))
+    assert (files / 'old.srt').exists()
+
+
+@pytest.mark.parametrize('link_error', [errno.EPERM, errno.EXDEV, errno.ENOTSUP], ids=['EPERM', 'EXDEV', 'ENOTSUP'])
+def test_without_hard_links_checks_then_renames(script, files, monkeypatch, link_error):
+    monkeypatch.setattr(script, '_renameat2', None)
+    
+    def no_link(*args, **kwargs):
+        raise OSError(link_error, os.strerror(link_error))
+    
+    monkeypatch.setattr(os, 'link', no_link)
+    
+    with pytest.raises(FileExistsError):
+        script.rename_no_replace(str(files / 'old.srt'), str(files / 'taken.srt'))
+    assert (files / 'taken.srt').read_text(encoding='utf-8') == 'keep me'
+    
+    script.rename_no_replace(str(files / 'old.srt'), str(files / 'new.srt'))
+    assert (files / 'new.srt').read_text(encoding='utf-8') == 'subtitle'
+    assert not (files / 'old.srt').exists()
+
+
+@pytest.mark.parametrize('renameat2_error', [None, errno.EINVAL], ids=['renameat2', 'link-fallback'])
+def test_target_created_after_planning_gets_the_next_free_name(script, tmp_path, monkeypatch, renameat2_error):
+    if renameat2_error is not None:
+        monkeypatch.setattr(script, '_renameat2', _failing_renameat2(renameat2_error))
+    (tmp_path / 'Show S01E01.mkv').touch()
+    (tmp_path / 'show.1x01.srt').write_text('subtitle', encoding='utf-8')
+    directory_names = script.DirectoryNames(str(tmp_path))
+    job = script.RenameJob('show.1x01.srt', 'Show S01E01.ar.srt', 'Show S01E01.mkv', 'Show S01E01', '.srt', 'S01E01')
+    job.reserve(directory_names)
+    (tmp_path / 'Show S01E01.ar.srt').write_text('another run', encoding='utf-8')  # Appears after planning
+    
+    script._perform_rename(job, str(tmp_path), directory_names, threading.Lock())
+    
+    assert job.resolution == script.COLLISION_RETRIED
+    assert job.new_name == 'Show S01E01.ar_show.1x01.srt'
+    assert (tmp_path / 'Show S01E01.ar.srt').read_text(encoding='utf-8') == 'another run'
+    assert (tmp_path / job.new_name).read_text(encoding='utf-8') == 'subtitle'
+    assert not (tmp_path / 'show.1x01.srt').exists()
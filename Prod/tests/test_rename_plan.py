@@ -0,0 +1,143 @@
+"""RenamePlan ordering, validation and --save-plan / --apply-plan."""
+import pytest
+
+
+def _job(script, source, target):
+    base_name = target.rsplit('.', 1)[0]
+    return script.RenameJob(source, target, f"{base_name}.mkv", base_name, '.srt', 'S01E01')
+
+
+def _write(directory, contents):
+    for name, text in contents.items():
+        (directory / name).write_text(text, encoding='utf-8')
+
+
+def _read(directory):
+    return {path.name: path.read_text(encoding='utf-8') for path in directory.iterdir()
+            if path.name != '.rename_subtitles.lock'}
+
+
+def _run(script, steps, directory):
+    directory_names = script.DirectoryNames(str(directory))
+    for step in steps:
+        step.reserve(directory_names)
+    return list(script.execute_renames(steps, str(directory), directory_names))
+
+
+def test_chain_runs_back_to_front(script, tmp_path):
+    _write(tmp_path, {'a.srt': 'A', 'b.srt': 'B'})
+    plan = script.RenamePlan(str(tmp_path), [_job(script, 'a.srt', 'b.srt'), _job(script, 'b.srt', 'c.srt')])
+    
+    steps = plan.execution_order(script.DirectoryNames(str(tmp_path)))
+    
+    assert [(step.source, step.new_name) for step in steps] == [('b.srt', 'c.srt'), ('a.srt', 'b.srt')]
+    _run(script, steps, tmp_path)
+    assert _read(tmp_path) == {'b.srt': 'A', 'c.srt': 'B'}
+
+
+@pytest.mark.parametrize('names', [['a.srt', 'b.srt'], ['a.srt', 'b.srt', 'c.srt']], ids=['pair', 'three'])
+def test_cycle_is_broken_with_a_swap_name(script, tmp_path, names):
+    _write(tmp_path, {name: name.upper() for name in names})
+    rotated = names[1:] + names[:1]
+    plan = script.RenamePlan(str(tmp_path), [_job(script, source, target) for source, target in zip(names, rotated)])
+    
+    steps = plan.execution_order(script.DirectoryNames(str(tmp_path)))
+    
+    swaps = [step for step in steps if step.rule == script.RULE_SWAP]
+    assert len(swaps) == 1 and len(steps) == len(names) + 1
+    assert steps[0] is swaps[0]
+    assert swaps[0].new_name == f".{swaps[0].subtitle}{script.PLAN_SWAP_SUFFIX}"
+    assert steps[-1].source == swaps[0].new_name  # The parked file finishes the cycle
+    
+    _run(script, steps, tmp_path)
+    assert _read(tmp_path) == {target: source.upper() for source, target in zip(names, rotated)}
+
+
+def test_swap_name_in_use_gets_a_number(script, tmp_path):
+    _write(tmp_path, {'a.srt': 'A', 'b.srt': 'B', '.a.srt.swap': 'stale'})
+    plan = script.RenamePlan(str(tmp_path), [_job(script, 'a.srt', 'b.srt'), _job(script, 'b.srt', 'a.srt')])
+    
+    steps = plan.execution_order(script.DirectoryNames(str(tmp_path)))
+    
+    assert steps[0].new_name == '.a.srt_1.swap'
+    _run(script, steps, tmp_path)
+    assert _read(tmp_path) == {'a.srt': 'B', 'b.srt': 'A', '.a.srt.swap': 'stale'}
+
+
+def test_plan_round_trips_through_to_dict(script, tmp_path):
+    plan = script.RenamePlan(str(tmp_path), [
+        _job(script, 'a.srt', 'Show.ar.srt'),
+        script.RenameJob('x.srt', None, None, None, None, None, script.RULE_NO_EPISODE),
+    ])
+    
+    loaded = script.RenamePlan.from_dict(plan.to_dict())
+    
+    assert loaded.to_dict() == plan.to_dict()
+    assert loaded.rename_map() == {'a.srt': 'Show.ar.srt'}
+
+
+@pytest.mark.parametrize('change, message', [
+    ({'version': 99}, 'unsupported rename plan format'),
+    ({'decisions': [{'source': 'a.srt', 'target': 'x.srt'}, {'source': 'b.srt', 'target': 'x.srt'}]}, 'more than once'),
+    ({'decisions': [{'source': 'a.srt', 'target': 'x.srt'}, {'source': 'a.srt', 'target': 'y.srt'}]}, 'more than once'),
+    ({'decisions': [{'source': 'a.srt', 'target': '../x.srt'}]}, 'invalid file name'),
+    ({'decisions': [{'source': '..', 'target': 'x.srt'}]}, 'invalid file name'),
+    ({'decisions': [{'target': 'x.srt'}]}, 'without a source'),
+    ({'decisions': [{'source': 'a.srt', 'target': 'x.srt', 'source_dir': 'relative/dir'}]}, 'invalid source directory'),
+])
+def test_from_dict_rejects_invalid_plans(script, change, message):
+    data = {'version': script.PLAN_FORMAT_VERSION, 'decisions': []}
+    data.update(change)
+    with pytest.raises(ValueError, match=message):
+        script.RenamePlan.from_dict(data)
+
+
+def test_from_dict_rejects_non_plans(script):
+    with pytest.raises(ValueError, match='unsupported rename plan format'):
+        script.RenamePlan.from_dict([])
+
+
+def test_saved_swap_plan_applies_elsewhere(script, tmp_path):
+    planned = tmp_path / 'planned'
+    target = tmp_path / 'target'
+    planned.mkdir()
+    target.mkdir()
+    plan = script.RenamePlan(str(planned), [
+        _job(script, 'a.srt', 'b.srt'),
+        _job(script, 'b.srt', 'a.srt'),
+        _job(script, 'gone.srt', 'c.srt'),
+    ])
+    plan_path = tmp_path / 'plan.json'
+    plan.save(plan_path)
+    _write(target, {'a.srt': 'A', 'b.srt': 'B'})
+    
+    renamed = script.apply_rename_plan(plan_path, str(target))
+    
+    assert renamed == 2
+    assert _read(target) == {'a.srt': 'B', 'b.srt': 'A'}
+
+
+def test_apply_plan_rejects_a_damaged_file(script, tmp_path):
+    plan_path = tmp_path / 'plan.json'
+    plan_path.write_text('{"version": 1, "decisions": [{"source": "a/b.srt"}]}', encoding='utf-8')
+    with pytest.raises(ValueError):
+        script.apply_rename_plan(plan_path, str(tmp_path))
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_swap_name_created_after_planning_is_retried(script, tmp_path, workers):
+    _write(tmp_path, {'a.srt': 'A', 'b.srt': 'B'})
+    plan = script.RenamePlan(str(tmp_path), [_job(script, 'a.srt', 'b.srt'), _job(script, 'b.srt', 'a.srt')])
+    directory_names = script.DirectoryNames(str(tmp_path))
+    steps = plan.execution_order(directory_names)
+    for step in steps:
+        step.reserve(directory_names)
+    _write(tmp_path, {'.a.srt.swap': 'another run'})  # Appears after planning
+    
+    done = list(script.execute_renames(steps, str(tmp_path), directory_names, workers))
+    
+    assert done == steps
+    assert steps[0].rule == script.RULE_SWAP
+    assert steps[0].new_name == '.a.srt_1.swap' and steps[0].resolution == script.COLLISION_RETRIED
+    assert steps[-1].source == '.a.srt_1.swap'
+    assert _read(tmp_path) == {'a.srt': 'B', 'b.srt': 'A', '.a.srt.swap': 'another run'}
@@ -0,0 +1,66 @@
+"""--resume: finishing a run interrupted after some of its renames."""
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROD_DIR = Path(__file__).resolve().parent.parent
+SCRIPT_NAME = 'rename_subtitles_to_match_videos_ar.py'
+
+
+def test_resume_skips_finished_renames_and_reports_the_whole_run(script, tmp_path, monkeypatch):
+    library = tmp_path / 'Show'
+    library.mkdir()
+    for episode in range(1, 6):
+        (library / f"Show S01E{episode:02d}.mkv").touch()
+        (library / f"show.1x{episode:02d}.srt").write_text(str(episode), encoding='utf-8')
+    (library / 'show.1x09.srt').touch()  # No video: stays a NO MATCH across both sessions
+    monkeypatch.chdir(library)
+    
+    # First session: interrupted after two renames
+    performed = []
+    original_perform = script._perform_rename
+    
+    def interrupting_perform(job, directory, directory_names, lock):
+        if len(performed) == 2:
+            raise KeyboardInterrupt
+        original_perform(job, directory, directory_names, lock)
+        performed.append(job.subtitle)
+    
+    monkeypatch.setattr(script, '_perform_rename', interrupting_perform)
+    with pytest.raises(KeyboardInterrupt):
+        script.rename_subtitles_to_match_videos()
+    script.close_rename_journal()
+    
+    checkpoint = json.loads((library / script.CHECKPOINT_FILENAME).read_text(encoding='utf-8'))
+    assert sorted(checkpoint['completed']) == sorted(performed)
+    
+    # Second session: the real command line, with its state files next to a copy of the script
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    shutil.copy(PROD_DIR / SCRIPT_NAME, bin_dir)
+    shutil.copy(PROD_DIR / 'config.ini', bin_dir)
+    result = subprocess.run([sys.executable, str(bin_dir / SCRIPT_NAME), '--resume'], cwd=library,
+                            capture_output=True, text=True, encoding='utf-8', timeout=60)
+    
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "2 of 5 planned renames already done" in result.stdout
+    assert "COMPLETED TASK: 5 subtitle files renamed out of 6" in result.stdout
+    assert not (library / script.CHECKPOINT_FILENAME).exists()
+    for episode in range(1, 6):
+        assert (library / f"Show S01E{episode:02d}.ar.srt").read_text(encoding='utf-8') == str(episode)
+    
+    # Only the three remaining renames were performed (and journaled) by the resumed session
+    journal = script.load_rename_journal(bin_dir / script.JOURNAL_FILENAME)
+    assert sorted(entry['old'] for entry in journal) == sorted(
+        f"show.1x{episode:02d}.srt" for episode in range(1, 6) if f"show.1x{episode:02d}.srt" not in performed)
+    
+    report = (library / 'renaming_report.csv').read_text(encoding='utf-8')
+    assert "# Renamed: 5/6 subtitles" in report
+    for episode in range(1, 6):
+        assert (f"show.1x{episode:02d}.srt,S01E{episode:02d},Show S01E{episode:02d}.ar.srt,RENAMED,episode,none"
+                in report)
+    assert "show.1x09.srt,S01E09,No Change,NO MATCH,no match,--" in report
@@ -0,0 +1,96 @@
+"""--undo: replaying the rename journal backwards."""
+import os
+
+
+def _write(directory, contents):
+    for name, text in contents.items():
+        (directory / name).write_text(text, encoding='utf-8')
+
+
+def _read(directory):
+    return {path.name: path.read_text(encoding='utf-8') for path in directory.iterdir()
+            if path.name != '.rename_subtitles.lock'}
+
+
+def _apply(script, monkeypatch, tmp_path, directory, renames, run_id):
+    """Apply a saved plan of (source, target) renames as journal run run_id."""
+    plan = script.RenamePlan(str(directory), [
+        script.RenameJob(source, target, None, os.path.splitext(target)[0], '.srt', 'S01E01')
+        for source, target in renames])
+    plan_path = tmp_path / f"{run_id}.json"
+    plan.save(plan_path)
+    monkeypatch.setattr(script, '_rename_journal_run_id', run_id)
+    renamed = script.apply_rename_plan(plan_path, str(directory))
+    script.close_rename_journal()
+    monkeypatch.setattr(script, '_rename_journal', None)
+    return renamed
+
+
+def _undo(script, monkeypatch, selection, run_id):
+    monkeypatch.setattr(script, '_rename_journal_run_id', run_id)
+    result = script.undo_renames(selection)
+    script.close_rename_journal()
+    monkeypatch.setattr(script, '_rename_journal', None)
+    return result
+
+
+def _journal(script):
+    return script.load_rename_journal(script.get_script_directory() / script.JOURNAL_FILENAME)
+
+
+def test_undo_replays_swap_steps_in_reverse(script, tmp_path, monkeypatch):
+    library = tmp_path / 'Show'
+    library.mkdir()
+    _write(library, {'a.srt': 'A', 'b.srt': 'B', 'c.srt': 'C'})
+    
+    renamed = _apply(script, monkeypatch, tmp_path, library,
+                     [('a.srt', 'b.srt'), ('b.srt', 'a.srt'), ('c.srt', 'Show.ar.srt')], 'run-1')
+    
+    assert renamed == 3
+    assert _read(library) == {'a.srt': 'B', 'b.srt': 'A', 'Show.ar.srt': 'C'}
+    journaled = [(entry['old'], entry['new']) for entry in _journal(script)]
+    assert ('a.srt', '.a.srt.swap') in journaled and ('.a.srt.swap', 'b.srt') in journaled
+    
+    restored, skipped = _undo(script, monkeypatch, 'last', 'undo-1')
+    
+    assert (restored, skipped) == (4, 0)
+    assert _read(library) == {'a.srt': 'A', 'b.srt': 'B', 'c.srt': 'C'}
+    # The undo is journaled as its own run, so it can be undone as well
+    assert [entry['run'] for entry in _journal(script)].count('undo-1') == 4
+    assert _undo(script, monkeypatch, 'undo-1', 'redo-1') == (4, 0)
+    assert _read(library) == {'a.srt': 'B', 'b.srt': 'A', 'Show.ar.srt': 'C'}
+
+
+def test_undo_skips_files_modified_since_the_run(script, tmp_path, monkeypatch):
+    library = tmp_path / 'Show'
+    library.mkdir()
+    _write(library, {'one.srt': '1', 'two.srt': '2'})
+    _apply(script, monkeypatch, tmp_path, library, [('one.srt', 'Show 1.ar.srt'), ('two.srt', 'Show 2.ar.srt')], 'run-1')
+    
+    edited = library / 'Show 2.ar.srt'
+    edited.write_text('2 (edited)', encoding='utf-8')
+    stat = edited.stat()
+    os.utime(edited, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    
+    restored, skipped = _undo(script, monkeypatch, 'run-1', 'undo-1')
+    
+    assert (restored, skipped) == (1, 1)
+    assert _read(library) == {'one.srt': '1', 'Show 2.ar.srt': '2 (edited)'}
+
+
+def test_undo_does_not_overwrite_a_reused_name(script, tmp_path, monkeypatch):
+    library = tmp_path / 'Show'
+    library.mkdir()
+    _write(library, {'one.srt': '1'})
+    _apply(script, monkeypatch, tmp_path, library, [('one.srt', 'Show 1.ar.srt')], 'run-1')
+    _write(library, {'one.srt': 'new file'})
+    
+    assert _undo(script, monkeypatch, 'last', 'undo-1') == (0, 1)
+    assert _read(library) == {'one.srt': 'new file', 'Show 1.ar.srt': '1'}
+
+
+def test_undo_range_selects_runs_in_journal_order(script):
+    entries = [{'run': run, 'directory': '/x', 'old': 'a', 'new': 'b'} for run in ('r1', 'r2', 'r2', 'r3')]
+    assert script.select_journal_runs(entries, 'last') == ['r3']
+    assert script.select_journal_runs(entries, 'r2..') == ['r2', 'r3']
+    assert script.select_journal_runs(entries, '..r2') == ['r1', 'r2']